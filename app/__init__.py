@@ -1,20 +1,32 @@
 from flask import Flask
 from threading import Thread
+from multiprocessing import parent_process
 
 from app.controllers.webhook_controller import webhook_bp
 from app.controllers.user_controller import user_bp
 from app.controllers.session_controller import session_bp
 from app.controllers.session_binnacle_controller import binnacle_bp
 from app.controllers.report_controller import report_bp
+from app.controllers.metrics_controller import metrics_bp
+from app.commands.replay_webhooks import replay_webhooks_command
+from app.commands.email_retention import email_retention_command
 
 from app.extensions import db, mail
 from app.config import Config
+from app.services.utility.json_provider import FastJSONProvider
+from app.services.notification_templates import load_notification_templates
 from app.services.daemon.email_sender_daemon import start_email_sender
+from app.services.daemon.email_retention_daemon import start_email_retention, EMAIL_RETENTION_INTERVAL
+from app.services.email_wakeup import listen_for_email_notifications
 from app.services.daemon.monitor_open_sessions import monitor_open_sessions
 from app.services.daemon.report_scheduler import start_report_scheduler
+from app.services.daemon.webhook_inbox_daemon import start_webhook_inbox_worker
+from app.services.webhook_dispatcher import get_inbox_worker_count
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.json = FastJSONProvider(app)
+    load_notification_templates()
 
     db.init_app(app)
     mail.init_app(app)
@@ -24,6 +36,10 @@ def create_app():
     app.register_blueprint(session_bp)
     app.register_blueprint(binnacle_bp)
     app.register_blueprint(report_bp)
+    app.register_blueprint(metrics_bp)
+
+    app.cli.add_command(replay_webhooks_command)
+    app.cli.add_command(email_retention_command)
 
     def start_monitoring():
         monitor_open_sessions(app)
@@ -34,8 +50,31 @@ def create_app():
     def start_email_queue():
         start_email_sender(app)
 
+    def start_email_cleanup():
+        start_email_retention(app)
+
+    def start_email_listener():
+        listen_for_email_notifications(app)
+
+    def start_webhook_inbox(worker_id):
+        start_webhook_inbox_worker(app, worker_id)
+
+    # Los procesos del pool de reportes re-importan run.py al arrancar (spawn): no deben levantar daemons
+    if not app.config["DAEMONS_ENABLED"] or parent_process() is not None:
+        return app
+
     with app.app_context():
         Thread(target=start_monitoring, daemon=True).start()
         Thread(target=start_reports, daemon=True).start()
         Thread(target=start_email_queue, daemon=True).start()
+        Thread(target=start_email_listener, daemon=True).start()
+        if EMAIL_RETENTION_INTERVAL > 0:
+            Thread(target=start_email_cleanup, daemon=True).start()
+        if app.config["WEBHOOK_INBOX_ENABLED"]:
+            workers = get_inbox_worker_count(app.config["WEBHOOK_INBOX_WORKERS"], app.config["WEBHOOK_INBOX_LANES"])
+            if workers != app.config["WEBHOOK_INBOX_WORKERS"]:
+                print(f"WEBHOOK_INBOX_WORKERS={app.config['WEBHOOK_INBOX_WORKERS']} con "
+                      f"WEBHOOK_INBOX_LANES={app.config['WEBHOOK_INBOX_LANES']}: se inician {workers} workers", flush=True)
+            for worker_id in range(workers):
+                Thread(target=start_webhook_inbox, args=(worker_id,), daemon=True).start()
     return app
\ No newline at end of file
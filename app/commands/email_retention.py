@@ -0,0 +1,26 @@
+import time
+import click
+from flask.cli import with_appcontext
+from app.use_cases.email_retention import (
+    EMAIL_ARCHIVE_AFTER_DAYS,
+    EMAIL_PURGE_AFTER_DAYS,
+    EMAIL_RETENTION_BATCH_SIZE,
+    EMAIL_RETENTION_PAUSE,
+    run_email_retention
+)
+
+
+@click.command("email-retention")
+@click.option("--archive-after-days", default=EMAIL_ARCHIVE_AFTER_DAYS, show_default=True,
+              help="Días tras los cuales los correos enviados o fallidos pasan a email_queue_archive.")
+@click.option("--purge-after-days", default=EMAIL_PURGE_AFTER_DAYS, show_default=True,
+              help="Días tras los cuales se borran cuerpo y adjuntos de los correos archivados.")
+@click.option("--batch-size", default=EMAIL_RETENTION_BATCH_SIZE, show_default=True, help="Filas por transacción.")
+@click.option("--pause", default=EMAIL_RETENTION_PAUSE, show_default=True, help="Segundos entre lotes.")
+@with_appcontext
+def email_retention_command(archive_after_days, purge_after_days, batch_size, pause):
+    """Archiva y purga email_queue en lotes (lo mismo que el job periódico del daemon)."""
+    started = time.perf_counter()
+    result = run_email_retention(archive_after_days, purge_after_days, batch_size, pause)
+    click.echo(f"Archivados: {result['archived']}, purgados: {result['purged']}, "
+               f"adjuntos huérfanos borrados: {result['blobsDeleted']} en {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,76 @@
+import json
+import time
+import click
+from flask.cli import with_appcontext
+from app.extensions import db
+from app.use_cases.dispatch_webhook import dispatch_webhook_use_case
+from app.use_cases.manage_error_log import log_error_use_case
+from app.validators.webhook_inbox_validator import WEBHOOK_EVENT_TYPES
+
+
+def parse_webhook_line(line, default_event_type=None):
+    # Cada línea es {"eventType": ..., "payload": {...}} o el payload crudo de Clockify
+    record = json.loads(line)
+    if "payload" in record:
+        return record.get("eventType") or default_event_type, record["payload"]
+    return default_event_type, record
+
+
+def flush_replay_errors(errors):
+    for line_number, event_type, payload, error in errors:
+        log_error_use_case(
+            endpoint=f"/replay-webhooks/{event_type}",
+            method="SYSTEM",
+            error=error,
+            payload={"line": line_number, **payload} if isinstance(payload, dict) else payload,
+            response_code=422 if isinstance(error, (ValueError, LookupError)) else 500
+        )
+
+
+@click.command("replay-webhooks")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--event-type", type=click.Choice(WEBHOOK_EVENT_TYPES), default=None,
+              help="Tipo de evento para las líneas que no traen 'eventType'.")
+@click.option("--batch-size", default=500, show_default=True, help="Eventos por commit.")
+@click.option("--notify/--no-notify", default=False, show_default=True,
+              help="Encolar los correos de notificación de cada evento.")
+@with_appcontext
+def replay_webhooks_command(path, event_type, batch_size, notify):
+    """Reprocesa un archivo JSONL de webhooks de Clockify con commits por lotes."""
+    started = time.perf_counter()
+    succeeded, failed, in_batch = 0, 0, 0
+    errors = []
+
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            line_event_type, payload = event_type, {"raw": line.strip()}
+            try:
+                line_event_type, payload = parse_webhook_line(line, event_type)
+                # Cada evento en su savepoint: un fallo no invalida el resto del lote
+                with db.session.begin_nested():
+                    dispatch_webhook_use_case(line_event_type, payload, notify=notify, commit=False)
+            except Exception as e:
+                failed += 1
+                errors.append((line_number, line_event_type, payload, e))
+            else:
+                succeeded += 1
+
+            in_batch += 1
+            if in_batch >= batch_size:
+                db.session.commit()
+                flush_replay_errors(errors)
+                errors, in_batch = [], 0
+                elapsed = time.perf_counter() - started
+                click.echo(f"[REPLAY] {succeeded} aplicados, {failed} fallidos - "
+                           f"{(succeeded + failed) / elapsed:.0f} eventos/s")
+
+    db.session.commit()
+    flush_replay_errors(errors)
+    elapsed = time.perf_counter() - started
+    total = succeeded + failed
+    click.echo(
+        f"[REPLAY] Finalizado: {succeeded} aplicados, {failed} fallidos de {total} eventos en {elapsed:.1f}s"
+        f" - {total / elapsed if elapsed else 0:.0f} eventos/s"
+    )
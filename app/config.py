@@ -10,6 +10,8 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_TOKEN = os.getenv("SECRET_TOKEN")
+    # Token del scrape de /api-clockify/metrics (Authorization: Bearer); sin definir se usa SECRET_TOKEN
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN") or SECRET_TOKEN
     MAIL_SERVER = os.getenv("MAIL_SERVER")
     MAIL_PORT = int(os.getenv("MAIL_PORT", 587))
     MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", "True") == "True"
@@ -18,6 +20,9 @@ class Config:
     MAIL_DEFAULT_SENDER = os.getenv("MAIL_DEFAULT_SENDER")
     MAIL_RECIPIENT = os.getenv("MAIL_RECIPIENT")
     MAIL_ADDITIONAL_RECIPIENTS = os.getenv("MAIL_ADDITIONAL_RECIPIENTS", "")
+    # Límite del proveedor SMTP por proceso (0 = sin límite); ráfaga = mensajes seguidos permitidos
+    MAIL_RATE_PER_MINUTE = int(os.getenv("MAIL_RATE_PER_MINUTE", 0))
+    MAIL_RATE_BURST = int(os.getenv("MAIL_RATE_BURST", 1))
     CLOCKIFY_SECRET_TOKEN_START = os.getenv("CLOCKIFY_SECRET_TOKEN_START")
     CLOCKIFY_SECRET_TOKEN_END = os.getenv("CLOCKIFY_SECRET_TOKEN_END")
     CLOCKIFY_SECRET_TOKEN_EDIT = os.getenv("CLOCKIFY_SECRET_TOKEN_EDIT")
@@ -26,4 +31,11 @@ class Config:
     EMAIL_MAX_RETRIES = os.getenv("EMAIL_MAX_RETRIES")
     EMAIL_RETRY_DELAY = os.getenv("EMAIL_RETRY_DELAY")
     EMAIL_PROCESS_INTERVAL = os.getenv("EMAIL_PROCESS_INTERVAL")
-
+    DAEMONS_ENABLED = os.getenv("DAEMONS_ENABLED", "True") == "True"
+    WEBHOOK_INBOX_ENABLED = os.getenv("WEBHOOK_INBOX_ENABLED", "False") == "True"
+    WEBHOOK_INBOX_WORKERS = int(os.getenv("WEBHOOK_INBOX_WORKERS", 4))
+    WEBHOOK_INBOX_LANES = int(os.getenv("WEBHOOK_INBOX_LANES", 16))
+    WEBHOOK_INBOX_BATCH_SIZE = int(os.getenv("WEBHOOK_INBOX_BATCH_SIZE", 20))
+    WEBHOOK_INBOX_INTERVAL = int(os.getenv("WEBHOOK_INBOX_INTERVAL", 2))  # segundos
+    WEBHOOK_INBOX_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_INBOX_MAX_ATTEMPTS", 3))
+    WEBHOOK_INBOX_LEASE_SECONDS = int(os.getenv("WEBHOOK_INBOX_LEASE_SECONDS", 300))
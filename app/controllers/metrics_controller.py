@@ -0,0 +1,16 @@
+from flask import Blueprint, Response, jsonify
+from app.use_cases.validate_token import validate_metrics_token
+from app.use_cases.email_metrics import get_email_metrics_use_case
+
+metrics_bp = Blueprint("metrics", __name__, url_prefix="/api-clockify/metrics")
+
+
+@metrics_bp.route("", methods=["GET"])
+def email_metrics():
+    token_error = validate_metrics_token()
+    if token_error:
+        return token_error
+    try:
+        return Response(get_email_metrics_use_case(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    except Exception as e:
+        return jsonify({"error": f"Internal server error {str(e)}"}), 500
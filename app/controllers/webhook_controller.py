@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from werkzeug.exceptions import BadRequest
 
 from app.use_cases.process_webhook import process_webhook_use_case
@@ -9,11 +9,26 @@ from app.use_cases.webhook_session_end import handle_session_end_use_case
 from app.use_cases.webhook_session_delete import handle_session_delete_use_case
 from app.services.mail_service_manual import send_webhook_email
 from app.use_cases.webhook_session_manual import handle_session_manual_creation_use_case
+from app.use_cases.dispatch_webhook import get_webhook_inbox_stats_use_case
+from app.services.webhook_inbox_service import enqueue_webhook_event
+from app.services.webhook_dispatcher import session_lane_lock
+from app.services.webhook_dedup_service import run_deduplicated
 import json
 
 #Pasar a un controlador a parte
 webhook_bp = Blueprint("webhook", __name__, url_prefix='/api-clockify/webhook')
 
+def run_or_enqueue(event_type, data, handler):
+    # Las reentregas de Clockify reciben la respuesta de la primera entrega sin reprocesar
+    # En modo inbox solo se persiste el payload (un insert) y se responde 202; las
+    # reentregas se descartan en el worker, que es donde se procesa
+    if current_app.config["WEBHOOK_INBOX_ENABLED"]:
+        return jsonify(enqueue_webhook_event(event_type, data)), 202
+    # Eventos de la misma sesión se procesan en orden dentro del proceso
+    with session_lane_lock(data.get("id"), current_app.config["WEBHOOK_INBOX_LANES"]):
+        body, status_code, headers = run_deduplicated(event_type, data, lambda: (handler(data), 200))
+        return jsonify(body), status_code, headers
+
 @webhook_bp.route("/edit", methods=["POST"])
 def handle_webhook():
     auth_error = validate_secret_token_clockify("edit")
@@ -24,8 +39,7 @@ def handle_webhook():
         if not data:
             raise BadRequest("JSON body is required.")
 
-        result = process_webhook_use_case(data)
-        return jsonify(result), 200
+        return run_or_enqueue("edit", data, process_webhook_use_case)
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 422
@@ -46,8 +60,7 @@ def handle_webhook_start():
         if not data:
             raise BadRequest("JSON body is required.")
 
-        result = handle_session_start_use_case(data)
-        return jsonify(result), 200
+        return run_or_enqueue("start", data, handle_session_start_use_case)
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 422
@@ -68,8 +81,7 @@ def handle_webhook_end():
         if not data:
             raise BadRequest("JSON body is required.")
 
-        result = handle_session_end_use_case(data)
-        return jsonify(result), 200
+        return run_or_enqueue("end", data, handle_session_end_use_case)
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 422
@@ -93,8 +105,7 @@ def handle_webhook_delete():
         if not data:
             raise BadRequest("JSON body is required.")
 
-        result = handle_session_delete_use_case(data)
-        return jsonify(result), 200
+        return run_or_enqueue("delete", data, handle_session_delete_use_case)
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 422
@@ -118,8 +129,7 @@ def handle_webhook_manual():
         if not data:
             raise BadRequest("JSON body is required.")
 
-        result = handle_session_manual_creation_use_case(data)
-        return jsonify(result), 200
+        return run_or_enqueue("manual", data, handle_session_manual_creation_use_case)
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 422
@@ -131,6 +141,17 @@ def handle_webhook_manual():
         return jsonify({"error": f"Internal server error {str(e)}"}), 500
 
 
+@webhook_bp.route("/inbox/stats", methods=["GET"])
+def webhook_inbox_stats():
+    token_error = validate_secret_token()
+    if token_error:
+        return token_error
+    try:
+        return jsonify(get_webhook_inbox_stats_use_case()), 200
+    except Exception as e:
+        return jsonify({"error": f"Internal server error {str(e)}"}), 500
+
+
 @webhook_bp.route("/test-email", methods=["GET"])
 def test_email():
     token_error = validate_secret_token()
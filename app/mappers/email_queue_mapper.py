@@ -1,7 +1,8 @@
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
 
 
-def map_email_to_queue_entity(to_address, subject, body, attachments=None):
+def map_email_to_queue_entity(to_address, subject, body, attachments=None, digest_entry=None, delay=0):
+    now = datetime.now(UTC)
     return {
         "toAddress": to_address,
         "subject": subject,
@@ -9,5 +10,7 @@ def map_email_to_queue_entity(to_address, subject, body, attachments=None):
         "status": 0,
         "retries": 0,
         "attachments": attachments or [],
-        "createdAt": datetime.now(UTC)
+        "createdAt": now,
+        "nextAttemptAt": now + timedelta(seconds=delay),
+        "digestEntry": digest_entry
     }
\ No newline at end of file
@@ -0,0 +1,13 @@
+from datetime import datetime, UTC
+
+
+def map_webhook_to_inbox_entity(event_type, data, lane=0):
+    return {
+        "eventType": event_type,
+        "externalSesionId": data.get("id"),
+        "lane": lane,
+        "payload": data,
+        "status": 0,
+        "attempts": 0,
+        "receivedAt": datetime.now(UTC)
+    }
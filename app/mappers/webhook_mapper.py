@@ -1,105 +1,109 @@
-from datetime import datetime, UTC
+import re
+from datetime import datetime, timedelta, UTC
+from typing import NamedTuple
 from dateutil import parser
-from app.use_cases.manage_error_log import log_error_use_case
+from app.models.webhook_model import WebhookEvent
+from app.validators.webhook_validator import validate_webhook_data
 import isodate
 
-def map_webhook_user_to_user_entity(webhook_data):
-    user_data = webhook_data.get("user", {})
-    status = user_data.get("status", "").upper()
-    is_enabled = status == "ACTIVE"
+# Clockify envía duraciones como PT1H30M15S; el caso general queda para isodate
+_DURATION_PATTERN = re.compile(
+    r"^P(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?$"
+)
+
+
+class ParsedWebhook(NamedTuple):
+    event: WebhookEvent
+    session: dict
+    user: dict
+
+
+def parse_webhook_datetime(value, field):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return parser.isoparse(value)
+    except (ValueError, OverflowError) as e:
+        raise ValueError(f"Invalid {field}: {value!r} ({e})") from e
+
+
+def parse_webhook_duration(value):
+    if not value:
+        return None
+    match = _DURATION_PATTERN.match(value)
+    if match and value not in ("P", "PT"):
+        parts = match.groupdict()
+        return timedelta(
+            days=int(parts["days"] or 0),
+            hours=int(parts["hours"] or 0),
+            minutes=int(parts["minutes"] or 0),
+            seconds=float(parts["seconds"] or 0)
+        )
+    try:
+        return isodate.parse_duration(value)
+    except (isodate.ISO8601Error, ValueError) as e:
+        raise ValueError(f"Invalid duration: {value!r} ({e})") from e
+
+
+def map_webhook_user_to_user_entity(event: WebhookEvent):
+    is_enabled = event.user.status.upper() == "ACTIVE"
 
     return {
-        "ExternalUserId": user_data.get("id"),
-        "name": user_data.get("name"),
-        "email": f"{user_data.get('id')}@clockify.fake",  # Evitar email vacío y mantener unicidad
+        "ExternalUserId": event.user.id,
+        "name": event.user.name,
+        "email": f"{event.user.id}@clockify.fake",  # Evitar email vacío y mantener unicidad
         "hoursPerMonth": 0,
         "enable": is_enabled,
         "disabledTime": None if is_enabled else datetime.now(UTC)
     }
 
-def map_webhook_to_session_entity(data):
-    time_data = data.get("timeInterval", {})
-    project = data.get("project") or {}
-    task = data.get("task") or {}
-    user = data.get("user") or {}
 
+def map_webhook_to_session_entity(event: WebhookEvent):
+    time_data = event.timeInterval
     is_enabled = True  # Forzado como activo por defecto
 
-    # Inicialización segura
-    start_raw = time_data.get("start")
-    end_raw = time_data.get("end")
-    duration_raw = time_data.get("duration")
-
-    start_parsed, end_parsed, duration_parsed = None, None, None
-
-    try:
-        if start_raw:
-            start_parsed = parser.isoparse(start_raw)
-    except Exception as e:
-        log_error_use_case(
-            endpoint="map_webhook_to_session_entity",
-            method="SYSTEM",
-            error=f"Error parseando startDate: {str(e)}",
-            payload={"start_raw": start_raw, "full_data": data},
-            response_code=422
-        )
-
-    try:
-        if end_raw:
-            end_parsed = parser.isoparse(end_raw)
-    except Exception as e:
-        log_error_use_case(
-            endpoint="map_webhook_to_session_entity",
-            method="SYSTEM",
-            error=f"Error parseando endDate: {str(e)}",
-            payload={"end_raw": end_raw, "full_data": data},
-            response_code=422
-        )
-
-    try:
-        if duration_raw:
-            duration_parsed = isodate.parse_duration(duration_raw)
-    except Exception as e:
-        log_error_use_case(
-            endpoint="map_webhook_to_session_entity",
-            method="SYSTEM",
-            error=f"Error parseando duration: {str(e)}",
-            payload={"duration_raw": duration_raw, "full_data": data},
-            response_code=422
-        )
+    end_parsed = parse_webhook_datetime(time_data.end, "endDate")
 
     # Alerta si es cierre o edición y no vino endDate
-    if not data.get("currentlyRunning", True) and not end_parsed:
-        log_error_use_case(
-            endpoint="map_webhook_to_session_entity",
-            method="SYSTEM",
-            error="Webhook con cierre/edición recibido sin endDate válido",
-            payload=data,
-            response_code=206  # Partial Content
-        )
+    if not event.currentlyRunning and not end_parsed:
+        print(f"[WEBHOOK] Cierre/edición sin endDate válido para la sesión {event.id}", flush=True)
 
-    session_dict = {
-        "external_sesion_id": data.get("id"),
-        "description": data.get("description") or "Sin descripción",
-        "idUser": user.get("id"),
-        "idProject": data.get("projectId", "") or "",
-        "projectName": project.get("name", "Sin proyecto"),
-        "idWorkspace": data.get("workspaceId", ""),
+    return {
+        "external_sesion_id": event.id,
+        "description": event.description or "Sin descripción",
+        "idUser": event.user.id,
+        "idProject": event.projectId or "",
+        "projectName": event.project.name if event.project else "Sin proyecto",
+        "idWorkspace": event.workspaceId,
         "workspaceName": "ActionTracker",
-        "idTask": task.get("id", "") or "",
-        "taskName": task.get("name", "Sin tarea"),
-        "startDate": start_parsed,
+        "idTask": (event.task.id if event.task else "") or "",
+        "taskName": event.task.name if event.task else "Sin tarea",
+        "startDate": parse_webhook_datetime(time_data.start, "startDate"),
         "endDate": end_parsed,
-        "duration": duration_parsed,
-        "timeZone": time_data.get("timeZone", ""),
-        "offsetStart": time_data.get("offsetStart", 0),
-        "offsetEnd": time_data.get("offsetEnd", 0),
-        "currentlyRunning": data.get("currentlyRunning", False),
+        "duration": parse_webhook_duration(time_data.duration),
+        "timeZone": time_data.timeZone,
+        "offsetStart": time_data.offsetStart,
+        "offsetEnd": time_data.offsetEnd,
+        "currentlyRunning": event.currentlyRunning,
         "enable": is_enabled,
         "disableTime": None if is_enabled else datetime.now(UTC),
     }
 
-    return session_dict
+
+def parse_webhook_event(data):
+    """Valida el payload una sola vez y devuelve el evento junto con las entidades de sesión y usuario.
+
+    Un payload inválido o con fechas/duración ilegibles lanza ValueError; el registro
+    del error queda a cargo del caso de uso, fuera de la transacción.
+    """
+    event, errors = validate_webhook_data(data)
+    if not event:
+        raise ValueError(f"Invalid payload: {errors}")
+    return ParsedWebhook(event, map_webhook_to_session_entity(event), map_webhook_user_to_user_entity(event))
 
 def map_session_to_binnacle_data(session):
     return {
@@ -0,0 +1,13 @@
+from app.extensions import db
+from datetime import datetime, UTC
+
+
+class EmailAttachmentBlob(db.Model):
+    __tablename__ = "email_attachment_blobs"
+
+    sha256 = db.Column("sha256", db.String(64), primary_key=True)  # hash del contenido: el mismo archivo se guarda una vez
+    content = db.Column("content", db.LargeBinary, nullable=False)  # bytea, sin base64
+    size = db.Column("size", db.Integer, nullable=False)
+    createdAt = db.Column("createdAt", db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
+    # Se renueva cada vez que un correo vuelve a referenciar el blob; la retención solo borra blobs sin uso reciente
+    lastUsedAt = db.Column("lastUsedAt", db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
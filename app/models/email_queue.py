@@ -12,5 +12,18 @@ class EmailQueue(db.Model):
     status = db.Column("status", db.Integer, nullable=False, default=0)  # 0=queued, 1=sent, 2=failed
     retries = db.Column("retries", db.Integer, nullable=False, default=0)
     sentAt = db.Column("sentAt", db.DateTime(timezone=True), nullable=True)
-    createdAt = db.Column("createdAt", db.DateTime(timezone=True), default=datetime.now(UTC))
-    attachments = db.Column("attachments", JSONB, nullable=True)
\ No newline at end of file
+    createdAt = db.Column("createdAt", db.DateTime(timezone=True), default=lambda: datetime.now(UTC))
+    attachments = db.Column("attachments", JSONB, nullable=True)
+    claimedBy = db.Column("claimedBy", db.Text, nullable=True)  # host:pid:hilo del sender que lo está enviando
+    leaseExpiresAt = db.Column("leaseExpiresAt", db.DateTime(timezone=True), nullable=True)
+    # Próximo envío: al encolar es createdAt, tras un fallo se aleja con backoff exponencial
+    nextAttemptAt = db.Column("nextAttemptAt", db.DateTime(timezone=True), nullable=False,
+                              default=lambda: datetime.now(UTC))
+    # Fila del resumen (modo digest); NULL para correos que se envían solos
+    digestEntry = db.Column("digestEntry", JSONB, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_email_queue_due", "nextAttemptAt", "idEncolado", postgresql_where=db.text("status = 0")),
+        db.Index("ix_email_queue_digest", "idEncolado",
+                 postgresql_where=db.text('status = 0 AND "digestEntry" IS NOT NULL')),
+    )
\ No newline at end of file
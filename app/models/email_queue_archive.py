@@ -0,0 +1,25 @@
+from app.extensions import db
+from datetime import datetime, UTC
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class EmailQueueArchive(db.Model):
+    """Correos enviados o fallidos sacados de email_queue por el job de retención."""
+    __tablename__ = "email_queue_archive"
+
+    idEncolado = db.Column("idEncolado", db.Integer, primary_key=True, autoincrement=False)  # mismo ID que en email_queue
+    toAddress = db.Column("toAddress", db.Text, nullable=False)
+    subject = db.Column("subject", db.Text, nullable=False)
+    body = db.Column("body", db.Text, nullable=True)  # NULL tras la purga
+    status = db.Column("status", db.Integer, nullable=False)  # 1=sent, 2=failed
+    retries = db.Column("retries", db.Integer, nullable=False)
+    sentAt = db.Column("sentAt", db.DateTime(timezone=True), nullable=True)
+    createdAt = db.Column("createdAt", db.DateTime(timezone=True), nullable=False)
+    attachments = db.Column("attachments", JSONB, nullable=True)  # referencias a email_attachment_blobs, NULL tras la purga
+    digestEntry = db.Column("digestEntry", JSONB, nullable=True)
+    archivedAt = db.Column("archivedAt", db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
+    purgedAt = db.Column("purgedAt", db.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_email_queue_archive_unpurged", "idEncolado", postgresql_where=db.text('"purgedAt" IS NULL')),
+    )
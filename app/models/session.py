@@ -3,6 +3,10 @@ from datetime import datetime, timezone
 
 class Session(db.Model):
     __tablename__ = 'sesiones'  # Casi la cago aquí
+    __table_args__ = (
+        # Sesiones en curso por usuario: si las hay, el reporte personalizado no sale de la caché
+        db.Index("ix_sesiones_running", "idUser", "startDate", postgresql_where=db.text('"currentlyRunning"')),
+    )
 
     idSesion = db.Column('idSesion', db.Integer, primary_key=True)
     description = db.Column('description', db.Text, nullable=False)
@@ -4,9 +4,16 @@ from datetime import datetime, UTC
 
 class SessionBinnacle(db.Model):
     __tablename__ = 'sesiones_binnacle'
+    __table_args__ = (
+        # Versión de datos del reporte personalizado (get_report_data_version)
+        db.Index("ix_sesiones_binnacle_user_start", "idUser", "startDate", "idSesion"),
+        db.Index("ix_sesiones_binnacle_session", "idSesion", "modifiedAt"),
+        # Estado actual de una sesión para la deduplicación de webhooks (get_session_state_version)
+        db.Index("ix_sesiones_binnacle_external", "ExternalSesionId", "idSesionBinnacle"),
+    )
 
     idSesionBinnacle = db.Column(db.Integer, primary_key=True)
-    external_sesion_id = db.Column('ExternalSesionId', db.String(50), unique=True, nullable=False)  # ID de Clockify
+    external_sesion_id = db.Column('ExternalSesionId', db.String(50), nullable=False)  # ID de Clockify, se repite en cada cambio
     idSesion = db.Column(db.Integer, nullable=False)
     description = db.Column(db.Text, nullable=False)
     idUser = db.Column(db.Integer, nullable=False)
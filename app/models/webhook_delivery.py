@@ -0,0 +1,17 @@
+from app.extensions import db
+from datetime import datetime, UTC
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class WebhookDelivery(db.Model):
+    __tablename__ = "webhook_deliveries"
+
+    deliveryKey = db.Column("deliveryKey", db.String(64), primary_key=True)  # sha256 del evento normalizado
+    eventType = db.Column("eventType", db.String(20), nullable=False)
+    externalSesionId = db.Column("ExternalSesionId", db.String(50), nullable=True)  # ID de Clockify
+    statusCode = db.Column("statusCode", db.Integer, nullable=True)  # NULL mientras la primera entrega se procesa
+    response = db.Column("response", JSONB, nullable=True)
+    # Último idSesionBinnacle de la sesión al terminar: si cambió, un payload igual es un cambio nuevo
+    sessionVersion = db.Column("sessionVersion", db.Integer, nullable=True)
+    createdAt = db.Column("createdAt", db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
+    expiresAt = db.Column("expiresAt", db.DateTime(timezone=True), nullable=False, index=True)
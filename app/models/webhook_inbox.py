@@ -0,0 +1,24 @@
+from app.extensions import db
+from datetime import datetime, UTC
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class WebhookInbox(db.Model):
+    __tablename__ = "webhook_inbox"
+
+    idInbox = db.Column("idInbox", db.Integer, primary_key=True)
+    eventType = db.Column("eventType", db.String(20), nullable=False)  # start, end, edit, delete, manual
+    externalSesionId = db.Column("ExternalSesionId", db.String(50), nullable=True)  # ID de Clockify
+    lane = db.Column("lane", db.Integer, nullable=False, default=0)  # carril = hash(ExternalSesionId) % WEBHOOK_INBOX_LANES
+    payload = db.Column("payload", JSONB, nullable=False)
+    status = db.Column("status", db.Integer, nullable=False, default=0)  # 0=pendiente, 1=procesando, 2=procesado, 3=fallido
+    attempts = db.Column("attempts", db.Integer, nullable=False, default=0)
+    lastError = db.Column("lastError", db.Text, nullable=True)
+    receivedAt = db.Column("receivedAt", db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
+    claimedAt = db.Column("claimedAt", db.DateTime(timezone=True), nullable=True)
+    processedAt = db.Column("processedAt", db.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_webhook_inbox_pending", "lane", "idInbox", postgresql_where=db.text("status IN (0, 1)")),
+        db.Index("ix_webhook_inbox_session_pending", "ExternalSesionId", "idInbox", postgresql_where=db.text("status IN (0, 1)")),
+    )
@@ -0,0 +1,45 @@
+import hashlib
+from datetime import datetime, UTC
+from app.extensions import db
+from app.models.email_attachment_blob import EmailAttachmentBlob
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+
+def store_attachment_blobs(contents):
+    """Guarda varios adjuntos en un solo INSERT y devuelve sus sha256 en el mismo orden."""
+    # Direccionado por contenido: reenviar el mismo reporte no duplica bytes. No confirma,
+    # queda en la transacción de los correos que lo referencian.
+    # Si ya existe se renueva lastUsedAt: el lock de fila hace esperar a una purga concurrente,
+    # que al reevaluar lo ve en uso y no lo borra
+    hashes = [hashlib.sha256(content).hexdigest() for content in contents]
+    if not hashes:
+        return hashes
+    now = datetime.now(UTC)
+    # ON CONFLICT DO UPDATE no admite dos filas con la misma clave en un statement
+    rows = {
+        sha256: {"sha256": sha256, "content": content, "size": len(content), "createdAt": now, "lastUsedAt": now}
+        for sha256, content in zip(hashes, contents)
+    }
+    statement = insert(EmailAttachmentBlob).values(list(rows.values()))
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[EmailAttachmentBlob.sha256],
+            set_={"lastUsedAt": statement.excluded.lastUsedAt}
+        )
+    )
+    return hashes
+
+
+def store_attachment_blob(content):
+    return store_attachment_blobs([content])[0]
+
+
+def load_attachment_blobs(hashes):
+    if not hashes:
+        return {}
+    rows = db.session.execute(
+        select(EmailAttachmentBlob.sha256, EmailAttachmentBlob.content)
+        .where(EmailAttachmentBlob.sha256.in_(hashes))
+    ).all()
+    return {row.sha256: bytes(row.content) for row in rows}
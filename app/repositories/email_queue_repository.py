@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, UTC
+from app.extensions import db
+from app.models.email_queue import EmailQueue
+from sqlalchemy import select, update, case, func, or_
+
+
+_CLAIMED_COLUMNS = (EmailQueue.idEncolado, EmailQueue.toAddress, EmailQueue.subject, EmailQueue.body,
+                    EmailQueue.attachments, EmailQueue.retries, EmailQueue.createdAt, EmailQueue.digestEntry)
+
+
+def claim_queued_emails(worker_id, limit, lease_seconds, digest_window=0):
+    # Reclama los correos vencidos sin bloquear a otros senders (otros hilos, workers de gunicorn o nodos).
+    # Al reclamar, nextAttemptAt pasa al fin del lease: si el sender se cae el correo vuelve a vencer
+    # solo, y la consulta queda como un rango sobre ix_email_queue_due.
+    now = datetime.now(UTC)
+    lease_expires_at = now + timedelta(seconds=lease_seconds)
+    claimable = (
+        select(EmailQueue.idEncolado)
+        .where(EmailQueue.status == 0, EmailQueue.nextAttemptAt <= now)
+        .order_by(EmailQueue.nextAttemptAt, EmailQueue.idEncolado)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    emails = db.session.execute(
+        update(EmailQueue)
+        .where(EmailQueue.idEncolado.in_(claimable.scalar_subquery()))
+        .values(claimedBy=worker_id, leaseExpiresAt=lease_expires_at, nextAttemptAt=lease_expires_at)
+        .returning(*_CLAIMED_COLUMNS)
+    ).all()
+
+    # Modo resumen: al vencer una notificación se llevan también las demás pendientes, aunque su
+    # ventana no haya terminado; el daemon las agrupa en un correo por destinatario. Las reprogramadas
+    # (fallo o límite del proveedor) ya salieron de su ventana y esperan su nextAttemptAt como cualquiera.
+    if any(email.digestEntry is not None for email in emails):
+        pending = (
+            select(EmailQueue.idEncolado)
+            .where(
+                EmailQueue.status == 0,
+                EmailQueue.digestEntry.isnot(None),
+                EmailQueue.claimedBy.is_(None),
+                or_(
+                    EmailQueue.nextAttemptAt <= now,
+                    EmailQueue.nextAttemptAt <= EmailQueue.createdAt + timedelta(seconds=digest_window)
+                )
+            )
+            .order_by(EmailQueue.nextAttemptAt, EmailQueue.idEncolado)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        emails += db.session.execute(
+            update(EmailQueue)
+            .where(EmailQueue.idEncolado.in_(pending.scalar_subquery()))
+            .values(claimedBy=worker_id, leaseExpiresAt=lease_expires_at, nextAttemptAt=lease_expires_at)
+            .returning(*_CLAIMED_COLUMNS)
+        ).all()
+
+    # Se confirma enseguida: el lease, no el lock de fila, protege el envío
+    db.session.commit()
+    return sorted(emails, key=lambda email: (email.createdAt, email.idEncolado))
+
+
+def get_next_email_due_at():
+    return db.session.scalar(select(func.min(EmailQueue.nextAttemptAt)).where(EmailQueue.status == 0))
+
+
+def mark_email_sent(worker_id, *ids_encolado):
+    # Varios IDs cuando un resumen agrupa varias notificaciones en un solo envío. Como en
+    # mark_email_failed, solo marca quien tiene el lease; devuelve los IDs que efectivamente marcó
+    marked = db.session.execute(
+        update(EmailQueue)
+        .where(EmailQueue.idEncolado.in_(ids_encolado), EmailQueue.claimedBy == worker_id)
+        .values(status=1, sentAt=datetime.now(UTC), claimedBy=None, leaseExpiresAt=None)
+        .returning(EmailQueue.idEncolado)
+    ).scalars().all()
+    db.session.commit()
+    return marked
+
+
+def mark_email_failed(id_encolado, worker_id, max_retries, next_attempt_at):
+    # Solo quien tiene el lease libera el correo; si otro sender ya lo reclamó no se pisa su estado
+    retries = db.session.execute(
+        update(EmailQueue)
+        .where(EmailQueue.idEncolado == id_encolado, EmailQueue.claimedBy == worker_id)
+        .values(
+            retries=EmailQueue.retries + 1,
+            status=case((EmailQueue.retries + 1 >= max_retries, 2), else_=EmailQueue.status),  # 2=fallido permanente
+            nextAttemptAt=next_attempt_at,
+            claimedBy=None,
+            leaseExpiresAt=None
+        )
+        .returning(EmailQueue.retries)
+    ).scalar()
+    db.session.commit()
+    return retries
+
+
+def defer_email(id_encolado, worker_id, next_attempt_at):
+    # Rechazo temporal del proveedor (límite de envío): se reprograma sin contar como reintento
+    db.session.execute(
+        update(EmailQueue)
+        .where(EmailQueue.idEncolado == id_encolado, EmailQueue.claimedBy == worker_id)
+        .values(nextAttemptAt=next_attempt_at, claimedBy=None, leaseExpiresAt=None)
+    )
+    db.session.commit()
+
+
+def get_email_queue_stats():
+    # Un solo recorrido agrupado por estado; el historial lo acota la retención (email_queue_archive)
+    rows = db.session.execute(
+        select(EmailQueue.status, func.count(), func.min(EmailQueue.createdAt), func.min(EmailQueue.nextAttemptAt))
+        .group_by(EmailQueue.status)
+    ).all()
+    by_status = {status: (count, oldest_created, next_attempt) for status, count, oldest_created, next_attempt in rows}
+    _, oldest_pending, next_due = by_status.get(0, (0, None, None))
+    return {
+        "depth": {status: count for status, (count, _, _) in by_status.items()},
+        "oldestPendingAt": oldest_pending,
+        "nextDueAt": next_due
+    }
@@ -0,0 +1,93 @@
+from datetime import datetime, UTC
+from app.extensions import db
+from app.models.email_queue import EmailQueue
+from app.models.email_queue_archive import EmailQueueArchive
+from app.models.email_attachment_blob import EmailAttachmentBlob
+from sqlalchemy import select, insert, update, delete, func, literal, union, column
+from sqlalchemy.dialects.postgresql import JSONB
+
+_ARCHIVED_COLUMNS = ("idEncolado", "toAddress", "subject", "body", "status", "retries", "sentAt", "createdAt",
+                     "attachments", "digestEntry")
+
+
+def archive_email_batch(cutoff, batch_size):
+    # Mueve un lote de enviados/fallidos a email_queue_archive en un solo statement (DELETE ... RETURNING
+    # dentro de un INSERT). Recorre la PK desde los más viejos y salta filas bloqueadas: no espera
+    # a los senders ni los hace esperar.
+    batch = (
+        select(EmailQueue.idEncolado)
+        .where(EmailQueue.status != 0, EmailQueue.createdAt < cutoff)
+        .order_by(EmailQueue.idEncolado)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(EmailQueue)
+        .where(EmailQueue.idEncolado.in_(batch.scalar_subquery()))
+        .returning(*(EmailQueue.__table__.c[column] for column in _ARCHIVED_COLUMNS))
+        .cte("moved")
+    )
+    archived = db.session.execute(
+        insert(EmailQueueArchive)
+        .from_select(
+            [*_ARCHIVED_COLUMNS, "archivedAt"],
+            select(*(moved.c[column] for column in _ARCHIVED_COLUMNS), literal(datetime.now(UTC)))
+        )
+        .returning(EmailQueueArchive.idEncolado)
+    ).all()
+    db.session.commit()
+    return len(archived)
+
+
+def purge_archived_bodies_batch(cutoff, batch_size):
+    # Quita cuerpo, adjuntos y fila de resumen; quedan destinatario, asunto, estado y fechas
+    batch = (
+        select(EmailQueueArchive.idEncolado)
+        .where(EmailQueueArchive.purgedAt.is_(None), EmailQueueArchive.createdAt < cutoff)
+        .order_by(EmailQueueArchive.idEncolado)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    purged = db.session.execute(
+        update(EmailQueueArchive)
+        .where(EmailQueueArchive.idEncolado.in_(batch.scalar_subquery()))
+        .values(body=None, attachments=None, digestEntry=None, purgedAt=datetime.now(UTC))
+        .returning(EmailQueueArchive.idEncolado)
+    ).all()
+    db.session.commit()
+    return len(purged)
+
+
+def _referenced_attachment_hashes():
+    value = column("value", JSONB)
+    queued = func.jsonb_array_elements(EmailQueue.attachments).table_valued(value).alias("queued")
+    archived = func.jsonb_array_elements(EmailQueueArchive.attachments).table_valued(value).alias("archived")
+    referenced = union(
+        select(queued.c.value["sha256"].astext.label("sha256")).select_from(EmailQueue).join(queued, literal(True)),
+        select(archived.c.value["sha256"].astext.label("sha256"))
+        .select_from(EmailQueueArchive)
+        .join(archived, literal(True))
+        .where(EmailQueueArchive.purgedAt.is_(None))
+    ).subquery()
+    # Las filas anteriores guardan base64 sin sha256; un NULL haría que NOT IN no borre nada
+    return select(referenced.c.sha256).where(referenced.c.sha256.isnot(None))
+
+
+def delete_orphan_attachment_blobs(unused_since, batch_size):
+    # Blobs que ningún correo en cola o archivado sin purgar referencia y sin uso desde unused_since
+    orphans = (
+        select(EmailAttachmentBlob.sha256)
+        .where(
+            EmailAttachmentBlob.lastUsedAt < unused_since,
+            EmailAttachmentBlob.sha256.not_in(_referenced_attachment_hashes())
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    deleted = db.session.execute(
+        delete(EmailAttachmentBlob)
+        .where(EmailAttachmentBlob.sha256.in_(orphans.scalar_subquery()), EmailAttachmentBlob.lastUsedAt < unused_since)
+        .returning(EmailAttachmentBlob.sha256)
+    ).all()
+    db.session.commit()
+    return len(deleted)
@@ -1,7 +1,8 @@
 from app.extensions import db
+from app.models.session import Session
 from app.models.session_binnacle import SessionBinnacle
 from app.models.user import User  # necesario para buscar por email
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, exists, select
 
 def create_session_binnacle(data):
     binnacle = SessionBinnacle(**data)
@@ -56,4 +57,42 @@ def get_binnacles_by_start_date_range(from_date, to_date=None):
             )
         ).all()
     else:
-        return query.filter(func.date(SessionBinnacle.startDate) >= from_date).all()
\ No newline at end of file
+        return query.filter(func.date(SessionBinnacle.startDate) >= from_date).all()
+
+
+def get_session_state_version(external_sesion_id):
+    # Cada cambio aplicado a una sesión deja una entrada en la bitácora: la última identifica su estado
+    return db.session.execute(
+        select(func.max(SessionBinnacle.idSesionBinnacle))
+        .where(SessionBinnacle.external_sesion_id == external_sesion_id)
+    ).scalar()
+
+
+def get_report_data_version(id_user, start_date, end_date):
+    # Versión de los datos del reporte de un usuario y rango: cantidad y último modifiedAt de las
+    # entradas de bitácora de toda sesión que tuvo alguna entrada en el rango (así cuenta también una
+    # sesión que se movió fuera del rango). La cantidad sube con cada cambio aunque los relojes de
+    # los procesos no coincidan. None si hay sesiones en curso: su duración depende de "ahora".
+    in_range = (
+        select(SessionBinnacle.idSesion)
+        .where(
+            SessionBinnacle.idUser == id_user,
+            SessionBinnacle.startDate >= start_date,
+            SessionBinnacle.startDate <= end_date
+        )
+    )
+    running = exists().where(
+        Session.idUser == id_user,
+        Session.startDate >= start_date,
+        Session.startDate <= end_date,
+        Session.enable == True,
+        Session.currentlyRunning == True
+    )
+    changes, last_modified, has_running = db.session.execute(
+        select(func.count(), func.max(SessionBinnacle.modifiedAt), running.correlate(None))
+        # Sin filtrar de nuevo por idUser: con él el planner recorre el índice del usuario por cada sesión
+        .where(SessionBinnacle.idSesion.in_(in_range))
+    ).one()
+    if has_running:
+        return None
+    return changes, last_modified
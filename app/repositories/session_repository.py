@@ -1,7 +1,11 @@
 from app.extensions import db
 from app.models.session import Session
+from app.models.session_binnacle import SessionBinnacle
 from app.models.user import User
-from sqlalchemy import func, and_
+from app.mappers.webhook_mapper import map_session_to_binnacle_data
+from itertools import groupby
+from sqlalchemy import func, and_, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
 
 def get_sessions_by_start_date(date):
     return Session.query.filter(func.date(Session.startDate) == date).all()
@@ -17,6 +21,43 @@ def get_sessions_by_start_date_range(from_date, to_date=None):
         ).all()
     else:
         return query.filter(func.date(Session.startDate) >= from_date).all()
+def iter_report_sessions_by_user(start_date, end_date, fetch_size):
+    # Todas las sesiones del periodo de los usuarios notificables en una sola consulta ordenada por
+    # usuario; yield_per las trae del cursor del servidor en tandas de fetch_size, así que en memoria
+    # quedan solo la tanda actual y las sesiones del usuario que se está armando
+    rows = db.session.execute(
+        select(User, Session)
+        .join(Session, Session.idUser == User.id)
+        .where(
+            User.enable == True,
+            User.indNotificar == True,
+            Session.startDate >= start_date,
+            Session.startDate <= end_date,
+            Session.enable == True
+        )
+        .order_by(Session.idUser, Session.startDate)
+        .execution_options(yield_per=fetch_size)
+    )
+    for _, group in groupby(rows, key=lambda row: row.Session.idUser):
+        group = list(group)
+        yield group[0].User, [row.Session for row in group]
+
+def iter_user_session_rows(id_user, start_date, end_date, columns, fetch_size):
+    # Solo las columnas del reporte (sin armar objetos Session), en tandas de fetch_size filas del
+    # cursor del servidor: un reporte de un año no se carga entero en memoria
+    result = db.session.execute(
+        select(*(getattr(Session, column) for column in columns))
+        .where(
+            Session.idUser == id_user,
+            Session.startDate >= start_date,
+            Session.startDate <= end_date,
+            Session.enable == True
+        )
+        .order_by(Session.startDate.asc())
+        .execution_options(yield_per=fetch_size)
+    )
+    yield from result.partitions()
+
 def list_sessions():
     return Session.query.all()
 
@@ -37,9 +78,27 @@ def get_sessions_by_user_email(email):
 def create_session(data):
     session = Session(**data)
     db.session.add(session)
+    db.session.flush()
+    # Como los webhooks, cada cambio queda en la bitácora (es la versión de datos de los reportes)
+    db.session.add(SessionBinnacle(**map_session_to_binnacle_data(session)))
     db.session.commit()
     return session
 
+# Se construye una sola vez: armar el insert ORM con RETURNING en cada webhook cuesta más que el round trip
+_upsert_session_stmt = insert(Session)
+_upsert_session_stmt = _upsert_session_stmt.on_conflict_do_update(
+    index_elements=[Session.external_sesion_id],
+    set_={"ExternalSesionId": _upsert_session_stmt.excluded.ExternalSesionId}
+).returning(Session, literal_column("xmax = 0").label("inserted"))
+
+def upsert_session_by_external_id(data):
+    # Un solo statement: inserta la sesión o bloquea y devuelve la existente sin modificarla.
+    # xmax = 0 solo en filas recién insertadas, así se distingue creación de conflicto.
+    session, inserted = db.session.execute(
+        _upsert_session_stmt, data, execution_options={"populate_existing": True}
+    ).one()
+    return session, inserted
+
 def update_session(session_id, data):
     session = Session.query.get(session_id)
     if not session:
@@ -49,6 +108,8 @@ def update_session(session_id, data):
         if hasattr(session, key):
             setattr(session, key, value)
 
+    db.session.flush()
+    db.session.add(SessionBinnacle(**map_session_to_binnacle_data(session)))
     db.session.commit()
     return session
 
@@ -57,6 +118,9 @@ def delete_session(session_id):
     if not session:
         return False
 
+    binnacle_data = map_session_to_binnacle_data(session)
+    binnacle_data.update(enable=False, disableTime=binnacle_data["modifiedAt"])
+    db.session.add(SessionBinnacle(**binnacle_data))
     db.session.delete(session)
     db.session.commit()
     return True
@@ -2,7 +2,8 @@ from app.extensions import db
 from app.models.user import User
 from datetime import datetime, UTC
 from app.models.session import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, or_, case, select
+from sqlalchemy.dialects.postgresql import insert
 
 def get_users_with_session_on(date):
     return (
@@ -117,4 +118,41 @@ def delete_user_by_external_id(external_id):
 
     db.session.delete(user)
     db.session.commit()
-    return True
\ No newline at end of file
+    return True
+
+def upsert_user_by_external_id(data):
+    # Un solo statement: inserta o actualiza nombre/estado, sin escribir si no cambiaron
+    stmt = insert(User).values(
+        external_user_id=data.get("ExternalUserId"),
+        name=data.get("name"),
+        email=data.get("email", ""),
+        hours_per_month=data.get("hoursPerMonth", 0),
+        enable=data.get("enable", True),
+        disabled_time=data.get("disabledTime"),
+        indNotificar=True
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.external_user_id],
+        set_={
+            "name": stmt.excluded.name,
+            "enable": stmt.excluded.enable,
+            "disableTime": case(
+                (User.enable.is_distinct_from(stmt.excluded.enable), stmt.excluded.disableTime),
+                else_=User.disabled_time
+            )
+        },
+        where=or_(
+            User.name.is_distinct_from(stmt.excluded.name),
+            User.enable.is_distinct_from(stmt.excluded.enable)
+        )
+    ).returning(
+        User.id, User.external_user_id, User.name, User.email, User.enable, User.indNotificar
+    )
+    row = db.session.execute(stmt).first()
+    if row is None:
+        # Conflicto sin cambios: no hubo escritura, se lee la fila existente
+        row = db.session.execute(
+            select(User.id, User.external_user_id, User.name, User.email, User.enable, User.indNotificar)
+            .where(User.external_user_id == data.get("ExternalUserId"))
+        ).first()
+    return row
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, UTC
+from app.extensions import db
+from app.models.webhook_delivery import WebhookDelivery
+from sqlalchemy import select, update, delete, or_, and_
+from sqlalchemy.dialects.postgresql import insert
+
+
+def claim_webhook_delivery(delivery_key, event_type, external_sesion_id, ttl_seconds, lease_seconds):
+    # Devuelve True si esta entrega es la primera, si la anterior ya venció o si quedó
+    # sin resultado más allá del lease (el worker que la procesaba murió).
+    # Se confirma de inmediato para que los demás workers vean el reclamo.
+    now = datetime.now(UTC)
+    values = {
+        "deliveryKey": delivery_key,
+        "eventType": event_type,
+        "externalSesionId": external_sesion_id,
+        "statusCode": None,
+        "response": None,
+        "sessionVersion": None,
+        "createdAt": now,
+        "expiresAt": now + timedelta(seconds=ttl_seconds),
+    }
+    stmt = insert(WebhookDelivery).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WebhookDelivery.deliveryKey],
+        set_={
+            key: stmt.excluded[key]
+            for key in ("statusCode", "response", "sessionVersion", "createdAt", "expiresAt")
+        },
+        where=or_(
+            WebhookDelivery.expiresAt < now,
+            and_(
+                WebhookDelivery.statusCode.is_(None),
+                WebhookDelivery.createdAt < now - timedelta(seconds=lease_seconds)
+            )
+        )
+    ).returning(WebhookDelivery.deliveryKey)
+    claimed = db.session.execute(stmt).first() is not None
+    db.session.commit()
+    return claimed
+
+
+def get_webhook_delivery_result(delivery_key):
+    return db.session.execute(
+        select(WebhookDelivery.statusCode, WebhookDelivery.response, WebhookDelivery.expiresAt,
+               WebhookDelivery.sessionVersion)
+        .where(WebhookDelivery.deliveryKey == delivery_key)
+    ).first()
+
+
+def reclaim_webhook_delivery(delivery_key, session_version, ttl_seconds):
+    # La misma clave con la sesión cambiada desde entonces (A -> B -> A): se vuelve a procesar.
+    # Compara y reemplaza: si dos entregas llegan a la vez, solo una reclama.
+    now = datetime.now(UTC)
+    claimed = db.session.execute(
+        update(WebhookDelivery)
+        .where(
+            WebhookDelivery.deliveryKey == delivery_key,
+            WebhookDelivery.statusCode.is_not(None),
+            WebhookDelivery.sessionVersion.is_not_distinct_from(session_version)
+        )
+        .values(statusCode=None, response=None, sessionVersion=None, createdAt=now,
+                expiresAt=now + timedelta(seconds=ttl_seconds))
+        .returning(WebhookDelivery.deliveryKey)
+    ).first() is not None
+    db.session.commit()
+    return claimed
+
+
+def complete_webhook_delivery(delivery_key, status_code, response, session_version):
+    db.session.execute(
+        update(WebhookDelivery)
+        .where(WebhookDelivery.deliveryKey == delivery_key)
+        .values(statusCode=status_code, response=response, sessionVersion=session_version)
+    )
+    db.session.commit()
+
+
+def release_webhook_delivery(delivery_key):
+    db.session.execute(delete(WebhookDelivery).where(WebhookDelivery.deliveryKey == delivery_key))
+    db.session.commit()
+
+
+def purge_expired_webhook_deliveries(limit=1000):
+    expired = (
+        select(WebhookDelivery.deliveryKey)
+        .where(WebhookDelivery.expiresAt < datetime.now(UTC))
+        .limit(limit)
+    )
+    result = db.session.execute(
+        delete(WebhookDelivery).where(WebhookDelivery.deliveryKey.in_(expired.scalar_subquery()))
+    )
+    db.session.commit()
+    return result.rowcount
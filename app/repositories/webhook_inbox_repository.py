@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta, UTC
+from app.extensions import db
+from app.models.webhook_inbox import WebhookInbox
+from sqlalchemy import select, update, func, or_, and_, exists
+from sqlalchemy.orm import aliased
+
+
+def create_inbox_entry(data):
+    entry = WebhookInbox(**data)
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
+
+def claim_inbox_entries(limit, lease_seconds, lanes=None):
+    # Reclama pendientes (o en proceso con lease vencido) sin bloquear a otros workers.
+    # Solo se toma la cabeza de cada sesión: si hay un evento anterior de la misma
+    # sesión sin terminar, el siguiente espera para respetar el orden de llegada.
+    now = datetime.now(UTC)
+    previous = aliased(WebhookInbox)
+    claimable = (
+        select(WebhookInbox.idInbox)
+        .where(
+            or_(
+                WebhookInbox.status == 0,
+                and_(
+                    WebhookInbox.status == 1,
+                    WebhookInbox.claimedAt < now - timedelta(seconds=lease_seconds)
+                )
+            ),
+            ~exists().where(
+                previous.externalSesionId == WebhookInbox.externalSesionId,
+                previous.idInbox < WebhookInbox.idInbox,
+                previous.status.in_([0, 1])
+            )
+        )
+        .order_by(WebhookInbox.idInbox)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    if lanes is not None:
+        claimable = claimable.where(WebhookInbox.lane.in_(lanes))
+    rows = db.session.execute(
+        update(WebhookInbox)
+        .where(WebhookInbox.idInbox.in_(claimable.scalar_subquery()))
+        .values(status=1, claimedAt=now, attempts=WebhookInbox.attempts + 1)
+        .returning(WebhookInbox.idInbox, WebhookInbox.eventType, WebhookInbox.payload, WebhookInbox.attempts)
+    ).all()
+    db.session.commit()
+    return sorted(rows, key=lambda row: row.idInbox)
+
+
+def mark_inbox_entry_processed(id_inbox):
+    db.session.execute(
+        update(WebhookInbox)
+        .where(WebhookInbox.idInbox == id_inbox)
+        .values(status=2, processedAt=datetime.now(UTC), lastError=None)
+    )
+    db.session.commit()
+
+
+def mark_inbox_entry_failed(id_inbox, error, retry=False):
+    db.session.execute(
+        update(WebhookInbox)
+        .where(WebhookInbox.idInbox == id_inbox)
+        .values(
+            status=0 if retry else 3,
+            claimedAt=None,
+            processedAt=None if retry else datetime.now(UTC),
+            lastError=str(error)
+        )
+    )
+    db.session.commit()
+
+
+def get_inbox_stats():
+    now = datetime.now(UTC)
+    counts = dict(
+        db.session.query(WebhookInbox.status, func.count(WebhookInbox.idInbox))
+        .filter(WebhookInbox.status.in_([0, 1, 3]))
+        .group_by(WebhookInbox.status)
+        .all()
+    )
+    oldest_pending = (
+        db.session.query(func.min(WebhookInbox.receivedAt))
+        .filter(WebhookInbox.status.in_([0, 1]))
+        .scalar()
+    )
+    last_processed = (
+        db.session.query(WebhookInbox.receivedAt, WebhookInbox.processedAt)
+        .filter(WebhookInbox.status == 2)
+        .order_by(WebhookInbox.idInbox.desc())
+        .first()
+    )
+    return {
+        "pending": counts.get(0, 0),
+        "processing": counts.get(1, 0),
+        "failed": counts.get(3, 0),
+        "oldestPendingSeconds": round((now - oldest_pending).total_seconds(), 3) if oldest_pending else 0,
+        "lastProcessingLagSeconds": round(
+            (last_processed.processedAt - last_processed.receivedAt).total_seconds(), 3
+        ) if last_processed else None
+    }
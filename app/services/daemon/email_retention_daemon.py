@@ -0,0 +1,33 @@
+import os
+import time
+from threading import Event
+from app.extensions import db
+from app.use_cases.email_retention import run_email_retention
+from app.use_cases.manage_error_log import log_error_use_case
+
+EMAIL_RETENTION_INTERVAL = int(os.getenv("EMAIL_RETENTION_INTERVAL", 3600))  # segundos, 0 = desactivado
+
+
+def start_email_retention(app):
+    print("Iniciando job de retención de email_queue", flush=True)
+    stop_event = Event()
+
+    while not stop_event.is_set():
+        try:
+            with app.app_context():
+                result = run_email_retention()
+                if any(result.values()):
+                    print(f"[EMAIL RETENCION] {result}", flush=True)
+
+        except Exception as e:
+            with app.app_context():
+                db.session.rollback()
+                log_error_use_case(
+                    endpoint="/email-retention",
+                    method="SYSTEM",
+                    error=e,
+                    payload={"message": "Error en la retención de email_queue"},
+                    response_code=500
+                )
+
+        time.sleep(EMAIL_RETENTION_INTERVAL)
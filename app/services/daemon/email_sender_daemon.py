@@ -1,48 +1,197 @@
-import time
 import os
-from datetime import datetime, UTC
+import random
+import socket
+from datetime import datetime, timedelta, UTC
 from app.extensions import db
-from app.models.email_queue import EmailQueue
-from app.services.mail_service_manual import send_webhook_email
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.repositories.email_queue_repository import (
+    claim_queued_emails,
+    get_next_email_due_at,
+    mark_email_sent,
+    mark_email_failed,
+    defer_email
+)
+from app.services.mail_service_manual import send_webhook_email, get_fixed_recipients
+from app.services.email_queue_service import load_email_attachments
+from app.services.notification_templates import render_digest
+from app.services.notification_service import EMAIL_DIGEST_WINDOW
 from app.use_cases.manage_error_log import log_error_use_case
-from threading import Event
+from app.services.email_wakeup import wait_for_email
+from app.services.smtp_pool import MAIL_POOL_SIZE
+from app.services.smtp_rate_limiter import MAIL_THROTTLE_BACKOFF, get_smtp_rate_limiter, is_throttled
+from app.services.metrics import EMAIL_QUEUE_DELAY, EMAIL_RETRIES, EMAIL_PERMANENT_FAILURES, EMAIL_THROTTLED
+from threading import Event, Lock, get_ident
 
 MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", 3))
-PROCESS_INTERVAL = int(os.getenv("EMAIL_PROCESS_INTERVAL", 5))  # segundos
+PROCESS_INTERVAL = int(os.getenv("EMAIL_PROCESS_INTERVAL", 30))  # segundos, sondeo de respaldo si no llega aviso
+BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 5))
+LEASE_SECONDS = int(os.getenv("EMAIL_LEASE_SECONDS", 300))  # un sender caído libera sus correos tras este tiempo
+RETRY_DELAY = int(os.getenv("EMAIL_RETRY_DELAY", 30))  # segundos antes del primer reintento, se duplica en cada fallo
+RETRY_MAX_DELAY = int(os.getenv("EMAIL_RETRY_MAX_DELAY", 3600))
+# Envíos SMTP en paralelo por proceso; cada hilo usa su propia conexión del pool
+SEND_CONCURRENCY = max(1, int(os.getenv("EMAIL_SEND_CONCURRENCY", MAIL_POOL_SIZE)))
+
+_dispatch_pool = None
+_dispatch_pool_lock = Lock()
+
+
+def next_attempt_at(retries):
+    # Backoff exponencial con jitter: la mitad fija y la otra mitad al azar, para que los
+    # correos que fallaron juntos (relay caído) no reintenten todos en el mismo instante
+    delay = min(RETRY_MAX_DELAY, RETRY_DELAY * 2 ** retries)
+    return datetime.now(UTC) + timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+def build_sender_id():
+    # Único entre hilos, workers de gunicorn y contenedores
+    return f"{socket.gethostname()}:{os.getpid()}:{get_ident()}"
+
+
+def group_email_deliveries(emails, fixed_recipients):
+    """(destinatarios, correos) por envío. Los correos normales salen solos a los destinatarios de
+    siempre; las notificaciones en modo resumen van todas juntas a los destinatarios fijos y
+    agrupadas por usuario a cada usuario."""
+    deliveries, digest, by_user = [], [], {}
+    for email in emails:
+        if email.digestEntry is None:
+            deliveries.append((None, [email]))
+            continue
+        digest.append(email)
+        if email.toAddress not in fixed_recipients:
+            by_user.setdefault(email.toAddress, []).append(email)
+    if len(by_user) <= 1:
+        # Un solo usuario en la ventana: un correo para todos, como sin resumen
+        if digest:
+            deliveries.append((fixed_recipients + list(by_user), digest))
+    else:
+        deliveries.append((fixed_recipients, digest))
+        deliveries.extend(([address], group) for address, group in by_user.items())
+    return deliveries
+
+
+def _handle_send_failure(email, worker_id, error):
+    if is_throttled(error):
+        # Límite del proveedor: se reprograma sin gastar un reintento
+        defer_email(email.idEncolado, worker_id,
+                    datetime.now(UTC) + timedelta(seconds=MAIL_THROTTLE_BACKOFF * random.uniform(1, 1.5)))
+        EMAIL_THROTTLED.inc()
+        return
+    retries = mark_email_failed(email.idEncolado, worker_id, MAX_RETRIES, next_attempt_at(email.retries))
+    if retries is not None:  # None: otro sender ya tomó el correo tras vencer el lease
+        (EMAIL_PERMANENT_FAILURES if retries >= MAX_RETRIES else EMAIL_RETRIES).inc()
+    log_error_use_case(
+        endpoint="/email-daemon",
+        method="SYSTEM",
+        error=error,
+        payload={"emailId": email.idEncolado, "body": email.body, "subject": email.subject, "retries": retries},
+        response_code=500
+    )
+
+
+def _observe_sent(emails, kind):
+    now = datetime.now(UTC)
+    for email in emails:
+        EMAIL_QUEUE_DELAY.observe((now - email.createdAt).total_seconds(), kind=kind)
+
+
+def _get_dispatch_pool():
+    global _dispatch_pool
+    with _dispatch_pool_lock:
+        if _dispatch_pool is None:
+            _dispatch_pool = ThreadPoolExecutor(max_workers=SEND_CONCURRENCY, thread_name_prefix="smtp-send")
+        return _dispatch_pool
+
+
+def _send_delivery(app, limiter, message):
+    # Corre en un hilo del pool: solo SMTP (y el log de error de send_webhook_email), sin tocar la sesión del sender
+    with app.app_context():
+        if limiter:
+            limiter.acquire()
+        try:
+            send_webhook_email(**message)
+        except Exception as e:
+            if limiter and is_throttled(e):
+                limiter.pause(MAIL_THROTTLE_BACKOFF)
+            raise
+
+
+def process_email_batch(worker_id, batch_size=BATCH_SIZE):
+    """Reclama y envía un lote; devuelve cuántos correos reclamó. Requiere app context."""
+    emails = claim_queued_emails(worker_id, batch_size, LEASE_SECONDS, EMAIL_DIGEST_WINDOW)
+    if not emails:
+        return 0
+    app = current_app._get_current_object()
+    limiter = get_smtp_rate_limiter(app.config)
+
+    # Se arma cada mensaje en este hilo (plantillas y adjuntos desde la base) y se envían en paralelo;
+    # los resultados se marcan después, también en este hilo
+    sends = []
+    for recipients, group in group_email_deliveries(emails, get_fixed_recipients()):
+        email = group[0]
+        try:
+            if len(group) > 1:
+                subject, body = render_digest([queued.digestEntry for queued in group])
+            else:
+                subject, body = email.subject, email.body
+            message = {
+                "subject": subject,
+                "data": body,
+                "user_email": email.toAddress,
+                "attachments": load_email_attachments(email.attachments),
+                "attempt": max(queued.retries for queued in group),
+                "recipients": recipients
+            }
+        except Exception as e:
+            db.session.rollback()
+            sends.append((recipients, group, None, e))
+            continue
+        sends.append((recipients, group, _get_dispatch_pool().submit(_send_delivery, app, limiter, message), None))
+
+    digest_failures = {}
+    for recipients, group, future, error in sends:
+        if future is not None:
+            error = future.exception()
+        if recipients is None:
+            if error is None:
+                # Vacío: el lease venció durante el envío y otro sender ya reclamó el correo
+                if mark_email_sent(worker_id, group[0].idEncolado):
+                    _observe_sent(group, "single")
+            else:
+                _handle_send_failure(group[0], worker_id, error)
+        elif error is not None:
+            for queued in group:
+                digest_failures.setdefault(queued.idEncolado, error)
+
+    # Una notificación del resumen queda enviada si salieron su resumen general y el de su usuario;
+    # si falló alguno se reintenta completa (puede repetirse en el otro resumen)
+    digest = [email for email in emails if email.digestEntry is not None]
+    sent = [email for email in digest if email.idEncolado not in digest_failures]
+    if sent:
+        marked = set(mark_email_sent(worker_id, *(email.idEncolado for email in sent)))
+        _observe_sent([email for email in sent if email.idEncolado in marked], "digest")
+    for email in digest:
+        if email.idEncolado in digest_failures:
+            _handle_send_failure(email, worker_id, digest_failures[email.idEncolado])
+    return len(emails)
+
 
 def start_email_sender(app):
-    print("Iniciando daemon de desencolamiento de correos", flush=True)
+    worker_id = build_sender_id()
+    print(f"Iniciando daemon de desencolamiento de correos ({worker_id})", flush=True)
     stop_event = Event()
 
     while not stop_event.is_set():
+        claimed = 0
+        wait_seconds = PROCESS_INTERVAL
         try:
             with app.app_context():
-                emails = EmailQueue.query.filter_by(status=0).order_by(EmailQueue.createdAt).limit(5).all()
-
-                for email in emails:
-                    try:
-                        send_webhook_email(
-                            subject=email.subject,
-                            data=email.body,
-                            user_email=email.toAddress,
-                            attachments=email.attachments,
-                            attempt=email.retries
-                        )
-                        email.status = 1
-                        email.sentAt = datetime.now(UTC)
-                    except Exception as e:
-                        email.retries += 1
-                        if email.retries >= MAX_RETRIES:
-                            email.status = 2  # fallido permanente
-                        log_error_use_case(
-                            endpoint="/email-daemon",
-                            method="SYSTEM",
-                            error=e,
-                            payload={"emailId": email.idEncolado, "body": email.body, "subject": email.subject, "retries": email.retries},
-                            response_code=500
-                        )
-                    finally:
-                        db.session.commit()
+                claimed = process_email_batch(worker_id)
+                if not claimed:
+                    # Despertar también cuando venza el próximo reintento programado
+                    due_at = get_next_email_due_at()
+                    if due_at:
+                        wait_seconds = min(PROCESS_INTERVAL, max(0.05, (due_at - datetime.now(UTC)).total_seconds()))
 
         except Exception as outer_e:
             with app.app_context():
@@ -51,8 +200,10 @@ def start_email_sender(app):
                     endpoint="/email-daemon",
                     method="SYSTEM",
                     error=outer_e,
-                    payload={"error": "Error general del loop"},
+                    payload={"error": "Error general del loop", "worker": worker_id},
                     response_code=500
                 )
 
-        time.sleep(PROCESS_INTERVAL)
+        # Mientras haya trabajo se drena sin pausa; si no, se espera el aviso de enqueue_email
+        if not claimed:
+            wait_for_email(wait_seconds)
@@ -0,0 +1,64 @@
+import time
+from threading import Event
+from app.extensions import db
+from app.repositories.webhook_inbox_repository import (
+    claim_inbox_entries,
+    mark_inbox_entry_processed,
+    mark_inbox_entry_failed
+)
+from app.use_cases.dispatch_webhook import dispatch_webhook_use_case
+from app.use_cases.manage_error_log import log_error_use_case
+from app.services.webhook_dispatcher import get_worker_lanes
+from app.services.webhook_dedup_service import run_deduplicated
+
+
+def start_webhook_inbox_worker(app, worker_id=0):
+    print(f"Iniciando worker {worker_id} del inbox de webhooks", flush=True)
+    stop_event = Event()
+    interval = app.config["WEBHOOK_INBOX_INTERVAL"]
+    batch_size = app.config["WEBHOOK_INBOX_BATCH_SIZE"]
+    max_attempts = app.config["WEBHOOK_INBOX_MAX_ATTEMPTS"]
+    lease_seconds = app.config["WEBHOOK_INBOX_LEASE_SECONDS"]
+    # Cada worker drena solo sus carriles; el orden por sesión se mantiene dentro del carril
+    lanes = get_worker_lanes(worker_id, app.config["WEBHOOK_INBOX_WORKERS"], app.config["WEBHOOK_INBOX_LANES"])
+
+    while not stop_event.is_set():
+        claimed = 0
+        try:
+            with app.app_context():
+                entries = claim_inbox_entries(batch_size, lease_seconds, lanes)
+                claimed = len(entries)
+
+                for entry in entries:
+                    try:
+                        # Una reentrega de Clockify ya procesada (misma clave, sesión sin cambios) no se reaplica
+                        _, status_code, _ = run_deduplicated(
+                            entry.eventType, entry.payload,
+                            lambda: (dispatch_webhook_use_case(entry.eventType, entry.payload), 200)
+                        )
+                        if status_code == 409:
+                            # La misma entrega se está procesando en otro proceso: se reintenta después
+                            mark_inbox_entry_failed(entry.idInbox, "Duplicate delivery in progress", retry=True)
+                            continue
+                        mark_inbox_entry_processed(entry.idInbox)
+                    except (ValueError, LookupError) as business_error:
+                        # El caso de uso ya registró el error, reintentar no cambia el resultado
+                        mark_inbox_entry_failed(entry.idInbox, business_error)
+                    except Exception as e:
+                        db.session.rollback()
+                        mark_inbox_entry_failed(entry.idInbox, e, retry=entry.attempts < max_attempts)
+
+        except Exception as outer_e:
+            with app.app_context():
+                db.session.rollback()
+                log_error_use_case(
+                    endpoint="/webhook-inbox-daemon",
+                    method="SYSTEM",
+                    error=outer_e,
+                    payload={"error": "Error general del loop", "worker": worker_id},
+                    response_code=500
+                )
+
+        # Mientras haya trabajo se drena sin pausa
+        if not claimed:
+            time.sleep(interval)
@@ -1,15 +1,67 @@
+import base64
 from app.extensions import db
 from app.models.email_queue import EmailQueue
 from app.mappers.email_queue_mapper import map_email_to_queue_entity
 from app.validators.email_queue_validator import validate_email_queue_data
 from app.use_cases.manage_error_log import log_error_use_case
+from app.services.email_wakeup import signal_email_enqueued
+from app.repositories.email_attachment_repository import store_attachment_blobs, load_attachment_blobs
+from sqlalchemy import insert
 from sqlalchemy.exc import SQLAlchemyError
 
 
-def enqueue_email(subject, data, to_address, attachments=None):
+def store_email_attachments_batch(attachment_lists):
+    """Guarda en un solo INSERT los adjuntos de varios correos; devuelve las referencias de cada uno."""
+    pairs = []
+    for attachments in attachment_lists:
+        for att in attachments or []:
+            content = att.get("content")
+            if content is None:
+                content = base64.b64decode(att["content_bytes"])  # formato anterior
+            pairs.append((att, content))
+    hashes = iter(store_attachment_blobs([content for _, content in pairs]))
+    pairs = iter(pairs)
+
+    references = []
+    for attachments in attachment_lists:
+        references.append([])
+        for _ in attachments or []:
+            att, content = next(pairs)
+            references[-1].append({
+                "filename": att["filename"],
+                "mime_type": att["mime_type"],
+                "sha256": next(hashes),
+                "size": len(content)
+            })
+    return references
+
+
+def store_email_attachments(attachments):
+    """Guarda los bytes en email_attachment_blobs y devuelve las referencias que van en email_queue."""
+    return store_email_attachments_batch([attachments])[0]
+
+
+def load_email_attachments(references):
+    """Bytes de los adjuntos de un correo reclamado; las filas anteriores traen base64 en el JSONB."""
+    blobs = load_attachment_blobs([ref["sha256"] for ref in references or [] if "sha256" in ref])
+    attachments = []
+    for ref in references or []:
+        if "sha256" in ref:
+            if ref["sha256"] not in blobs:
+                raise LookupError(f"Attachment {ref['filename']} ({ref['sha256']}) not found")
+            content = blobs[ref["sha256"]]
+        else:
+            content = base64.b64decode(ref["content_bytes"])
+        attachments.append({"filename": ref["filename"], "mime_type": ref["mime_type"], "content": content})
+    return attachments
+
+
+def enqueue_email(subject, data, to_address, attachments=None, commit=True, digest_entry=None, delay=0):
     try:
         # Mapear y validar
-        data = map_email_to_queue_entity(to_address, subject, data, attachments)
+        data = map_email_to_queue_entity(
+            to_address, subject, data, store_email_attachments(attachments), digest_entry=digest_entry, delay=delay
+        )
         is_valid, errors = validate_email_queue_data(data)
 
         if not is_valid:
@@ -18,9 +70,13 @@ def enqueue_email(subject, data, to_address, attachments=None):
         # Crear y guardar en base de datos
         email = EmailQueue(**data)
         db.session.add(email)
-        db.session.commit()
+        signal_email_enqueued(db.session)
+        if commit:
+            db.session.commit()
 
     except ValueError as ve:
+        if not commit:
+            raise
         # Error de validación explícito
         log_error_use_case(
             endpoint="enqueue_email",
@@ -32,6 +88,8 @@ def enqueue_email(subject, data, to_address, attachments=None):
         raise ve
 
     except SQLAlchemyError as db_err:
+        if not commit:
+            raise
         # Error al interactuar con la base de datos
         db.session.rollback()
         log_error_use_case(
@@ -44,6 +102,8 @@ def enqueue_email(subject, data, to_address, attachments=None):
         raise RuntimeError("Database error while enqueuing email") from db_err
 
     except Exception as e:
+        if not commit:
+            raise
         # Otro error inesperado
         db.session.rollback()
         log_error_use_case(
@@ -54,3 +114,56 @@ def enqueue_email(subject, data, to_address, attachments=None):
             response_code=500
         )
         raise RuntimeError("Unexpected error while enqueuing email") from e
+
+
+def enqueue_emails(batch, commit=True):
+    """Encola varios correos con un solo INSERT multi-fila y un commit.
+
+    Cada elemento es un dict con subject, data, to_address y opcionalmente attachments. Las filas
+    inválidas se omiten sin frenar al resto (y con commit se registran en error_logs); devuelve
+    (cantidad encolada, [{"index", "to", "subject", "errors"}]).
+    """
+    rows, attachment_lists, rejected = [], [], []
+    for index, item in enumerate(batch):
+        row = map_email_to_queue_entity(item.get("to_address"), item.get("subject"), item.get("data"))
+        is_valid, errors = validate_email_queue_data(row)
+        if not is_valid:
+            rejected.append({"index": index, "to": item.get("to_address"), "subject": item.get("subject"),
+                             "errors": errors})
+            continue
+        rows.append(row)
+        attachment_lists.append(item.get("attachments"))
+
+    try:
+        for row, references in zip(rows, store_email_attachments_batch(attachment_lists)):
+            row["attachments"] = references
+        if rows:
+            db.session.execute(insert(EmailQueue).values(rows))
+            signal_email_enqueued(db.session)
+        if commit:
+            db.session.commit()
+
+    except SQLAlchemyError as db_err:
+        if not commit:
+            raise
+        db.session.rollback()
+        log_error_use_case(
+            endpoint="enqueue_emails",
+            method="SYSTEM",
+            error=db_err,
+            payload={"count": len(rows), "to": [row["toAddress"] for row in rows]},
+            response_code=500
+        )
+        raise RuntimeError("Database error while enqueuing emails") from db_err
+
+    # log_error_use_case confirma su propia escritura: con commit=False lo decide el llamador
+    if commit:
+        for failure in rejected:
+            log_error_use_case(
+                endpoint="enqueue_emails",
+                method="SYSTEM",
+                error=ValueError(f"Invalid email queue data: {failure['errors']}"),
+                payload=failure,
+                response_code=422
+            )
+    return len(rows), rejected
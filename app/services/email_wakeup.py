@@ -0,0 +1,79 @@
+import time
+import select
+from threading import Condition, Event
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from app.extensions import db
+
+EMAIL_CHANNEL = "email_queue"
+LISTEN_RECONNECT_DELAY = 5  # segundos
+
+_condition = Condition()
+_pending = False  # evita perder un aviso que llega mientras el sender está enviando
+
+
+def wake_email_senders():
+    global _pending
+    with _condition:
+        _pending = True
+        _condition.notify_all()
+
+
+def wait_for_email(timeout):
+    """Bloquea hasta que se encole un correo o pase timeout (el sondeo queda como red de seguridad)."""
+    global _pending
+    with _condition:
+        if not _pending:
+            _condition.wait(timeout)
+        woken, _pending = _pending, False
+        return woken
+
+
+def signal_email_enqueued(session):
+    # NOTIFY viaja con la transacción: los senders de otros procesos solo se despiertan si se confirma.
+    # Postgres ya agrupa avisos iguales de una transacción; el flag evita el statement extra.
+    if not session.info.get("email_enqueued"):
+        session.execute(text("SELECT pg_notify(:channel, '')"), {"channel": EMAIL_CHANNEL})
+        session.info["email_enqueued"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session):
+    if session.info.pop("email_enqueued", False):
+        wake_email_senders()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("email_enqueued", False)
+
+
+def listen_for_email_notifications(app, poll_timeout=60):
+    """LISTEN en una conexión dedicada: despierta a los senders de este proceso cuando otro encola."""
+    stop_event = Event()
+    while not stop_event.is_set():
+        connection = None
+        try:
+            with app.app_context():
+                connection = db.engine.raw_connection()
+            raw = connection.driver_connection
+            raw.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with raw.cursor() as cursor:
+                cursor.execute(f"LISTEN {EMAIL_CHANNEL}")
+            while not stop_event.is_set():
+                if select.select([raw], [], [], poll_timeout) == ([], [], []):
+                    continue
+                raw.poll()
+                if raw.notifies:
+                    raw.notifies.clear()
+                    wake_email_senders()
+        except Exception as e:
+            print(f"[EMAIL] LISTEN {EMAIL_CHANNEL} interrumpido, reintentando: {e}", flush=True)
+            time.sleep(LISTEN_RECONNECT_DELAY)
+        finally:
+            if connection is not None:
+                try:
+                    connection.invalidate()  # no devolver al pool una conexión en LISTEN
+                except Exception:
+                    pass
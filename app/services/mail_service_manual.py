@@ -1,73 +1,78 @@
 import smtplib
-import time
 import os
-import base64
 from email.message import EmailMessage
 from flask import current_app
 from app.use_cases.manage_error_log import log_error_use_case
+from app.services.smtp_pool import get_smtp_pool
+from app.services.metrics import SMTP_SEND_DURATION
 
 MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", 3))
 RETRY_DELAY = int(os.getenv("EMAIL_RETRY_DELAY", 5))  # segundos
 
-def send_webhook_email(subject, data, user_email=None, attachments=None, attempt=0):
-    smtp_server = current_app.config["MAIL_SERVER"]
-    smtp_port = current_app.config["MAIL_PORT"]
-    username = current_app.config["MAIL_USERNAME"]
-    password = current_app.config["MAIL_PASSWORD"]
-    sender = current_app.config["MAIL_DEFAULT_SENDER"]
-    main_recipient = current_app.config["MAIL_RECIPIENT"]
+def build_email_message(subject, data, sender, recipients, attachments=None):
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = sender
+    msg["To"] = ', '.join(recipients)
+    msg.set_content("Este correo contiene contenido HTML. Por favor usa un cliente compatible.")
+    msg.add_alternative(data, subtype='html', charset="utf-8")
+
+    if attachments:
+        for att in attachments:
+            maintype, subtype = att["mime_type"].split("/", 1)
+            msg.add_attachment(att["content"], maintype=maintype, subtype=subtype, filename=att["filename"])
+    return msg
+
 
+def _log_connection_error(e, data):
+    print(f"Error al conectar con servidor SMTP: {str(e)}")
+    log_error_use_case(
+        endpoint="send_email",
+        method="POST",
+        error=e,
+        payload={"message": data},
+        response_code=500
+    )
+
+
+def get_fixed_recipients():
+    """MAIL_RECIPIENT y MAIL_ADDITIONAL_RECIPIENTS: reciben copia de todas las notificaciones."""
     additional_recipients_raw = current_app.config.get("MAIL_ADDITIONAL_RECIPIENTS", "")
     additional_recipients = [email.strip() for email in additional_recipients_raw.split(",") if email.strip()]
-    recipients = [main_recipient] + additional_recipients
+    return [current_app.config["MAIL_RECIPIENT"]] + additional_recipients
 
-    if user_email and user_email != main_recipient:
-        recipients.append(user_email)
 
-    try:
-        with smtplib.SMTP(smtp_server, smtp_port, timeout=10) as server:
-            server.ehlo()
-            server.starttls()
-            server.ehlo()
-            server.login(username, password)
-            try:
-                msg = EmailMessage()
-                msg["Subject"] = subject
-                msg["From"] = sender
-                msg["To"] = ', '.join(recipients)
-                msg.set_content("Este correo contiene contenido HTML. Por favor usa un cliente compatible.")
-                msg.add_alternative(data, subtype='html', charset="utf-8")
+def send_webhook_email(subject, data, user_email=None, attachments=None, attempt=0, recipients=None):
+    sender = current_app.config["MAIL_DEFAULT_SENDER"]
 
-                if attachments:
-                    for att in attachments:
-                        filename = att["filename"]
-                        content_bytes = base64.b64decode(att["content_bytes"])  # Decode base64
-                        mime_type = att["mime_type"]
-                        maintype, subtype = mime_type.split("/", 1)
-                        msg.add_attachment(content_bytes, maintype=maintype, subtype=subtype, filename=filename)
+    # Sin destinatarios explícitos (resúmenes) van los fijos más el usuario
+    if recipients is None:
+        recipients = get_fixed_recipients()
+        if user_email and user_email not in recipients:
+            recipients.append(user_email)
 
-                server.send_message(msg)
-                print(f"Correo enviado a {', '.join(recipients)}")
-                return  # Éxito salir del bucle de reintento
+    msg = build_email_message(subject, data, sender, recipients, attachments)
+    try:
+        # Conexión autenticada reutilizada entre correos (ver smtp_pool)
+        with SMTP_SEND_DURATION.time(result="ok"):
+            get_smtp_pool(current_app.config).send_message(msg)
+        print(f"Correo enviado a {', '.join(recipients)}")
 
-            except smtplib.SMTPException as e:
-                        print(f"Error al enviar a {', '.join(recipients)} (intento {attempt}): {str(e)}")
-                        log_error_use_case(
-                            endpoint="send_email",
-                            method="POST",
-                            error=e,
-                            payload={"message": data, "recipient": ', '.join(recipients), "attempt": attempt, "subject": subject},
-                            response_code=500
-                        )
-            raise e
+    except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError) as e:
+        _log_connection_error(e, data)
+        raise
 
-    except Exception as e:
-        print(f"Error al conectar con servidor SMTP: {str(e)}")
+    except smtplib.SMTPException as e:
+        print(f"Error al enviar a {', '.join(recipients)} (intento {attempt}): {str(e)}")
         log_error_use_case(
             endpoint="send_email",
             method="POST",
             error=e,
-            payload={"message": data},
+            payload={"message": data, "recipient": ', '.join(recipients), "attempt": attempt, "subject": subject},
             response_code=500
         )
-        raise e
+        raise
+
+    except Exception as e:
+        _log_connection_error(e, data)
+        raise
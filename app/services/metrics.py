@@ -0,0 +1,138 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+
+# Métricas del proceso en formato de texto de Prometheus. Contadores e histogramas viven en memoria
+# (se reinician con el proceso); los valores de la base, como la profundidad de la cola, se calculan
+# al consultar el endpoint y se pasan a render_metrics.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # segundos
+QUEUE_DELAY_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200, 21600)  # segundos
+
+_registry = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.type = "counter"
+        self.labels = tuple(labels)
+        self._values = {} if labels else {(): 0}  # sin labels se expone en 0 desde el arranque
+        self._lock = Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.type = "histogram"
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # clave de labels -> [conteo por bucket..., +Inf], suma
+        self._lock = Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observa la duración del bloque; labels["result"], si existe, pasa a "error" cuando falla."""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            if "result" in labels:
+                labels["result"] = "error"
+            raise
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                yield f"{self.name}_bucket", {**labels, "le": le}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class GaugeSnapshot:
+    """Valor calculado al momento de la consulta (por ejemplo desde la base); no se registra."""
+
+    def __init__(self, name, documentation, values):
+        self.name = name
+        self.documentation = documentation
+        self.type = "gauge"
+        self.values = values  # lista de (labels, valor)
+
+    def samples(self):
+        for labels, value in self.values:
+            yield self.name, labels, value
+
+
+def render_metrics(snapshots=()):
+    lines = []
+    for metric in (*snapshots, *_registry):
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Ruta de los correos: encolado -> daemon -> pool SMTP -> proveedor
+EMAIL_QUEUE_DELAY = Histogram(
+    "email_enqueue_to_send_seconds", "Tiempo desde que se encola un correo hasta que se envía.",
+    labels=("kind",), buckets=QUEUE_DELAY_BUCKETS
+)
+EMAIL_RETRIES = Counter("email_retries_total", "Envíos fallidos que se reprograman con backoff.")
+EMAIL_PERMANENT_FAILURES = Counter("email_permanent_failures_total",
+                                   "Correos que agotaron EMAIL_MAX_RETRIES y quedaron como fallidos.")
+EMAIL_THROTTLED = Counter("email_throttled_total",
+                          "Correos reprogramados por un 421/450/451 del proveedor, sin gastar reintento.")
+SMTP_CONNECT_DURATION = Histogram("smtp_connect_seconds",
+                                  "Duración de abrir una conexión SMTP (connect, ehlo, starttls y login).",
+                                  labels=("result",))
+SMTP_SEND_DURATION = Histogram("smtp_send_seconds", "Duración del envío de un mensaje por el pool SMTP.",
+                               labels=("result",))
+
+# Reportes personalizados
+REPORT_CACHE_LOOKUPS = Counter("report_cache_lookups_total",
+                               "Búsquedas en la caché de reportes personalizados (hit, miss o bypass con sesiones en curso).",
+                               labels=("result",))
@@ -0,0 +1,38 @@
+import os
+from flask import current_app
+from app.services.email_queue_service import enqueue_email
+from app.services.notification_templates import render_notification, build_digest_entry
+
+# Modo resumen: con ventana > 0 las notificaciones de un mismo destinatario se juntan en un solo correo
+EMAIL_DIGEST_WINDOW = int(os.getenv("EMAIL_DIGEST_WINDOW", 0))  # segundos, 0 = desactivado
+EMAIL_DIGEST_URGENT = {
+    name.strip() for name in os.getenv("EMAIL_DIGEST_URGENT", "session_overtime").split(",") if name.strip()
+}
+
+
+def enqueue_notification(subject, data, to_address=None, attachments=None, digest_entry=None, delay=0):
+    """Encola una notificación dentro de la transacción del llamador y retorna de inmediato.
+
+    El correo queda en email_queue cuando el llamador confirma su transacción y lo envía
+    email_sender_daemon; si la transacción se revierte, la notificación se descarta con ella.
+    Nunca abre una conexión SMTP.
+    """
+    # Sin destinatario propio el correo va solo a los destinatarios fijos
+    to_address = to_address or current_app.config["MAIL_RECIPIENT"]
+    enqueue_email(subject, data, to_address, attachments=attachments, commit=False,
+                  digest_entry=digest_entry, delay=delay)
+
+
+def enqueue_template_notification(name, ctx):
+    """Renderiza la plantilla de correo `name` con el contexto dado y la encola para el usuario.
+
+    En modo resumen la notificación espera EMAIL_DIGEST_WINDOW segundos: cuando vence la más
+    antigua de un destinatario, el daemon envía todas las pendientes de ese destinatario juntas
+    (una sola queda como correo normal). Las de EMAIL_DIGEST_URGENT salen de inmediato.
+    """
+    subject, body = render_notification(name, ctx)
+    if EMAIL_DIGEST_WINDOW > 0 and name not in EMAIL_DIGEST_URGENT:
+        enqueue_notification(subject, body, to_address=ctx.user_email,
+                             digest_entry=build_digest_entry(name, ctx), delay=EMAIL_DIGEST_WINDOW)
+    else:
+        enqueue_notification(subject, body, to_address=ctx.user_email)
@@ -0,0 +1,167 @@
+import os
+from datetime import datetime, timedelta, tzinfo
+from typing import NamedTuple, Optional
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, StrictUndefined
+from app.services.utility.get_timezone import get_timezone
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "email")
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR")  # bytecode compilado compartido entre procesos
+
+LOCAL_FORMAT = "%Y-%m-%d %H:%M:%S %Z"
+SUBJECT_DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+# nombre de plantilla -> asunto (str.format, texto plano); el cuerpo vive en templates/email/<nombre>.html
+NOTIFICATION_SUBJECTS = {
+    "session_started": "Clockify - Sesión iniciada correctamente - {user_name} - ({now})",
+    "session_start_duplicate": "Clockify - ERROR: Sesión ya existe - {user_name} - ({now})",
+    "session_ended": "Clockify - Sesion Finalizada - {user_name} - ({now})",
+    "session_created_on_end": "Clockify - Sesión creada desde cierre (no existía) - {user_name} - ({now})",
+    "session_created_on_edit": "Clockify - Reporte de creación de jornada desde edición - {user_name} - ({now})",
+    "session_change_detected": "Clockify - ALERTA: EDICIÓN de sesión Clockify REPORTE - {user_name} - ({now})",
+    "session_deleted": "Clockify - Confirmación de BORRADO de sesión Clockify - {user_name} - ({now})",
+    "session_delete_invalid": "Clockify - ERROR: Sesión no encontrada en borrado - {user_name} - ({now})",
+    "session_manual": "Clockify - ALERTA: Sesion creada manualmente en Clockify - {user_name} - ({now})",
+    "session_overtime": "Clockify - SESION en OVERTIME detectada",
+}
+
+# Resumen (modo digest): una fila por notificación agrupada, ver notification_service
+DIGEST_TEMPLATE = "digest"
+DIGEST_SUBJECT = "Clockify - Resumen de {count} notificaciones - {user_name} - ({now})"
+DIGEST_USERS_LABEL = "{count} usuarios"
+DIGEST_LABELS = {name: subject.split(" - ")[1] for name, subject in NOTIFICATION_SUBJECTS.items()}
+
+
+class SessionSnapshot(NamedTuple):
+    """Valores de una sesión congelados al momento de armar la notificación."""
+    description: Optional[str] = None
+    projectName: Optional[str] = None
+    taskName: Optional[str] = None
+    startDate: Optional[datetime] = None
+    endDate: Optional[datetime] = None
+    duration: Optional[timedelta] = None
+    ValidStartDate: Optional[datetime] = None
+    ValidEndDate: Optional[datetime] = None
+    ValidDuration: Optional[timedelta] = None
+    overtime: bool = False
+    updatingQuantity: int = 0
+
+    @classmethod
+    def from_session(cls, session):
+        return cls._from_getter(lambda field: getattr(session, field, None))
+
+    @classmethod
+    def from_data(cls, data):
+        return cls._from_getter(lambda field: data.get(field, cls._field_defaults.get(field)))
+
+    @classmethod
+    def _from_getter(cls, get):
+        return cls._make(get(field) for field in cls._fields)
+
+
+class NotificationContext(NamedTuple):
+    user_name: str
+    user_email: Optional[str]
+    external_id: str
+    tz: tzinfo
+    session: SessionSnapshot
+    previous: Optional[SessionSnapshot] = None  # estado anterior en alertas de cambio
+    zoned_start: Optional[str] = None
+    zoned_end: Optional[str] = None
+    elapsed_hours: Optional[float] = None
+
+
+def build_notification_context(user, external_id, session, time_zone=None, previous=None, data=None,
+                               elapsed_hours=None):
+    time_interval = (data or {}).get("timeInterval") or {}
+    if isinstance(session, dict):
+        snapshot = SessionSnapshot.from_data(session)
+        time_zone = time_zone or session.get("timeZone")
+    elif isinstance(session, SessionSnapshot):
+        snapshot = session
+    else:
+        snapshot = SessionSnapshot.from_session(session)
+        time_zone = time_zone or session.timeZone
+    return NotificationContext(
+        user_name=user.name if user else "Desconocido",
+        user_email=user.email if user else None,
+        external_id=external_id,
+        tz=get_timezone(time_zone),
+        session=snapshot,
+        previous=previous,
+        zoned_start=time_interval.get("zonedStart"),
+        zoned_end=time_interval.get("zonedEnd"),
+        elapsed_hours=elapsed_hours,
+    )
+
+
+def _local(value, tz):
+    return value.astimezone(tz).strftime(LOCAL_FORMAT) if value else "N/A"
+
+
+def _or_na(value):
+    return "N/A" if value is None or value == "" else value
+
+
+def _create_environment():
+    environment = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        # El contexto guarda los valores tal cual (también van al asunto y al destinatario):
+        # todo lo que viene del payload o de la base se escapa al armar el HTML
+        autoescape=True,
+        undefined=StrictUndefined,
+        auto_reload=False,
+        bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR) if TEMPLATE_CACHE_DIR else None,
+    )
+    # Las plantillas no usan range/lipsum/cycler...; sin globales cada render arma un contexto mínimo
+    environment.globals.clear()
+    environment.filters["local"] = _local
+    environment.filters["na"] = _or_na
+    return environment
+
+
+_environment = _create_environment()
+_compiled = {}
+
+
+def load_notification_templates():
+    """Compila todas las plantillas al iniciar la app; un error de sintaxis falla el arranque."""
+    for name, subject in {**NOTIFICATION_SUBJECTS, DIGEST_TEMPLATE: DIGEST_SUBJECT}.items():
+        _compiled[name] = (subject, _environment.get_template(f"{name}.html"))
+    return len(_compiled)
+
+
+def render_notification(name, ctx: NotificationContext):
+    if name not in _compiled:
+        load_notification_templates()
+    subject, body_template = _compiled[name]
+    now = datetime.now(ctx.tz).strftime(SUBJECT_DATE_FORMAT)
+    return subject.format(user_name=ctx.user_name, now=now), body_template.render(ctx=ctx, s=ctx.session)
+
+
+def build_digest_entry(name, ctx: NotificationContext):
+    """Fila del resumen: valores ya formateados, sin escapar, para guardar en email_queue.digestEntry."""
+    s = ctx.session
+    return {
+        "label": DIGEST_LABELS[name],
+        "at": datetime.now(ctx.tz).strftime(LOCAL_FORMAT),
+        "userName": ctx.user_name,
+        "externalId": ctx.external_id,
+        "projectName": _or_na(s.projectName),
+        "taskName": _or_na(s.taskName),
+        "description": _or_na(s.description),
+        "start": _local(s.ValidStartDate or s.startDate, ctx.tz),
+        "end": _local(s.ValidEndDate or s.endDate, ctx.tz),
+        "duration": str(_or_na(s.ValidDuration or s.duration)),
+        "timeZone": getattr(ctx.tz, "key", "UTC"),
+    }
+
+
+def render_digest(entries):
+    if DIGEST_TEMPLATE not in _compiled:
+        load_notification_templates()
+    subject, body_template = _compiled[DIGEST_TEMPLATE]
+    users = {entry["userName"] for entry in entries}
+    user_name = entries[-1]["userName"] if len(users) == 1 else DIGEST_USERS_LABEL.format(count=len(users))
+    now = datetime.now(get_timezone(entries[-1]["timeZone"])).strftime(SUBJECT_DATE_FORMAT)
+    return (subject.format(count=len(entries), user_name=user_name, now=now),
+            body_template.render(entries=entries, user_name=user_name))
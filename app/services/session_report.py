@@ -0,0 +1,227 @@
+import os
+from datetime import datetime, UTC
+from io import BytesIO
+from collections import deque
+from functools import partial
+from operator import attrgetter
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from app.services.metrics import REPORT_CACHE_LOOKUPS
+from app.services.utility.byte_lru_cache import ByteLRUCache
+
+REPORT_FETCH_SIZE = int(os.getenv("REPORT_FETCH_SIZE", 2000))  # sesiones por tanda del cursor de los reportes
+# Tope en bytes de los XLSX guardados por proceso para reenviar un reporte sin volver a armarlo (0 = sin caché)
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", 64 * 2 ** 20))
+XLSX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+SESSION_COLUMNS = (
+    "description", "projectName", "taskName", "startDate", "endDate", "duration", "offsetStart", "offsetEnd",
+    "ValidStartDate", "ValidEndDate", "ValidDuration", "timeZone", "currentlyRunning", "overtime",
+    "updatingQuantity", "status", "observation"
+)
+_session_values = attrgetter(*SESSION_COLUMNS)
+_report_cache = ByteLRUCache(REPORT_CACHE_MAX_BYTES, sizeof=lambda report: len(report[0]))
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(*(Side(style="thin"),) * 4)
+_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+
+def _as_cells(text, valid, index):
+    # Celdas de texto como objetos, None donde no hay valor (celda vacía en el Excel)
+    cells = text.astype(object)
+    cells[~valid] = None
+    return pd.Series(cells, index=index, dtype=object)
+
+
+def _format_dates(dates):
+    # "%Y-%m-%dT%H:%M:%S" en UTC; datetime_as_string lo arma en C (dt.strftime con zona horaria va celda por celda)
+    values = dates.dt.tz_convert(None).to_numpy().astype("datetime64[s]")
+    return _as_cells(np.datetime_as_string(values, unit="s"), dates.notna().to_numpy(), dates.index)
+
+
+def _zero_pad(values):
+    if not values.size:  # zfill no acepta arreglos vacíos (tanda o rango sin sesiones)
+        return values.astype("U2")
+    return np.char.zfill(values.astype("U"), 2)
+
+
+def _format_hms(duration):
+    # Igual que format_duration_as_hms: segundos truncados, HH:MM:SS (más dígitos si pasa de 99 horas)
+    seconds = duration.dt.total_seconds()
+    valid = seconds.notna() & (seconds != 0)
+    hours, remainder = np.divmod(np.trunc(seconds.fillna(0).to_numpy()).astype("int64"), 3600)
+    minutes, secs = np.divmod(remainder, 60)
+    text = np.char.add(np.char.add(np.char.add(np.char.add(_zero_pad(hours), ":"), _zero_pad(minutes)), ":"),
+                       _zero_pad(secs))
+    return _as_cells(text, valid.to_numpy(), duration.index)
+
+
+def _decimal_hours(duration):
+    # round() de Python y no Series.round: np.round multiplica por 100 y en los empates (35226 s = 9.785 h)
+    # puede dar otra centésima que format_duration, y con ella otros totales
+    hours = duration.dt.total_seconds() / 3600
+    return pd.Series([round(value, 2) for value in hours.tolist()], index=duration.index).fillna(0)
+
+
+def _duration_or(stored, fallback):
+    # Duración guardada si existe y no es 0; si no, fin - inicio (como `s.duration or (fin - inicio)`)
+    stored = pd.to_timedelta(stored)
+    return stored.where(stored.notna() & (stored != pd.Timedelta(0)), fallback)
+
+
+def session_report_rows(sessions):
+    """Valores de SESSION_COLUMNS por sesión: datos planos que se pueden mandar a otro proceso."""
+    return [_session_values(session) for session in sessions]
+
+
+def build_session_report(sessions):
+    """DataFrame del reporte de sesiones con su fila de TOTALES; columnas calculadas en bloque."""
+    return build_session_report_from_rows(session_report_rows(sessions))
+
+
+def build_session_report_from_rows(rows):
+    report = _report_frame(rows)
+    return pd.concat([report, pd.DataFrame([_totals_row(report.columns, *_duration_totals(report))])],
+                     ignore_index=True)
+
+
+def _report_frame(rows):
+    raw = pd.DataFrame.from_records(rows, columns=SESSION_COLUMNS)
+    now = pd.Timestamp(datetime.now(UTC))
+    offset_start = pd.to_timedelta(pd.to_numeric(raw["offsetStart"]), unit="s")
+    offset_end = pd.to_timedelta(pd.to_numeric(raw["offsetEnd"]), unit="s")
+
+    # Las sesiones en curso terminan "ahora"
+    start = pd.to_datetime(raw["startDate"], utc=True)
+    end = pd.to_datetime(raw["endDate"], utc=True).fillna(now)
+    valid_start = pd.to_datetime(raw["ValidStartDate"], utc=True)
+    valid_end = pd.to_datetime(raw["ValidEndDate"], utc=True).fillna(now)
+    duration = _duration_or(raw["duration"], end - start)
+    valid_duration = _duration_or(raw["ValidDuration"], valid_end - valid_start)
+
+    return pd.DataFrame({
+        "Descripcion": raw["description"],
+        "Nombre del proyecto": raw["projectName"],
+        "Nombre de la tarea": raw["taskName"],
+        "Fecha de inicio (UTC)": _format_dates(start),
+        "Fecha de inicio (usuario)": _format_dates(start + offset_start),
+        "Fecha de fin (UTC)": _format_dates(end),
+        "Fecha de fin (usuario)": _format_dates(end + offset_end),
+        "Fecha de inicio valida (UTC)": _format_dates(valid_start),
+        "Fecha de inicio valida (usuario)": _format_dates(valid_start + offset_start),
+        "Fecha de fin valida (UTC)": _format_dates(valid_end),
+        "Fecha de fin valida (usuario)": _format_dates(valid_end + offset_end),
+        "Duracion": _format_hms(duration),
+        "Duracion valida": _format_hms(valid_duration),
+        "Duracion(decimal)": _decimal_hours(duration),
+        "Duracion valida(decimal)": _decimal_hours(valid_duration),
+        "Zona Horaria": raw["timeZone"],
+        "En curso": raw["currentlyRunning"],
+        "Overtime": raw["overtime"],
+        "Modificaciones": raw["updatingQuantity"],
+        "Estado": raw["status"],
+        "Observacion": raw["observation"],
+    })
+
+
+def _duration_totals(report):
+    return report["Duracion(decimal)"].sum(), report["Duracion valida(decimal)"].sum()
+
+
+def _totals_row(columns, total_duration, total_valid_duration):
+    total_row = {column: "" for column in columns}
+    total_row["Descripcion"] = "TOTALES"
+    total_row["Duracion(decimal)"] = round(total_duration, 2)
+    total_row["Duracion valida(decimal)"] = round(total_valid_duration, 2)
+    return total_row
+
+
+def _header_cells(sheet, columns):
+    # El mismo encabezado que escribe DataFrame.to_excel
+    cells = []
+    for column in columns:
+        cell = WriteOnlyCell(sheet, value=column)
+        cell.font, cell.border, cell.alignment = _HEADER_FONT, _HEADER_BORDER, _HEADER_ALIGNMENT
+        cells.append(cell)
+    return cells
+
+
+def write_session_report_xlsx(row_chunks):
+    """XLSX del reporte a partir de tandas de filas (ver session_report_rows); devuelve (bytes, sesiones).
+
+    Usa el modo write-only de openpyxl: cada tanda se calcula en bloque, sus filas van al archivo
+    temporal de la hoja y se descartan, así que la memoria depende del tamaño de la tanda y no del
+    reporte. Solo los totales se acumulan entre tandas."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    columns, sessions, total_duration, total_valid_duration = None, 0, 0.0, 0.0
+    for rows in row_chunks:
+        report = _report_frame(rows)
+        if columns is None:
+            columns = report.columns
+            sheet.append(_header_cells(sheet, columns))
+        duration, valid_duration = _duration_totals(report)
+        total_duration += duration
+        total_valid_duration += valid_duration
+        sessions += len(report)
+        for values in report.itertuples(index=False, name=None):
+            sheet.append(values)
+    if columns is None:
+        columns = _report_frame([]).columns
+        sheet.append(_header_cells(sheet, columns))
+    sheet.append(list(_totals_row(columns, total_duration, total_valid_duration).values()))
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue(), sessions
+
+
+def render_session_report(rows):
+    # Lo que corre en los procesos del pool: filas planas -> bytes del XLSX
+    content, _ = write_session_report_xlsx([rows])
+    return content
+
+
+def render_session_reports(jobs, workers):
+    """Por cada (clave, filas) entrega (clave, render), donde render() devuelve los bytes del XLSX o lanza
+    su error. Con workers > 1 los libros se arman en paralelo en procesos aparte; el orden se mantiene."""
+    if workers <= 1:
+        for key, rows in jobs:
+            yield key, partial(render_session_report, rows)
+        return
+    # spawn y no fork: el proceso tiene hilos (daemons, pool de conexiones) que un fork copiaría a medias
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    try:
+        # A lo sumo 2 libros en cola por proceso: las filas del resto siguen en el cursor de la base
+        submitted = deque()
+        for key, rows in jobs:
+            submitted.append((key, pool.submit(render_session_report, rows)))
+            if len(submitted) >= workers * 2:
+                key, future = submitted.popleft()
+                yield key, future.result
+        while submitted:
+            key, future = submitted.popleft()
+            yield key, future.result
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def get_cached_report(report_type, id_user, start_date, end_date, data_version):
+    """(bytes, sesiones) de un reporte ya armado con la misma versión de datos, o None.
+
+    data_version viene de get_report_data_version; con None (sesiones en curso) no se usa la caché."""
+    if data_version is None:
+        REPORT_CACHE_LOOKUPS.inc(result="bypass")
+        return None
+    report = _report_cache.get((report_type, id_user, start_date, end_date, data_version))
+    REPORT_CACHE_LOOKUPS.inc(result="hit" if report else "miss")
+    return report
+
+
+def cache_report(report_type, id_user, start_date, end_date, data_version, content, sessions):
+    # Una versión nueva deja la entrada anterior sin uso; sale sola por LRU
+    if data_version is not None:
+        _report_cache.set((report_type, id_user, start_date, end_date, data_version), (content, sessions))
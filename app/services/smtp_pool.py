@@ -0,0 +1,144 @@
+import os
+import time
+import smtplib
+from contextlib import contextmanager
+from threading import Lock
+from app.services.metrics import SMTP_CONNECT_DURATION
+
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", 2))
+MAIL_IDLE_TIMEOUT = int(os.getenv("MAIL_IDLE_TIMEOUT", 60))  # segundos sin uso antes de cerrar la conexión
+MAIL_NOOP_AFTER = int(os.getenv("MAIL_NOOP_AFTER", 10))  # segundos sin uso antes de verificar con NOOP
+SMTP_TIMEOUT = 10  # segundos
+
+
+class _PooledConnection:
+    def __init__(self, server):
+        self.server = server
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Conexiones SMTP autenticadas reutilizables: el handshake (ehlo/starttls/login) se paga una vez por conexión."""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True, max_size=MAIL_POOL_SIZE,
+                 idle_timeout=MAIL_IDLE_TIMEOUT, noop_after=MAIL_NOOP_AFTER):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+        self._idle = []
+        self._lock = Lock()
+        self.opened = 0  # conexiones abiertas desde el inicio, para métricas y benchmarks
+
+    def _open(self):
+        with SMTP_CONNECT_DURATION.time(result="ok"):
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+            try:
+                server.ehlo()
+                if self.use_tls:
+                    server.starttls()
+                    server.ehlo()
+                if self.username:
+                    server.login(self.username, self.password)
+            except Exception:
+                self._close(server)
+                raise
+        self.opened += 1
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, connection):
+        idle = time.monotonic() - connection.last_used
+        if idle > self.idle_timeout:
+            return False
+        if idle <= self.noop_after:
+            return True
+        try:
+            return connection.server.noop()[0] == 250
+        except OSError:  # incluye SMTPException
+            return False
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                return self._open()
+            if self._is_alive(connection):
+                return connection
+            self._close(connection.server)
+
+    def _release(self, connection):
+        connection.last_used = time.monotonic()
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(connection)
+                return
+        self._close(connection.server)
+
+    @contextmanager
+    def connection(self):
+        pooled = self._acquire()
+        try:
+            yield pooled.server
+        except smtplib.SMTPServerDisconnected:
+            self._close(pooled.server)
+            raise
+        except smtplib.SMTPException:
+            # El servidor rechazó el mensaje pero la sesión sigue válida: RSET y se devuelve
+            try:
+                pooled.server.rset()
+            except Exception:
+                self._close(pooled.server)
+            else:
+                self._release(pooled)
+            raise
+        except BaseException:
+            # Error de red o de programa: la conexión queda en estado desconocido
+            self._close(pooled.server)
+            raise
+        else:
+            self._release(pooled)
+
+    def send_message(self, msg, to_addrs=None):
+        # Una conexión reutilizada puede haber sido cerrada por el servidor: un reintento con conexión nueva
+        try:
+            with self.connection() as server:
+                return server.send_message(msg, to_addrs=to_addrs)
+        except smtplib.SMTPServerDisconnected:
+            with self.connection() as server:
+                return server.send_message(msg, to_addrs=to_addrs)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._close(connection.server)
+
+
+_pools = {}
+_pools_lock = Lock()
+
+
+def get_smtp_pool(config):
+    """Pool compartido por proceso para la configuración SMTP dada (se recrea si cambia)."""
+    key = (config["MAIL_SERVER"], config["MAIL_PORT"], config["MAIL_USERNAME"], config["MAIL_PASSWORD"],
+           config.get("MAIL_USE_TLS", True))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SMTPConnectionPool(*key)
+        return pool
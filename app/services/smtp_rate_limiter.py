@@ -0,0 +1,65 @@
+import os
+import time
+import smtplib
+from threading import Lock
+
+MAIL_THROTTLE_BACKOFF = int(os.getenv("MAIL_THROTTLE_BACKOFF", 30))  # segundos sin enviar tras un 421/450
+THROTTLE_CODES = (421, 450, 451)  # respuestas temporales con las que los proveedores limitan el envío
+
+
+class TokenBucket:
+    """Limita los envíos a rate_per_minute con ráfagas de hasta burst mensajes; compartido entre hilos."""
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate = rate_per_minute / 60  # tokens por segundo
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = Lock()
+
+    def acquire(self):
+        """Bloquea hasta que haya un token disponible."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.paused_until - now
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        # El proveedor respondió que frenemos: nadie envía hasta que pase el plazo y se arranca sin ráfaga
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.paused_until
+
+
+def is_throttled(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code in THROTTLE_CODES for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code in THROTTLE_CODES
+
+
+_limiters = {}
+_limiters_lock = Lock()
+
+
+def get_smtp_rate_limiter(config):
+    """Token bucket por proceso para el proveedor SMTP configurado; None si MAIL_RATE_PER_MINUTE es 0."""
+    rate, burst = config.get("MAIL_RATE_PER_MINUTE", 0), config.get("MAIL_RATE_BURST", 1)
+    if not rate:
+        return None
+    key = (config["MAIL_SERVER"], config["MAIL_PORT"], config["MAIL_USERNAME"], rate, burst)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = TokenBucket(rate, burst)
+        return limiter
@@ -0,0 +1,50 @@
+import os
+from typing import NamedTuple, Optional
+from sqlalchemy import event
+from app.extensions import db
+from app.repositories.user_repository import upsert_user_by_external_id
+from app.services.utility.ttl_lru_cache import TTLCache
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 5000))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 300))  # segundos
+
+
+class ResolvedUser(NamedTuple):
+    id: int
+    external_user_id: str
+    name: str
+    email: Optional[str]
+    enable: bool
+    indNotificar: bool
+
+
+_user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+_PENDING_KEY = "pending_resolved_users"
+
+
+def resolve_webhook_user(user_info):
+    external_user_id = user_info["ExternalUserId"]
+
+    cached = _user_cache.get(external_user_id)
+    if cached and cached.name == user_info["name"] and cached.enable == user_info["enable"]:
+        return cached
+
+    user = ResolvedUser(*upsert_user_by_external_id(user_info))
+    # Solo se cachea cuando la transacción del llamador se confirma
+    db.session.info.setdefault(_PENDING_KEY, {})[external_user_id] = user
+    return user
+
+
+def forget_cached_user(external_user_id):
+    _user_cache.pop(external_user_id)
+
+
+@event.listens_for(db.session, "after_commit")
+def _cache_committed_users(session):
+    for external_user_id, user in session.info.pop(_PENDING_KEY, {}).items():
+        _user_cache.set(external_user_id, user)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_pending_users(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class ByteLRUCache:
+    """Cache LRU en memoria acotada por bytes en vez de por cantidad de entradas, segura entre hilos.
+
+    sizeof(valor) da el peso de cada entrada; un valor más grande que el tope no se guarda."""
+
+    def __init__(self, maxbytes, sizeof=len):
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.size = 0
+        self._data = OrderedDict()  # clave -> (peso, valor)
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value):
+        weight = self.sizeof(value)
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous:
+                self.size -= previous[0]
+            if weight > self.maxbytes:
+                return False
+            self._data[key] = (weight, value)
+            self.size += weight
+            while self.size > self.maxbytes:
+                _, (evicted, _) = self._data.popitem(last=False)
+                self.size -= evicted
+            return True
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if not item:
+                return None
+            self.size -= item[0]
+            return item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,15 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el json estándar
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Decodifica los cuerpos JSON con orjson; la serialización sigue siendo la de Flask."""
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime, UTC
+from threading import Lock
+from sqlalchemy import event
+from app.extensions import db
+from app.models.session_binnacle import SessionBinnacle
+from app.repositories.webhook_delivery_repository import (
+    claim_webhook_delivery,
+    get_webhook_delivery_result,
+    complete_webhook_delivery,
+    reclaim_webhook_delivery,
+    release_webhook_delivery,
+    purge_expired_webhook_deliveries
+)
+from app.repositories.session_binnacle_repository import get_session_state_version
+from app.services.utility.ttl_lru_cache import TTLCache
+
+WEBHOOK_DEDUP_TTL = int(os.getenv("WEBHOOK_DEDUP_TTL", 3600))  # segundos
+WEBHOOK_DEDUP_CACHE_SIZE = int(os.getenv("WEBHOOK_DEDUP_CACHE_SIZE", 10000))
+WEBHOOK_DEDUP_LEASE_SECONDS = 300  # entrega sin resultado tras este tiempo se puede reprocesar
+WEBHOOK_DEDUP_PURGE_INTERVAL = 300  # segundos
+WEBHOOK_DEDUP_RETRY_AFTER = int(os.getenv("WEBHOOK_DEDUP_RETRY_AFTER", 30))  # segundos
+
+# Además del intervalo, campos que los casos de uso persisten: una edición real
+# de descripción, proyecto o tarea con el mismo horario no es una reentrega
+DEDUP_PAYLOAD_FIELDS = ("description", "projectId", "taskId", "currentlyRunning")
+
+# No 2xx: si la primera entrega termina fallando, Clockify debe seguir reintentando esta
+IN_PROGRESS_RESPONSE = {"message": "Duplicate webhook delivery already in progress", "duplicate": True}
+IN_PROGRESS_HEADERS = {"Retry-After": str(WEBHOOK_DEDUP_RETRY_AFTER)}
+
+_delivery_cache = TTLCache(WEBHOOK_DEDUP_CACHE_SIZE, WEBHOOK_DEDUP_TTL)
+# Última entrada de bitácora que este proceso escribió (o confirmó en la base) por sesión: un acierto
+# de _delivery_cache se responde sin consultar la base mientras la sesión no haya cambiado aquí
+_session_versions = TTLCache(WEBHOOK_DEDUP_CACHE_SIZE, WEBHOOK_DEDUP_TTL)
+_purge_lock = Lock()
+_last_purge = 0.0
+
+
+def _normalize_instant(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(UTC).isoformat()
+    except (ValueError, AttributeError):
+        return str(value)
+
+
+def build_delivery_key(event_type, data):
+    time_data = data.get("timeInterval") or {}
+    normalized = {
+        "eventType": event_type,
+        "id": data.get("id"),
+        "start": _normalize_instant(time_data.get("start")),
+        "end": _normalize_instant(time_data.get("end")),
+        "duration": time_data.get("duration"),
+        **{field: data.get(field) for field in DEDUP_PAYLOAD_FIELDS},
+    }
+    encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@event.listens_for(SessionBinnacle, "after_insert")
+def _track_session_version(mapper, connection, target):
+    # Todos los caminos que escriben bitácora (webhooks, aprobación, monitor, CRUD) pasan por el ORM.
+    # Si la transacción se revierte queda una versión que no existe: el próximo acierto va a la base
+    _session_versions.set(target.external_sesion_id, target.idSesionBinnacle)
+
+
+def _purge_expired_deliveries():
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < WEBHOOK_DEDUP_PURGE_INTERVAL or not _purge_lock.acquire(blocking=False):
+        return
+    try:
+        _last_purge = now
+        purge_expired_webhook_deliveries()
+    except Exception as e:
+        db.session.rollback()
+        print(f"[DEDUP] Error purgando entregas vencidas: {e}", flush=True)
+    finally:
+        _purge_lock.release()
+
+
+def run_deduplicated(event_type, data, process):
+    """Ejecuta process() una sola vez por entrega; las reentregas reciben el resultado guardado.
+
+    process devuelve (body, status_code); se devuelve (body, status_code, headers). Solo se guardan las respuestas 2xx: si la
+    primera entrega falla, la reentrega de Clockify vuelve a procesarse. El hash es del
+    contenido, así que además se guarda la versión de la sesión (última entrada de su
+    bitácora) al terminar: un payload igual con la sesión cambiada desde entonces
+    (edición A -> B -> A) es un cambio nuevo y se procesa. Sin número de secuencia en el payload
+    tampoco se distingue de una reentrega tardía de A después de B: esa también se reaplica, a
+    propósito, y la sesión queda en A como la dejaría una edición nueva.
+
+    La cache en memoria confía en la versión que guardó mientras este proceso no haya escrito
+    bitácora de la sesión; un cambio aplicado por otro proceso solo se ve al vencer la entrada.
+    """
+    delivery_key = build_delivery_key(event_type, data)
+    external_sesion_id = data.get("id")
+
+    cached = _delivery_cache.get(delivery_key)
+    if cached:
+        body, status_code, session_version = cached
+        if _session_versions.get(external_sesion_id, session_version) == session_version:
+            return body, status_code, {}
+
+    claimed = claim_webhook_delivery(delivery_key, event_type, external_sesion_id,
+                                     WEBHOOK_DEDUP_TTL, WEBHOOK_DEDUP_LEASE_SECONDS)
+    if not claimed:
+        stored = get_webhook_delivery_result(delivery_key)
+        if stored and stored.statusCode is not None:
+            if stored.sessionVersion == get_session_state_version(external_sesion_id):
+                result = (stored.response, stored.statusCode)
+                ttl = max(1, (stored.expiresAt - datetime.now(UTC)).total_seconds())
+                _delivery_cache.set(delivery_key, (*result, stored.sessionVersion), ttl)
+                _session_versions.set(external_sesion_id, stored.sessionVersion)
+                return (*result, {})
+            claimed = reclaim_webhook_delivery(delivery_key, stored.sessionVersion, WEBHOOK_DEDUP_TTL)
+        if not claimed:
+            # Otra entrega igual se está procesando en este momento
+            return IN_PROGRESS_RESPONSE, 409, IN_PROGRESS_HEADERS
+
+    try:
+        body, status_code = process()
+    except Exception:
+        db.session.rollback()
+        release_webhook_delivery(delivery_key)
+        raise
+
+    session_version = get_session_state_version(external_sesion_id)
+    complete_webhook_delivery(delivery_key, status_code, body, session_version)
+    _delivery_cache.set(delivery_key, (body, status_code, session_version))
+    _session_versions.set(external_sesion_id, session_version)
+    _purge_expired_deliveries()
+    return body, status_code, {}
@@ -0,0 +1,33 @@
+import zlib
+from contextlib import contextmanager
+from threading import Lock
+
+_lane_locks = {}
+_lane_locks_guard = Lock()
+
+
+def get_session_lane(external_sesion_id, lanes):
+    # Hash estable (no depende de PYTHONHASHSEED) para que todos los procesos coincidan
+    if not external_sesion_id or lanes <= 1:
+        return 0
+    return zlib.crc32(str(external_sesion_id).encode("utf-8")) % lanes
+
+
+def get_inbox_worker_count(workers, lanes):
+    # Un worker sin carriles no tendría nada que reclamar: nunca más workers que carriles
+    return max(1, min(workers, lanes))
+
+
+def get_worker_lanes(worker_id, workers, lanes):
+    workers = get_inbox_worker_count(workers, lanes)
+    return [lane for lane in range(lanes) if lane % workers == worker_id]
+
+
+@contextmanager
+def session_lane_lock(external_sesion_id, lanes):
+    # Serializa en este proceso los eventos de una misma sesión cuando no se usa el inbox
+    lane = get_session_lane(external_sesion_id, lanes)
+    with _lane_locks_guard:
+        lock = _lane_locks.setdefault(lane, Lock())
+    with lock:
+        yield lane
@@ -0,0 +1,44 @@
+from app.extensions import db
+from app.mappers.webhook_inbox_mapper import map_webhook_to_inbox_entity
+from app.validators.webhook_inbox_validator import validate_webhook_inbox_data
+from app.repositories.webhook_inbox_repository import create_inbox_entry
+from app.use_cases.manage_error_log import log_error_use_case
+from app.services.webhook_dispatcher import get_session_lane
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+
+def enqueue_webhook_event(event_type, data):
+    try:
+        # Mapear y validar
+        lane = get_session_lane(data.get("id"), current_app.config["WEBHOOK_INBOX_LANES"])
+        inbox_data = map_webhook_to_inbox_entity(event_type, data, lane)
+        is_valid, errors = validate_webhook_inbox_data(inbox_data)
+
+        if not is_valid:
+            raise ValueError(f"Invalid webhook inbox data: {errors}")
+
+        # Un solo insert, el procesamiento queda para los workers
+        entry = create_inbox_entry(inbox_data)
+        return {"message": "Webhook accepted", "inboxId": entry.idInbox}
+
+    except ValueError as ve:
+        log_error_use_case(
+            endpoint=f"/api-clockify/webhook/{event_type}",
+            method="POST",
+            error=ve,
+            payload=data,
+            response_code=422
+        )
+        raise ve
+
+    except SQLAlchemyError as db_err:
+        db.session.rollback()
+        log_error_use_case(
+            endpoint=f"/api-clockify/webhook/{event_type}",
+            method="POST",
+            error=db_err,
+            payload=data,
+            response_code=500
+        )
+        raise RuntimeError("Database error while enqueuing webhook") from db_err
@@ -0,0 +1,25 @@
+from app.use_cases.webhook_session_start import handle_session_start_use_case
+from app.use_cases.webhook_session_end import handle_session_end_use_case
+from app.use_cases.process_webhook import process_webhook_use_case
+from app.use_cases.webhook_session_delete import handle_session_delete_use_case
+from app.use_cases.webhook_session_manual import handle_session_manual_creation_use_case
+from app.repositories.webhook_inbox_repository import get_inbox_stats
+
+WEBHOOK_HANDLERS = {
+    "start": handle_session_start_use_case,
+    "end": handle_session_end_use_case,
+    "edit": process_webhook_use_case,
+    "delete": handle_session_delete_use_case,
+    "manual": handle_session_manual_creation_use_case,
+}
+
+
+def dispatch_webhook_use_case(event_type, data, notify=True, commit=True):
+    handler = WEBHOOK_HANDLERS.get(event_type)
+    if not handler:
+        raise ValueError(f"Unknown webhook type: {event_type}")
+    return handler(data, notify=notify, commit=commit)
+
+
+def get_webhook_inbox_stats_use_case():
+    return get_inbox_stats()
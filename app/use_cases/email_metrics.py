@@ -0,0 +1,23 @@
+from datetime import datetime, UTC
+from app.repositories.email_queue_repository import get_email_queue_stats
+from app.services.metrics import GaugeSnapshot, render_metrics
+
+EMAIL_STATUSES = {0: "queued", 1: "sent", 2: "failed"}
+
+
+def get_email_metrics_use_case():
+    stats = get_email_queue_stats()
+    now = datetime.now(UTC)
+    oldest_pending, next_due = stats["oldestPendingAt"], stats["nextDueAt"]
+    snapshots = [
+        GaugeSnapshot("email_queue_depth", "Filas de email_queue por estado.",
+                      [({"status": name}, stats["depth"].get(status, 0)) for status, name in EMAIL_STATUSES.items()]),
+        GaugeSnapshot("email_queue_oldest_pending_age_seconds",
+                      "Antigüedad del correo pendiente más viejo (incluye los que esperan reintento o resumen).",
+                      [({}, (now - oldest_pending).total_seconds() if oldest_pending else 0)]),
+        # Lo que debería alertar: correos que ya vencieron y ningún sender tomó
+        GaugeSnapshot("email_queue_overdue_seconds",
+                      "Cuánto lleva vencido el próximo correo pendiente sin que un sender lo reclame.",
+                      [({}, max(0.0, (now - next_due).total_seconds()) if next_due else 0)]),
+    ]
+    return render_metrics(snapshots)
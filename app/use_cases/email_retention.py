@@ -0,0 +1,39 @@
+import os
+import time
+from datetime import datetime, timedelta, UTC
+from app.repositories.email_retention_repository import (
+    archive_email_batch,
+    purge_archived_bodies_batch,
+    delete_orphan_attachment_blobs
+)
+
+EMAIL_ARCHIVE_AFTER_DAYS = int(os.getenv("EMAIL_ARCHIVE_AFTER_DAYS", 7))  # enviados/fallidos pasan al archivo
+EMAIL_PURGE_AFTER_DAYS = int(os.getenv("EMAIL_PURGE_AFTER_DAYS", 90))  # se borran cuerpo y adjuntos archivados
+EMAIL_RETENTION_BATCH_SIZE = int(os.getenv("EMAIL_RETENTION_BATCH_SIZE", 1000))
+EMAIL_RETENTION_PAUSE = float(os.getenv("EMAIL_RETENTION_PAUSE", 0.1))  # segundos entre lotes
+BLOB_UNUSED_GRACE = timedelta(days=1)
+
+
+def _run_in_batches(step, cutoff, batch_size, pause):
+    total = 0
+    while True:
+        affected = step(cutoff, batch_size)
+        total += affected
+        if affected < batch_size:
+            return total
+        time.sleep(pause)
+
+
+def run_email_retention(archive_after_days=EMAIL_ARCHIVE_AFTER_DAYS, purge_after_days=EMAIL_PURGE_AFTER_DAYS,
+                        batch_size=EMAIL_RETENTION_BATCH_SIZE, pause=EMAIL_RETENTION_PAUSE):
+    """Archiva, purga y limpia adjuntos huérfanos en lotes cortos, cada uno en su propia transacción.
+
+    Requiere app context. Seguro de correr en varios procesos a la vez (SKIP LOCKED).
+    """
+    now = datetime.now(UTC)
+    return {
+        "archived": _run_in_batches(archive_email_batch, now - timedelta(days=archive_after_days), batch_size, pause),
+        "purged": _run_in_batches(purge_archived_bodies_batch, now - timedelta(days=purge_after_days),
+                                  batch_size, pause),
+        "blobsDeleted": _run_in_batches(delete_orphan_attachment_blobs, now - BLOB_UNUSED_GRACE, batch_size, pause),
+    }
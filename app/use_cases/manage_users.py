@@ -11,6 +11,7 @@ from app.validators.date_validator import parse_date_param
 from flask import jsonify
 from app.use_cases.manage_error_log import log_error_use_case
 from app.validators.user_validator import validate_user_data
+from app.services.user_resolver import forget_cached_user
 
 def search_users_use_case(params):
     try:
@@ -220,6 +221,7 @@ def update_user_by_external_id_use_case(external_id, data):
         user = update_user_by_external_id(external_id, data)
         if not user:
             raise LookupError("User not found")
+        forget_cached_user(external_id)
 
         return jsonify({
             'id': user.id,
@@ -267,6 +269,7 @@ def delete_user_by_external_id_use_case(external_id):
         success = delete_user_by_external_id(external_id)
         if not success:
             raise LookupError("User not found")
+        forget_cached_user(external_id)
 
         return jsonify({"message": "User deleted"}), 200
     except LookupError as le:
@@ -1,90 +1,28 @@
-import base64
+import os
 from calendar import monthrange
 from datetime import datetime, timedelta, UTC
-import pandas as pd
-from app.models.session import Session
-from app.models.user import User
 from flask import jsonify
 from app.extensions import db
-from app.services.email_queue_service import enqueue_email
+from app.services.email_queue_service import enqueue_emails
+from app.repositories.session_repository import iter_report_sessions_by_user
 from app.use_cases.manage_error_log import log_error_use_case
-from io import BytesIO
+from app.services.session_report import (
+    REPORT_FETCH_SIZE, XLSX_MIME_TYPE, render_session_reports, session_report_rows
+)
 from app.services.utility.sanitize_filename import sanitize_filename
-from app.services.utility.get_local_time import get_local_time
-from app.services.utility.format_duration_to_decimal import format_duration, format_duration_as_hms
+
+# Procesos que arman los XLSX del reporte periódico en paralelo (1 = en el hilo del scheduler)
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", os.cpu_count() or 1))
 
 EXCLUDED_FIELDS = [
     'idSesion', 'ExternalSesionId', 'idUser', 'idProject', 'idWorkspace', 'idTask',
     'offsetStart', 'offsetEnd', 'enable', 'disableTime'
 ]
 
-def get_session_data_as_excel(sessions, user, report_type, start, end):
+def get_session_data_as_excel(render, user, report_type, start, end):
+    # render() devuelve los bytes del XLSX del usuario (ver render_session_reports)
     try:
-        data = []
-        for s in sessions:
-            now = datetime.now(UTC)
-            end_date = s.endDate or now
-            valid_end_date = s.ValidEndDate or now
-            duration = s.duration or (
-                (end_date - s.startDate) if s.startDate else None
-            )
-            valid_duration = s.ValidDuration or (
-                (valid_end_date - s.ValidStartDate) if s.ValidStartDate else None
-            )
-
-            # Calcular fechas con offset
-            start_local = get_local_time(s.startDate, s.offsetStart)
-            end_local = get_local_time(end_date, s.offsetEnd)
-            valid_start_local = get_local_time(s.ValidStartDate, s.offsetStart)
-            valid_end_local = get_local_time(valid_end_date, s.offsetEnd)
-
-            row = {
-                "Descripcion": s.description,
-                "Nombre del proyecto": s.projectName,
-                "Nombre de la tarea": s.taskName,
-                "Fecha de inicio (UTC)": s.startDate.strftime("%Y-%m-%dT%H:%M:%S") if s.startDate else None,
-                "Fecha de inicio (usuario)": start_local.strftime("%Y-%m-%dT%H:%M:%S") if start_local else None,
-                "Fecha de fin (UTC)": end_date.strftime("%Y-%m-%dT%H:%M:%S") if end_date else None,
-                "Fecha de fin (usuario)": end_local.strftime("%Y-%m-%dT%H:%M:%S") if end_local else None,
-                "Fecha de inicio valida (UTC)": s.ValidStartDate.strftime(
-                    "%Y-%m-%dT%H:%M:%S") if s.ValidStartDate else None,
-                "Fecha de inicio valida (usuario)": valid_start_local.strftime(
-                    "%Y-%m-%dT%H:%M:%S") if valid_start_local else None,
-                "Fecha de fin valida (UTC)": valid_end_date.strftime("%Y-%m-%dT%H:%M:%S") if valid_end_date else None,
-                "Fecha de fin valida (usuario)": valid_end_local.strftime(
-                    "%Y-%m-%dT%H:%M:%S") if valid_end_local else None,
-                "Duracion": format_duration_as_hms(duration),
-                "Duracion valida": format_duration_as_hms(valid_duration),
-                "Duracion(decimal)": format_duration(duration),
-                "Duracion valida(decimal)": format_duration(valid_duration),
-                "Zona Horaria": s.timeZone,
-                "En curso": s.currentlyRunning,
-                "Overtime": s.overtime,
-                "Modificaciones": s.updatingQuantity,
-                "Estado": s.status,
-                "Observacion": s.observation
-            }
-            data.append(row)
-        df = pd.DataFrame(data)
-        # Convertir a float las columnas de duración decimal
-        df["Duracion(decimal)"] = pd.to_numeric(df["Duracion(decimal)"], errors="coerce")
-        df["Duracion valida(decimal)"] = pd.to_numeric(df["Duracion valida(decimal)"], errors="coerce")
-
-        # Calcular totales
-        total_duration = df["Duracion(decimal)"].sum()
-        total_valid_duration = df["Duracion valida(decimal)"].sum()
-
-        # Crear fila de totales
-        total_row = {col: "" for col in df.columns}
-        total_row["Descripcion"] = "TOTALES"
-        total_row["Duracion(decimal)"] = round(total_duration, 2)
-        total_row["Duracion valida(decimal)"] = round(total_valid_duration, 2)
-
-        # Agregar la fila de totales al final
-        df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
-        buffer = BytesIO()
-        df.to_excel(buffer, index=False, engine='openpyxl')
-        buffer.seek(0)
+        content = render()
 
         now_str = datetime.now().strftime('%Y%m%d_%H%M%S')
         safe_username = sanitize_filename(user.name)
@@ -106,17 +44,17 @@ def get_session_data_as_excel(sessions, user, report_type, start, end):
   </body>
 </html>
 """
-        encoded_content = base64.b64encode(buffer.read()).decode("utf-8")
-        enqueue_email(
-            subject=subject,
-            data=body,
-            to_address=user.email,
-            attachments=[{
+        # Se encola junto con los de los demás usuarios (enqueue_emails en send_periodic_report)
+        return {
+            "subject": subject,
+            "data": body,
+            "to_address": user.email,
+            "attachments": [{
                 "filename": filename,
-                "content_bytes": encoded_content,
-                "mime_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                "content": content,
+                "mime_type": XLSX_MIME_TYPE
             }]
-        )
+        }
     except ValueError as e:
         db.session.rollback()
         log_error_use_case(
@@ -210,24 +148,17 @@ def send_periodic_report(report_type="weekly", month=None, year=None, start_date
             start_date=start_date
         )
 
-        users = User.query.filter_by(enable=True, indNotificar=True).all()
+        emails = []
 
-        for user in users:
+        # Una consulta para todos los usuarios en vez de una por usuario; llegan agrupados y solo
+        # los que tienen sesiones en el periodo. A los procesos del pool solo van las filas planas
+        jobs = (
+            (user, session_report_rows(sessions))
+            for user, sessions in iter_report_sessions_by_user(start_date, end_date, REPORT_FETCH_SIZE)
+        )
+        for user, render in render_session_reports(jobs, REPORT_WORKERS):
             try:
-                sessions = (
-                    Session.query
-                    .filter(
-                        Session.idUser == user.id,
-                        Session.startDate >= start_date,
-                        Session.startDate <= end_date,
-                        Session.enable == True
-                    )
-                    .order_by(Session.startDate.asc())
-                    .all()
-                )
-
-                if sessions:
-                    get_session_data_as_excel(sessions, user, report_type, start_date, end_date)
+                emails.append(get_session_data_as_excel(render, user, report_type, start_date, end_date))
             except ValueError as e:
                 db.session.rollback()
                 log_error_use_case(
@@ -248,6 +179,10 @@ def send_periodic_report(report_type="weekly", month=None, year=None, start_date
                 )
                 raise
 
+        # Un solo INSERT y un commit para todos los reportes; las filas inválidas quedan en error_logs
+        enqueued, rejected = enqueue_emails(emails)
+        print(f"[REPORTE] {enqueued} reportes encolados, {len(rejected)} rechazados", flush=True)
+
     except ValueError as e:
         db.session.rollback()
         log_error_use_case(
@@ -23,3 +23,23 @@ def validate_secret_token():
         )
         abort(401, description=str(e))
 
+
+def validate_metrics_token():
+    # Prometheus envía el token como "Authorization: Bearer ..."; también se acepta X-Webhook-Token
+    try:
+        authorization = request.headers.get("Authorization", "")
+        received_token = authorization[7:] if authorization.startswith("Bearer ") else request.headers.get("X-Webhook-Token")
+        expected_token = current_app.config.get("METRICS_TOKEN")
+        if not expected_token or received_token != expected_token:
+            raise Unauthorized("error: Unauthorized")
+        return None
+
+    except Unauthorized as e:
+        log_error_use_case(
+            endpoint="validate_metrics_token",
+            method="SYSTEM",
+            error=e,
+            payload={},
+            response_code=401
+        )
+        abort(401, description=str(e))
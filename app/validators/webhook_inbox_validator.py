@@ -0,0 +1,12 @@
+WEBHOOK_EVENT_TYPES = ["start", "end", "edit", "delete", "manual"]
+
+
+def validate_webhook_inbox_data(data):
+    errors = []
+
+    if data.get("eventType") not in WEBHOOK_EVENT_TYPES:
+        errors.append(f"'eventType' must be one of {WEBHOOK_EVENT_TYPES}")
+    if not isinstance(data.get("payload"), dict) or not data.get("payload"):
+        errors.append("'payload' is required")
+
+    return len(errors) == 0, errors
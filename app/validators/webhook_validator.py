@@ -3,8 +3,8 @@ from pydantic import ValidationError
 
 def validate_webhook_data(data):
     try:
-        WebhookEvent(**data)
-        return True, None
+        # Devuelve el evento validado para no volver a recorrer el payload
+        return WebhookEvent.model_validate(data), None
     except ValidationError as e:
-        # Devuelve False con los errores de validación formateados
-        return False, e.errors()
+        # Devuelve None con los errores de validación formateados
+        return None, e.errors()
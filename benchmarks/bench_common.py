@@ -0,0 +1,199 @@
+import os
+import uuid
+import pkgutil
+import smtplib
+import importlib
+import threading
+from sqlalchemy import event
+
+# La configuración se lee al importar app.config: se fija antes de importar la app
+BENCH_TOKEN = "bench-token"
+os.environ["DAEMONS_ENABLED"] = "False"
+for _name in ("START", "END", "EDIT", "DELETE", "MANUAL_CREATE"):
+    os.environ.setdefault(f"CLOCKIFY_SECRET_TOKEN_{_name}", BENCH_TOKEN)
+os.environ.setdefault("SECRET_TOKEN", BENCH_TOKEN)
+
+from app.config import Config  # noqa: E402
+from app.extensions import db  # noqa: E402
+
+HEADERS = {"Clockify-Signature": BENCH_TOKEN, "X-Webhook-Token": BENCH_TOKEN}
+
+
+def create_bench_app(reset=True):
+    """Crea la app contra BENCH_DATABASE_URI y, si se pide, recrea el esquema desde cero."""
+    # Sin fallback a la base del .env: el benchmark borra y recrea todas las tablas
+    bench_uri = os.getenv("BENCH_DATABASE_URI")
+    if not bench_uri:
+        raise SystemExit("BENCH_DATABASE_URI es obligatoria: apunte a una base descartable, el benchmark borra sus tablas")
+    Config.SQLALCHEMY_DATABASE_URI = bench_uri
+    Config.SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": 32, "max_overflow": 16}
+    from app import create_app
+    app = create_app()
+    if reset:
+        with app.app_context():
+            import app.models as models
+            for module in pkgutil.iter_modules(models.__path__):
+                importlib.import_module(f"app.models.{module.name}")
+            db.drop_all()
+            db.create_all()
+    return app
+
+
+def create_bench_server():
+    """Fábrica para gunicorn: misma base de benchmark, sin recrear el esquema y sin SMTP real.
+
+    gunicorn -w 4 -b 127.0.0.1:8000 'benchmarks.bench_common:create_bench_server()'
+    """
+    stub_smtp()
+    return create_bench_app(reset=False)
+
+
+def make_webhook_payload(session_id=None, user_id="bench-user", start="2025-07-01T08:00:00Z",
+                         end=None, duration=None, description="benchmark", project_id="bench-project",
+                         time_zone="America/Bogota", offset=-18000):
+    return {
+        "id": session_id or uuid.uuid4().hex[:24],
+        "description": description,
+        "userId": user_id,
+        "projectId": project_id,
+        "workspaceId": "bench-workspace",
+        "currentlyRunning": end is None,
+        "timeInterval": {
+            "start": start, "end": end, "duration": duration, "timeZone": time_zone,
+            "offsetStart": offset, "offsetEnd": offset if end else None,
+            "zonedStart": start, "zonedEnd": end
+        },
+        # Sin proyecto Clockify envía project y task en null
+        "project": {"id": project_id, "name": f"Proyecto {project_id}", "clientId": None,
+                    "workspaceId": "bench-workspace", "billable": True, "clientName": None} if project_id else None,
+        "task": {"id": "bench-task", "name": "Carga", "status": "ACTIVE", "projectId": project_id} if project_id else None,
+        "user": {"id": user_id, "name": f"Usuario {user_id}", "status": "ACTIVE"},
+        "tags": []
+    }
+
+
+class SQLStatementCounter:
+    """Cuenta los statements que ejecuta cada hilo; con el test client la petición corre en el hilo que la hace."""
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = getattr(self._local, "count", 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, "count", 0)
+
+
+class StubSMTP:
+    """Reemplazo de smtplib.SMTP que acepta todo sin red; guarda los mensajes en StubSMTP.sent."""
+    sent = []
+    _lock = threading.Lock()
+
+    def __init__(self, host="", port=0, *args, **kwargs):
+        self.host, self.port = host, port
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.quit()
+
+    def ehlo(self, *args):
+        return 250, b"stub"
+
+    def starttls(self, *args, **kwargs):
+        return 220, b"stub"
+
+    def login(self, *args):
+        return 235, b"stub"
+
+    def noop(self):
+        return 250, b"stub"
+
+    def send_message(self, msg, *args, **kwargs):
+        with self._lock:
+            StubSMTP.sent.append(msg)
+        return {}
+
+    def sendmail(self, from_addr, to_addrs, msg, *args, **kwargs):
+        with self._lock:
+            StubSMTP.sent.append(msg)
+        return {}
+
+    def quit(self):
+        return 221, b"stub"
+
+    close = quit
+
+
+def stub_smtp():
+    """Ningún benchmark debe llegar a un servidor SMTP real."""
+    smtplib.SMTP = StubSMTP
+    smtplib.SMTP_SSL = StubSMTP
+    return StubSMTP.sent
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def print_latency_summary(label, latencies_ms, elapsed_seconds, statements=None):
+    sql = ""
+    if statements:
+        sql = f" sql/req={sum(statements) / len(statements):.1f} (max {max(statements)})"
+    print(
+        f"[BENCH] {label}: n={len(latencies_ms)} "
+        f"p50={percentile(latencies_ms, 50):.1f}ms p95={percentile(latencies_ms, 95):.1f}ms "
+        f"p99={percentile(latencies_ms, 99):.1f}ms max={max(latencies_ms, default=0):.1f}ms "
+        f"throughput={len(latencies_ms) / elapsed_seconds if elapsed_seconds else 0:.0f} req/s{sql}",
+        flush=True
+    )
+
+
+def seed_report_data(users, sessions_per_user, start, hours=8):
+    """Usuarios notificables con sesiones cerradas de `hours` horas, una por día desde `start`.
+
+    Inserta en lotes con executemany; devuelve los IDs de usuario creados.
+    """
+    from datetime import timedelta
+    from sqlalchemy import insert
+    from app.models.user import User
+    from app.models.session import Session
+
+    user_ids = db.session.execute(
+        insert(User).returning(User.id),
+        [{"external_user_id": f"bench-report-{index}", "name": f"Usuario {index}",
+          "email": f"reporte{index}@clockify.fake", "enable": True, "indNotificar": True}
+         for index in range(users)]
+    ).scalars().all()
+    duration = timedelta(hours=hours)
+    rows = []
+    for user_id in user_ids:
+        for day in range(sessions_per_user):
+            session_start = start + timedelta(days=day, hours=8)
+            rows.append({
+                "external_sesion_id": f"bench-{user_id}-{day}", "idUser": user_id, "description": "Desarrollo",
+                "idProject": "bench-project", "projectName": "Proyecto", "idWorkspace": "bench-workspace",
+                "workspaceName": "Workspace", "idTask": "bench-task", "taskName": "Tarea",
+                "startDate": session_start, "endDate": session_start + duration, "duration": duration,
+                "timeZone": "America/Bogota", "offsetStart": -18000, "offsetEnd": -18000, "enable": True,
+                "status": "APROBADO", "observation": "", "ValidStartDate": session_start,
+                "ValidEndDate": session_start + duration, "ValidDuration": duration,
+            })
+            if len(rows) >= 5000:
+                db.session.execute(insert(Session), rows)
+                rows = []
+    if rows:
+        db.session.execute(insert(Session), rows)
+    db.session.commit()
+    return user_ids
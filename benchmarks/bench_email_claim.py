@@ -0,0 +1,90 @@
+"""Costo del claim de email_queue con historial grande y correos en backoff.
+
+Llena la tabla con --sent correos ya enviados, --backoff correos fallidos con nextAttemptAt en
+el futuro (encolados antes que el resto) y --fresh correos nuevos vencidos. Muestra el plan de la
+consulta de claim (rango sobre el índice parcial ix_email_queue_due), el tiempo por claim y que los
+correos nuevos no esperan detrás de los que están en backoff. Como comparación, la consulta anterior
+(status = 0 ordenado por createdAt) habría devuelto primero los correos que siguen fallando.
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_email_claim --sent 200000 --backoff 2000 --fresh 500
+"""
+import time
+import argparse
+
+from benchmarks.bench_common import create_bench_app, percentile
+from app.extensions import db
+from app.models.email_queue import EmailQueue
+from app.repositories.email_queue_repository import claim_queued_emails
+
+FILL_QUEUE = db.text(
+    'INSERT INTO email_queue ("toAddress", subject, body, status, retries, "sentAt", "createdAt", '
+    '"nextAttemptAt", attachments) '
+    "SELECT 'usuario@clockify.fake', :label || ' ' || n, '<p>benchmark</p>', :status, :retries, "
+    "CASE WHEN :status = 1 THEN now() END, now() - make_interval(secs => :age + n), "
+    "now() + make_interval(secs => :delay), '[]' FROM generate_series(1, :count) AS n"
+)
+
+CLAIM_PLAN = (
+    'EXPLAIN (ANALYZE, BUFFERS) SELECT "idEncolado" FROM email_queue '
+    'WHERE status = 0 AND "nextAttemptAt" <= now() ORDER BY "nextAttemptAt", "idEncolado" '
+    "LIMIT 5 FOR UPDATE SKIP LOCKED"
+)
+
+PREVIOUS_CLAIM = db.text(
+    'SELECT subject FROM email_queue WHERE status = 0 ORDER BY "createdAt", "idEncolado" LIMIT 5'
+)
+
+
+def fill(sent, backoff, fresh):
+    db.session.execute(db.delete(EmailQueue))
+    # Historial y backoff se encolaron antes (createdAt más antiguo) que los correos nuevos
+    db.session.execute(FILL_QUEUE, {"label": "enviado", "status": 1, "retries": 0, "age": 86400,
+                                    "delay": -86400, "count": sent})
+    db.session.execute(FILL_QUEUE, {"label": "backoff", "status": 0, "retries": 3, "age": 3600,
+                                    "delay": 600, "count": backoff})
+    db.session.execute(FILL_QUEUE, {"label": "nuevo", "status": 0, "retries": 0, "age": 0,
+                                    "delay": -1, "count": fresh})
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE email_queue"))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sent", type=int, default=200000)
+    parser.add_argument("--backoff", type=int, default=2000)
+    parser.add_argument("--fresh", type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        fill(args.sent, args.backoff, args.fresh)
+        plan = [row[0] for row in db.session.execute(db.text(CLAIM_PLAN))]
+        db.session.rollback()
+        print("[BENCH] plan del claim:", flush=True)
+        for line in plan:
+            print(f"    {line}", flush=True)
+
+        previous = db.session.execute(PREVIOUS_CLAIM).scalars().all()
+        blocked = sum(subject.startswith("backoff") for subject in previous)
+        print(f"[BENCH] consulta anterior (createdAt): {blocked}/{len(previous)} del primer lote siguen en backoff",
+              flush=True)
+
+        latencies, claimed_subjects = [], []
+        while True:
+            started = time.perf_counter()
+            emails = claim_queued_emails("bench-claim", 5, 300)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not emails:
+                break
+            claimed_subjects.extend(email.subject for email in emails)
+
+    in_backoff = sum(subject.startswith("backoff") for subject in claimed_subjects)
+    print(f"[BENCH] claim: {len(claimed_subjects)} reclamados en {len(latencies)} lotes, "
+          f"p50={percentile(latencies, 50):.2f}ms p95={percentile(latencies, 95):.2f}ms, "
+          f"{in_backoff} en backoff reclamados antes de tiempo", flush=True)
+    assert len(claimed_subjects) == args.fresh and not in_backoff
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Drenado de email_queue con varios senders en paralelo (claim con FOR UPDATE SKIP LOCKED).
+
+Encola --emails correos y los drena con 1 y con --senders senders, cada uno con su propio
+ID y conexión a la base, como hilos de distintos workers de gunicorn o contenedores. Un
+sender "caído" reclama un lote y nunca lo envía: su lease vence y otro sender lo recupera.
+Verifica que cada correo llegue exactamente una vez al servidor SMTP local de prueba.
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_email_queue --emails 500 --senders 4
+"""
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_common import create_bench_app
+from benchmarks.bench_smtp_pool import SMTPStandIn
+from app.extensions import db
+from app.models.email_queue import EmailQueue
+from app.repositories.email_queue_repository import claim_queued_emails
+from app.services.email_queue_service import enqueue_email
+from app.services.daemon.email_sender_daemon import process_email_batch
+
+
+def fill_queue(app, emails, label):
+    with app.app_context():
+        db.session.execute(db.delete(EmailQueue))
+        for index in range(emails):
+            enqueue_email(f"{label} {index}", "<p>benchmark</p>", "usuario@clockify.fake", commit=False)
+        db.session.commit()
+
+
+def drain(app, senders, crashed_lease=None):
+    def sender(index):
+        sent, idle_rounds = 0, 0
+        with app.app_context():
+            # Con un sender caído hay que esperar a que venza su lease antes de dar la cola por vacía
+            while idle_rounds < (int(crashed_lease * 20) + 2 if crashed_lease else 1):
+                claimed = process_email_batch(f"bench-sender-{index}")
+                sent += claimed
+                idle_rounds = 0 if claimed else idle_rounds + 1
+                if not claimed:
+                    time.sleep(0.05)
+        return sent
+
+    if crashed_lease:
+        with app.app_context():
+            abandoned = claim_queued_emails("bench-crashed", 5, crashed_lease)
+        print(f"[BENCH] sender caído reclamó {len(abandoned)} correos con lease de {crashed_lease}s", flush=True)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=senders) as pool:
+        counts = list(pool.map(sender, range(senders)))
+    return counts, time.perf_counter() - started
+
+
+def run(app, server, label, emails, senders, crashed_lease=None):
+    fill_queue(app, emails, label)
+    server.subjects.clear()
+    counts, elapsed = drain(app, senders, crashed_lease)
+    with app.app_context():
+        pending = db.session.scalar(db.select(db.func.count()).select_from(EmailQueue).where(EmailQueue.status != 1))
+    delivered = sum(server.subjects.values())
+    duplicates = sum(count - 1 for count in server.subjects.values() if count > 1)
+    print(f"[BENCH] {label}: {emails / elapsed:.1f} correos/s con {senders} senders (reparto {counts}), "
+          f"entregados {delivered}, duplicados {duplicates}, sin enviar {pending}", flush=True)
+    assert duplicates == 0 and pending == 0 and len(server.subjects) == emails
+    return emails / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--senders", type=int, default=4)
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="Latencia simulada por comando SMTP.")
+    args = parser.parse_args()
+
+    server = SMTPStandIn(("127.0.0.1", 0), args.rtt_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    app = create_bench_app()
+    app.config.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=server.server_address[1], MAIL_USE_TLS=False,
+                      MAIL_USERNAME="bench", MAIL_PASSWORD="bench", MAIL_DEFAULT_SENDER="bench@clockify.fake",
+                      MAIL_RECIPIENT="coordinacion@clockify.fake", MAIL_ADDITIONAL_RECIPIENTS="")
+    try:
+        single = run(app, server, "1 sender", args.emails, 1)
+        parallel = run(app, server, f"{args.senders} senders", args.emails, args.senders)
+        run(app, server, "sender caído", args.emails, args.senders, crashed_lease=1)
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(f"[BENCH] escalado: {parallel / single:.1f}x", flush=True)
+
+
+if __name__ == "__main__":
+    main()
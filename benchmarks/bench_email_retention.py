@@ -0,0 +1,118 @@
+"""Retención de email_queue: archivo, purga y adjuntos huérfanos en lotes sin frenar la cola.
+
+Llena email_queue con --old correos enviados de hace 30 días, --recent enviados de hace 10 días
+(se archivan pero no se purgan) y --pending correos en cola, con cuerpos HTML de --body-kb y
+algunos adjuntos en email_attachment_blobs. Corre run_email_retention mientras otro hilo encola
+correos sin parar y reporta: duración, filas por segundo, latencia máxima del encolado concurrente
+(los lotes no toman locks largos) y el tamaño de email_queue antes y después (tras VACUUM).
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_email_retention --old 100000 --recent 50000
+"""
+import os
+import time
+import argparse
+import threading
+
+from benchmarks.bench_common import create_bench_app, percentile
+from app.extensions import db
+from app.repositories.email_attachment_repository import store_attachment_blob
+from app.services.email_queue_service import enqueue_email
+from app.use_cases.email_retention import run_email_retention
+
+FILL_QUEUE = db.text(
+    'INSERT INTO email_queue ("toAddress", subject, body, status, retries, "sentAt", "createdAt", '
+    '"nextAttemptAt", attachments) '
+    "SELECT 'usuario@clockify.fake', :label || ' ' || n, :body, :status, 0, "
+    "CASE WHEN :status = 1 THEN now() - make_interval(days => :days) END, now() - make_interval(days => :days), "
+    "now() - make_interval(days => :days), CAST(:attachments AS JSONB) FROM generate_series(1, :count) AS n"
+)
+AGE_BLOB = db.text(
+    'UPDATE email_attachment_blobs SET "lastUsedAt" = now() - make_interval(days => :days) WHERE sha256 = :sha256'
+)
+SIZES = db.text(
+    "SELECT pg_total_relation_size('email_queue'), pg_total_relation_size('email_queue_archive'), "
+    "(SELECT COUNT(*) FROM email_queue), (SELECT COUNT(*) FROM email_queue_archive), "
+    "(SELECT COUNT(*) FROM email_attachment_blobs)"
+)
+
+
+def attachment_refs(sha256):
+    return f'[{{"filename": "reporte.xlsx", "mime_type": "application/vnd.ms-excel", "sha256": "{sha256}", "size": 1}}]'
+
+
+def fill(args):
+    body = "<p>" + "x" * (args.body_kb * 1024) + "</p>"
+    blobs = {name: store_attachment_blob(os.urandom(4096)) for name in ("old", "pending", "orphan", "fresh")}
+    for name in ("old", "pending", "orphan"):
+        db.session.execute(AGE_BLOB, {"days": 30, "sha256": blobs[name]})
+    rows = (("antiguo", 1, 30, args.old, "[]"), ("antiguo-adjunto", 1, 30, 1, attachment_refs(blobs["old"])),
+            ("reciente", 1, 10, args.recent, "[]"), ("pendiente", 0, 0, args.pending, attachment_refs(blobs["pending"])))
+    for label, status, days, count, attachments in rows:
+        db.session.execute(FILL_QUEUE, {"label": label, "body": body, "status": status, "days": days,
+                                        "count": count, "attachments": attachments})
+    db.session.commit()
+    return blobs
+
+
+def vacuum(app):
+    with app.app_context(), db.engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").execute(db.text("VACUUM ANALYZE email_queue"))
+
+
+def print_sizes(label):
+    queue_size, archive_size, queued, archived, blobs = db.session.execute(SIZES).one()
+    db.session.rollback()
+    print(f"[BENCH] {label}: email_queue {queued} filas / {queue_size / 2 ** 20:.1f} MB, "
+          f"email_queue_archive {archived} filas / {archive_size / 2 ** 20:.1f} MB, {blobs} blobs", flush=True)
+
+
+def enqueue_loop(app, stop_event, latencies):
+    with app.app_context():
+        while not stop_event.is_set():
+            started = time.perf_counter()
+            enqueue_email("concurrente", "<p>benchmark</p>", "usuario@clockify.fake")
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.005)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--old", type=int, default=100000)
+    parser.add_argument("--recent", type=int, default=50000)
+    parser.add_argument("--pending", type=int, default=200)
+    parser.add_argument("--body-kb", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        blobs = fill(args)
+    vacuum(app)
+
+    with app.app_context():
+        print_sizes("antes")
+        latencies, stop_event = [], threading.Event()
+        enqueuer = threading.Thread(target=enqueue_loop, args=(app, stop_event, latencies), daemon=True)
+        enqueuer.start()
+        started = time.perf_counter()
+        result = run_email_retention(archive_after_days=7, purge_after_days=14, batch_size=args.batch_size, pause=0)
+        elapsed = time.perf_counter() - started
+        stop_event.set()
+        enqueuer.join()
+        print(f"[BENCH] retención: {result} en {elapsed:.1f}s "
+              f"({(result['archived'] + result['purged']) / elapsed:.0f} filas/s, lotes de {args.batch_size})", flush=True)
+        print(f"[BENCH] encolado concurrente: {len(latencies)} correos, p50={percentile(latencies, 50):.1f}ms "
+              f"p99={percentile(latencies, 99):.1f}ms max={max(latencies):.1f}ms", flush=True)
+
+        remaining = set(db.session.execute(db.text("SELECT sha256 FROM email_attachment_blobs")).scalars())
+        db.session.rollback()
+        assert result["archived"] == args.old + 1 + args.recent, result
+        assert result["purged"] == args.old + 1, result
+        assert remaining == {blobs["pending"], blobs["fresh"]}, "solo se borran blobs viejos sin referencias"
+    vacuum(app)
+    with app.app_context():
+        print_sizes("después (VACUUM)")
+
+
+if __name__ == "__main__":
+    main()
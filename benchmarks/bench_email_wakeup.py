@@ -0,0 +1,99 @@
+"""Latencia desde que se encola un correo hasta que llega al servidor SMTP, y tiempo de drenar una ráfaga.
+
+Arranca el daemon de correos y el hilo LISTEN en proceso, contra el servidor SMTP local de
+prueba, y mide tres caminos de aviso:
+  - en proceso: enqueue_email + commit (Condition despertada en after_commit)
+  - otro proceso: INSERT + pg_notify desde una conexión aparte (llega por LISTEN/NOTIFY)
+  - sin aviso: INSERT sin NOTIFY, solo lo recoge el sondeo de respaldo (--poll-interval)
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_email_wakeup --samples 30 --burst 200
+"""
+import time
+import argparse
+import threading
+from datetime import datetime, UTC
+
+from benchmarks.bench_common import create_bench_app, percentile
+from benchmarks.bench_smtp_pool import SMTPStandIn
+from app.extensions import db
+from app.services.email_queue_service import enqueue_email
+from app.services.email_wakeup import EMAIL_CHANNEL, listen_for_email_notifications
+from app.services.daemon import email_sender_daemon
+
+INSERT_EMAIL = db.text(
+    'INSERT INTO email_queue ("toAddress", subject, body, status, retries, "createdAt", "nextAttemptAt", attachments) '
+    "VALUES ('usuario@clockify.fake', :subject, '<p>benchmark</p>', 0, 0, :created, :created, '[]')"
+)
+
+
+def wait_delivered(server, subject, timeout=120):
+    started = time.perf_counter()
+    while subject not in server.subjects:
+        if time.perf_counter() - started > timeout:
+            raise TimeoutError(subject)
+        time.sleep(0.0005)
+    return (time.perf_counter() - started) * 1000
+
+
+def enqueue_in_process(app, subject):
+    with app.app_context():
+        enqueue_email(subject, "<p>benchmark</p>", "usuario@clockify.fake")
+
+
+def enqueue_other_process(app, subject, notify=True):
+    # Conexión propia, fuera de la sesión ORM: como otro worker de gunicorn o contenedor
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(INSERT_EMAIL, {"subject": subject, "created": datetime.now(UTC)})
+        if notify:
+            connection.execute(db.text("SELECT pg_notify(:channel, '')"), {"channel": EMAIL_CHANNEL})
+
+
+def measure(label, server, samples, enqueue):
+    latencies = []
+    for index in range(samples):
+        subject = f"{label} {index}"
+        enqueue(subject)
+        latencies.append(wait_delivered(server, subject))
+        time.sleep(0.02)  # el sender vuelve a quedar en espera
+    print(f"[BENCH] {label}: p50={percentile(latencies, 50):.1f}ms p95={percentile(latencies, 95):.1f}ms "
+          f"max={max(latencies):.1f}ms", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=30)
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--poll-interval", type=int, default=2, help="Sondeo de respaldo para la medición sin aviso.")
+    args = parser.parse_args()
+
+    server = SMTPStandIn(("127.0.0.1", 0), 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    app = create_bench_app()
+    app.config.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=server.server_address[1], MAIL_USE_TLS=False,
+                      MAIL_USERNAME="bench", MAIL_PASSWORD="bench", MAIL_DEFAULT_SENDER="bench@clockify.fake",
+                      MAIL_RECIPIENT="coordinacion@clockify.fake", MAIL_ADDITIONAL_RECIPIENTS="")
+    email_sender_daemon.PROCESS_INTERVAL = args.poll_interval
+    threading.Thread(target=email_sender_daemon.start_email_sender, args=(app,), daemon=True).start()
+    threading.Thread(target=listen_for_email_notifications, args=(app,), daemon=True).start()
+    time.sleep(1)  # LISTEN activo
+
+    measure("en proceso (Condition)", server, args.samples, lambda subject: enqueue_in_process(app, subject))
+    measure("otro proceso (LISTEN/NOTIFY)", server, args.samples, lambda subject: enqueue_other_process(app, subject))
+    measure(f"sin aviso (sondeo cada {args.poll_interval}s)", server, max(3, args.samples // 10),
+            lambda subject: enqueue_other_process(app, subject, notify=False))
+
+    with app.app_context():
+        subjects = [f"rafaga {index}" for index in range(args.burst)]
+        for subject in subjects:
+            enqueue_email(subject, "<p>benchmark</p>", "usuario@clockify.fake", commit=False)
+        started = time.perf_counter()
+        db.session.commit()
+    for subject in subjects:
+        wait_delivered(server, subject)
+    elapsed = time.perf_counter() - started
+    print(f"[BENCH] ráfaga de {args.burst} correos drenada en {elapsed:.2f}s ({args.burst / elapsed:.0f} correos/s; "
+          f"con sondeo fijo de 5s y lotes de 5 eran ~{args.burst:.0f}s)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Encolado de reportes: enqueue_email por correo contra enqueue_emails en un solo INSERT.
+
+Encola --emails correos con un adjunto XLSX simulado de --attachment-kb, primero uno por uno
+(un INSERT de blob, un INSERT de correo y un commit por correo, como antes) y después con
+enqueue_emails. Reporta tiempo, statements SQL y commits. Luego corre send_periodic_report de
+punta a punta con --emails usuarios con sesiones para verificar que cada uno recibe su reporte.
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_enqueue_batch --emails 500
+"""
+import os
+import time
+import argparse
+from datetime import datetime, UTC
+
+from sqlalchemy import event
+
+from benchmarks.bench_common import SQLStatementCounter, create_bench_app, seed_report_data
+from app.extensions import db
+from app.models.email_queue import EmailQueue
+from app.services.email_queue_service import enqueue_email, enqueue_emails
+from app.use_cases.send_periodic_reports import send_periodic_report
+
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def make_batch(count, attachment_kb):
+    return [{
+        "subject": f"Reporte semanal de Clockify - usuario {index}",
+        "data": f"<p>Hola usuario {index}, adjunto encontrará su reporte.</p>",
+        "to_address": f"usuario{index}@clockify.fake",
+        "attachments": [{"filename": f"reporte_{index}.xlsx", "content": os.urandom(attachment_kb * 1024),
+                         "mime_type": XLSX}],
+    } for index in range(count)]
+
+
+def measure(label, counter, commits, run):
+    db.session.execute(db.delete(EmailQueue))
+    db.session.commit()
+    counter.reset()
+    commits.clear()
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    queued = db.session.execute(db.select(db.func.count()).select_from(EmailQueue)).scalar()
+    print(f"[BENCH] {label}: {queued} correos en {elapsed * 1000:.0f}ms ({queued / elapsed:.0f} correos/s), "
+          f"{counter.count} statements, {len(commits)} commits", flush=True)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--attachment-kb", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        counter = SQLStatementCounter(db.engine)
+        commits = []
+        event.listen(db.engine, "commit", lambda connection: commits.append(1))
+        batch = make_batch(args.emails, args.attachment_kb)
+
+        def one_by_one():
+            for item in batch:
+                enqueue_email(item["subject"], item["data"], item["to_address"], attachments=item["attachments"])
+
+        before = measure("enqueue_email por correo", counter, commits, one_by_one)
+        after = measure("enqueue_emails", counter, commits, lambda: enqueue_emails(batch))
+        print(f"[BENCH] mejora: {before / after:.1f}x", flush=True)
+
+        db.session.execute(db.delete(EmailQueue))
+        week_start = datetime(2025, 7, 5, tzinfo=UTC)
+        seed_report_data(args.emails, 5, week_start)
+        started = time.perf_counter()
+        send_periodic_report("weekly", start_date=week_start.strftime("%Y-%m-%d"))
+        elapsed = time.perf_counter() - started
+        reports = db.session.execute(
+            db.select(db.func.count()).select_from(EmailQueue).where(EmailQueue.toAddress.like("reporte%"))
+        ).scalar()
+        print(f"[BENCH] send_periodic_report: {reports} reportes encolados en {elapsed:.1f}s", flush=True)
+        assert reports == args.emails, reports
+
+
+if __name__ == "__main__":
+    main()
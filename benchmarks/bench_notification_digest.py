@@ -0,0 +1,109 @@
+"""Correos SMTP enviados con y sin modo resumen (EMAIL_DIGEST_WINDOW) para un flujo realista.
+
+Reproduce el flujo de benchmarks.event_generator en tiempo comprimido (--replay-seconds de
+reloj real para todo el período simulado) contra el test client, con un sender de correos en
+proceso y el servidor SMTP local de prueba. Para cada ventana de --windows (minutos simulados,
+0 = sin resumen) reporta notificaciones encoladas, mensajes SMTP, mensajes que llegan al buzón
+de MAIL_RECIPIENT y la reducción.
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_notification_digest --users 20 --windows 0,15,60,240
+"""
+import time
+import argparse
+import threading
+
+from benchmarks.bench_common import HEADERS, create_bench_app
+from benchmarks.bench_smtp_pool import SMTPStandIn
+from benchmarks.event_generator import generate_event_stream
+from app.extensions import db
+from app.services import notification_service, user_resolver, webhook_dedup_service
+from app.services.daemon import email_sender_daemon
+from app.services.daemon.email_sender_daemon import process_email_batch
+
+WEBHOOK_PATH = "/api-clockify/webhook/"
+ADMIN_MAILBOX = "coordinacion@clockify.fake"
+
+
+def sender_loop(app, stop_event):
+    with app.app_context():
+        while not stop_event.is_set():
+            if not process_email_batch("bench-digest", batch_size=20):
+                time.sleep(0.005)
+
+
+def replay(app, events, scale):
+    client = app.test_client()
+    first_at, started, max_lag = events[0].at, time.perf_counter(), 0.0
+    for generated in events:
+        target = started + (generated.at - first_at).total_seconds() / scale
+        lag = time.perf_counter() - target
+        if lag < 0:
+            time.sleep(-lag)
+        max_lag = max(max_lag, lag)
+        client.post(WEBHOOK_PATH + generated.event_type, json=generated.payload, headers=HEADERS)
+    return max_lag
+
+
+def run(server, events, window_minutes, scale):
+    app = create_bench_app()
+    # El esquema se recrea y el flujo se repite: ni usuarios cacheados ni entregas ya vistas
+    user_resolver._user_cache.clear()
+    webhook_dedup_service._delivery_cache.clear()
+    webhook_dedup_service._session_versions.clear()
+    app.config.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=server.server_address[1], MAIL_USE_TLS=False,
+                      MAIL_USERNAME="bench", MAIL_PASSWORD="bench", MAIL_DEFAULT_SENDER="bench@clockify.fake",
+                      MAIL_RECIPIENT=ADMIN_MAILBOX, MAIL_ADDITIONAL_RECIPIENTS="")
+    notification_service.EMAIL_DIGEST_WINDOW = email_sender_daemon.EMAIL_DIGEST_WINDOW = window_minutes * 60 / scale
+    messages_before, admin_before = server.messages, server.recipients[ADMIN_MAILBOX]
+
+    stop_event = threading.Event()
+    sender = threading.Thread(target=sender_loop, args=(app, stop_event), daemon=True)
+    sender.start()
+    max_lag = replay(app, events, scale)
+    with app.app_context():
+        while db.session.execute(db.text("SELECT COUNT(*) FROM email_queue WHERE status = 0")).scalar():
+            db.session.rollback()
+            time.sleep(0.05)
+        notifications, sent = db.session.execute(db.text(
+            "SELECT COUNT(*), COUNT(*) FILTER (WHERE status = 1) FROM email_queue"
+        )).one()
+    stop_event.set()
+    sender.join()
+
+    messages = server.messages - messages_before
+    admin_messages = server.recipients[ADMIN_MAILBOX] - admin_before
+    label = f"ventana {window_minutes} min" if window_minutes else "sin resumen"
+    print(f"[BENCH] {label}: {notifications} notificaciones ({sent} enviadas), {messages} mensajes SMTP, "
+          f"{admin_messages} al buzón de {ADMIN_MAILBOX} (desfase máximo del replay {max_lag * 1000:.0f}ms)",
+          flush=True)
+    assert sent == notifications
+    return messages, admin_messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--sessions-per-user", type=int, default=10)
+    parser.add_argument("--edits", type=float, default=0.3)
+    parser.add_argument("--windows", default="0,15,60,240", help="Ventanas de resumen en minutos simulados.")
+    parser.add_argument("--replay-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    events = generate_event_stream(args.users, args.sessions_per_user, args.edits, seed=args.seed)
+    span = (events[-1].at - events[0].at).total_seconds()
+    scale = span / args.replay_seconds
+    print(f"[BENCH] {len(events)} eventos de {args.users} usuarios en {span / 86400:.1f} días simulados, "
+          f"reproducidos en {args.replay_seconds:.0f}s", flush=True)
+
+    server = SMTPStandIn(("127.0.0.1", 0), 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    results = {int(window): run(server, events, int(window), scale) for window in args.windows.split(",")}
+    if 0 in results:
+        for window, (messages, admin_messages) in results.items():
+            if window:
+                print(f"[BENCH] ventana {window} min: mensajes SMTP al {messages / results[0][0]:.0%}, "
+                      f"buzón de {ADMIN_MAILBOX} al {admin_messages / results[0][1]:.0%} de sin resumen", flush=True)
+
+if __name__ == "__main__":
+    main()
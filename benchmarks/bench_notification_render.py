@@ -0,0 +1,127 @@
+"""Costo de armar un correo de notificación: f-string con pytz frente a plantilla Jinja precompilada.
+
+No usa base de datos. El camino anterior es una copia del armado del correo de sesión
+finalizada que vivía en webhook_session_end; el actual usa render_notification con zoneinfo.
+
+Uso: python -m benchmarks.bench_notification_render --renders 20000
+"""
+import time
+import argparse
+from types import SimpleNamespace
+from datetime import datetime, timedelta, UTC
+
+from pytz import timezone, UnknownTimeZoneError
+
+from app.services.notification_templates import (
+    NOTIFICATION_SUBJECTS, SessionSnapshot, build_notification_context,
+    load_notification_templates, render_notification
+)
+
+DATA = {"timeInterval": {"zonedStart": "2025-07-01T03:00:00-05:00", "zonedEnd": "2025-07-01T12:45:30-05:00"}}
+
+
+def sample_session():
+    start = datetime(2025, 7, 1, 8, 0, tzinfo=UTC)
+    return SimpleNamespace(
+        description="Soporte cliente", projectName="Proyecto", taskName="Tarea",
+        startDate=start, endDate=start + timedelta(hours=9, minutes=45, seconds=30),
+        duration=timedelta(hours=9, minutes=45, seconds=30),
+        ValidStartDate=start, ValidEndDate=start + timedelta(hours=9, minutes=45),
+        ValidDuration=timedelta(hours=9, minutes=45), overtime=True, updatingQuantity=1,
+        timeZone="America/Bogota",
+    )
+
+
+def legacy_render(user, external_id, session, data):
+    # Copia del camino previo (pytz + f-string de ~40 líneas en el caso de uso)
+    try:
+        tz = timezone(session.timeZone)
+    except UnknownTimeZoneError:
+        tz = timezone("UTC")
+
+    zoned_start = data.get("timeInterval", {}).get("zonedStart")
+    zoned_end = data.get("timeInterval", {}).get("zonedEnd")
+    valid_start_local = session.ValidStartDate.astimezone(tz) if session.ValidStartDate else None
+    valid_end_local = session.ValidEndDate.astimezone(tz) if session.ValidEndDate else None
+    existing_user = user
+    body = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; color: #333;">
+      <div style="background-color: #dcedc8; padding: 10px; font-size: 20px; font-weight: bold; color: #33691e; border-left: 6px solid #33691e;">
+        ✅ SESIÓN FINALIZADA
+      </div>
+    
+      <p><strong style="color: #33691e;">👤 Usuario:</strong> {existing_user.name} ({existing_user.email})</p>
+      <p><strong style="color: #33691e;">🔗 ID externa:</strong> {external_id}</p>
+      <p><strong style="color: #33691e;">📁 Proyecto:</strong> {session.projectName}</p>
+      <p><strong style="color: #33691e;">📌 Tarea:</strong> {session.taskName}</p>
+      <p><strong style="color: #33691e;">📝 Descripción:</strong> {session.description}</p>
+    
+      <hr style="border:1px dotted black" />
+    
+      <p><strong style="color: #33691e;">📆 Inicio válido (UTC):</strong> <code>{session.ValidStartDate or 'N/A'}</code></p>
+      <p><strong style="color: #33691e;">📆 Inicio válido (usuario):</strong> <code>{valid_start_local.strftime('%Y-%m-%d %H:%M:%S %Z') if valid_start_local else 'N/A'}</code></p>
+      <p><strong style="color: #33691e;">📆 Inicio registrado (usuario):</strong> <code>{zoned_start or 'N/A'}</code></p>
+      <p><strong style="color: #33691e;">📆 Inicio registrado (UTC):</strong> <code>{session.startDate or 'N/A'}</code></p>
+    
+      <p><strong style="color: #33691e;">📆 Fin válido (UTC):</strong> <code>{session.ValidEndDate or 'N/A'}</code></p>
+      <p><strong style="color: #33691e;">📆 Fin válido (usuario):</strong> <code>{valid_end_local.strftime('%Y-%m-%d %H:%M:%S %Z') if valid_end_local else 'N/A'}</code></p>
+      <p><strong style="color: #33691e;">📆 Fin registrado (usuario):</strong> <code>{zoned_end or 'N/A'}</code></p>
+      <p><strong style="color: #33691e;">📆 Fin registrado (UTC):</strong> <code>{session.endDate or 'N/A'}</code></p>
+    
+      <hr style="border:1px dotted black" />
+    
+      <p><strong style="color: #33691e;">⏱️ Duración válida:</strong> {session.ValidDuration}</p>
+      <p><strong style="color: #33691e;">⏰ Overtime:</strong> {'Sí' if session.overtime else 'No'}</p>
+    
+      <div style="background-color: #f1f8e9; padding: 10px; border-left: 6px solid #8bc34a; color: #33691e; margin-top: 20px;">
+        La sesión ha sido registrada exitosamente tras su finalización.
+      </div>
+    </body>
+    </html>
+    """
+    subject = f"Clockify - Sesion Finalizada - {existing_user.name} - ({datetime.now(tz).strftime('%Y-%m-%d %H:%M')})"
+    return subject, body
+
+
+def current_render(user, external_id, session, data):
+    ctx = build_notification_context(user, external_id, session, data=data)
+    return render_notification("session_ended", ctx)
+
+
+def measure(label, func, args, renders):
+    func(*args)
+    started = time.perf_counter()
+    for _ in range(renders):
+        func(*args)
+    per_render_us = (time.perf_counter() - started) / renders * 1e6
+    print(f"[BENCH] {label}: {per_render_us:.1f} us/correo", flush=True)
+    return per_render_us
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--renders", type=int, default=20000)
+    args = arg_parser.parse_args()
+
+    started = time.perf_counter()
+    count = load_notification_templates()
+    print(f"[BENCH] {count} plantillas compiladas en {(time.perf_counter() - started) * 1000:.1f} ms", flush=True)
+
+    user = SimpleNamespace(name="Usuario Bench", email="bench@clockify.fake")
+    session = sample_session()
+
+    # Todas las plantillas deben renderizar con una sesión completa (StrictUndefined)
+    snapshot = SessionSnapshot.from_session(session)
+    for name in NOTIFICATION_SUBJECTS:
+        ctx = build_notification_context(user, "a" * 24, session, previous=snapshot, data=DATA, elapsed_hours=9.75)
+        subject, body = render_notification(name, ctx)
+        assert subject and body, name
+
+    legacy = measure("f-string + pytz (anterior)", legacy_render, (user, "a" * 24, session, DATA), args.renders)
+    current = measure("plantilla Jinja + zoneinfo", current_render, (user, "a" * 24, session, DATA), args.renders)
+    print(f"[BENCH] diferencia: {legacy - current:.1f} us/correo ({legacy / current:.2f}x)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Armado del DataFrame del reporte de sesiones: un dict por fila contra columnas vectorizadas.
+
+Genera --rows sesiones en memoria (sin base de datos) con casos borde: sesiones en curso, sin
+offset de fin, duración guardada en 0, sin inicio válido y duraciones de más de 100 horas. Mide
+el armado anterior (strftime, get_local_time y format_duration por celda, pd.concat de totales)
+contra build_session_report y verifica que ambos den las mismas celdas (salvo las que dependen
+de "ahora" en sesiones en curso). Como referencia mide también escribir el XLSX.
+
+Uso: python -m benchmarks.bench_report_builder --rows 100000
+"""
+import time
+import random
+import argparse
+from types import SimpleNamespace
+from datetime import datetime, timedelta, UTC
+
+import pandas as pd
+
+from app.services.session_report import build_session_report, render_session_report, session_report_rows
+from app.services.utility.get_local_time import get_local_time
+from app.services.utility.format_duration_to_decimal import format_duration, format_duration_as_hms
+
+
+def make_sessions(count, seed=7):
+    rng = random.Random(seed)
+    base = datetime(2025, 6, 1, tzinfo=UTC)
+    sessions = []
+    for index in range(count):
+        start = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 30), seconds=rng.randrange(60))
+        length = timedelta(seconds=rng.randrange(60, 10 * 3600) if index % 97 else rng.randrange(100, 200) * 3600)
+        running = index % 50 == 0
+        end = None if running else start + length
+        valid_start = None if index % 41 == 0 else start + timedelta(minutes=rng.randrange(0, 10))
+        valid_end = None if running else end
+        sessions.append(SimpleNamespace(
+            description=f"Tarea {index}", projectName="Proyecto", taskName="Desarrollo",
+            startDate=start, endDate=end,
+            duration=timedelta(0) if index % 13 == 0 else (None if running else length),
+            offsetStart=rng.choice((-18000, -14400, 0, 3600, 19800)),
+            offsetEnd=None if index % 17 == 0 else -18000,
+            ValidStartDate=valid_start, ValidEndDate=valid_end,
+            ValidDuration=None if running or valid_start is None else valid_end - valid_start,
+            timeZone="America/Bogota", currentlyRunning=running, overtime=index % 7 == 0,
+            updatingQuantity=index % 3, status="APROBADO", observation="" if index % 5 else None,
+        ))
+    return sessions
+
+
+def legacy_report(sessions):
+    # El armado anterior de get_session_data_as_excel, fila por fila
+    data = []
+    for s in sessions:
+        now = datetime.now(UTC)
+        end_date = s.endDate or now
+        valid_end_date = s.ValidEndDate or now
+        duration = s.duration or ((end_date - s.startDate) if s.startDate else None)
+        valid_duration = s.ValidDuration or ((valid_end_date - s.ValidStartDate) if s.ValidStartDate else None)
+        start_local = get_local_time(s.startDate, s.offsetStart)
+        end_local = get_local_time(end_date, s.offsetEnd)
+        valid_start_local = get_local_time(s.ValidStartDate, s.offsetStart)
+        valid_end_local = get_local_time(valid_end_date, s.offsetEnd)
+        data.append({
+            "Descripcion": s.description,
+            "Nombre del proyecto": s.projectName,
+            "Nombre de la tarea": s.taskName,
+            "Fecha de inicio (UTC)": s.startDate.strftime("%Y-%m-%dT%H:%M:%S") if s.startDate else None,
+            "Fecha de inicio (usuario)": start_local.strftime("%Y-%m-%dT%H:%M:%S") if start_local else None,
+            "Fecha de fin (UTC)": end_date.strftime("%Y-%m-%dT%H:%M:%S") if end_date else None,
+            "Fecha de fin (usuario)": end_local.strftime("%Y-%m-%dT%H:%M:%S") if end_local else None,
+            "Fecha de inicio valida (UTC)": s.ValidStartDate.strftime("%Y-%m-%dT%H:%M:%S") if s.ValidStartDate else None,
+            "Fecha de inicio valida (usuario)": valid_start_local.strftime(
+                "%Y-%m-%dT%H:%M:%S") if valid_start_local else None,
+            "Fecha de fin valida (UTC)": valid_end_date.strftime("%Y-%m-%dT%H:%M:%S") if valid_end_date else None,
+            "Fecha de fin valida (usuario)": valid_end_local.strftime(
+                "%Y-%m-%dT%H:%M:%S") if valid_end_local else None,
+            "Duracion": format_duration_as_hms(duration),
+            "Duracion valida": format_duration_as_hms(valid_duration),
+            "Duracion(decimal)": format_duration(duration),
+            "Duracion valida(decimal)": format_duration(valid_duration),
+            "Zona Horaria": s.timeZone,
+            "En curso": s.currentlyRunning,
+            "Overtime": s.overtime,
+            "Modificaciones": s.updatingQuantity,
+            "Estado": s.status,
+            "Observacion": s.observation
+        })
+    df = pd.DataFrame(data)
+    df["Duracion(decimal)"] = pd.to_numeric(df["Duracion(decimal)"], errors="coerce")
+    df["Duracion valida(decimal)"] = pd.to_numeric(df["Duracion valida(decimal)"], errors="coerce")
+    total_row = {col: "" for col in df.columns}
+    total_row["Descripcion"] = "TOTALES"
+    total_row["Duracion(decimal)"] = round(df["Duracion(decimal)"].sum(), 2)
+    total_row["Duracion valida(decimal)"] = round(df["Duracion valida(decimal)"].sum(), 2)
+    return pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
+
+
+def best_of(repeat, build, sessions):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = build(sessions)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def compare(sessions, legacy, vectorized):
+    assert list(legacy.columns) == list(vectorized.columns) and len(legacy) == len(vectorized)
+    running = pd.Series([s.endDate is None or s.ValidEndDate is None for s in sessions] + [True])
+    mismatches = {}
+    for column in legacy.columns:
+        old = legacy[column].astype(object).where(legacy[column].notna(), None)
+        new = vectorized[column].astype(object).where(vectorized[column].notna(), None)
+        different = (old != new) & ~(old.isna() & new.isna()) & ~running
+        if different.any():
+            mismatches[column] = int(different.sum())
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sessions = make_sessions(args.rows)
+    legacy_time, legacy = best_of(args.repeat, legacy_report, sessions)
+    print(f"[BENCH] un dict por fila: {legacy_time * 1000:.0f}ms ({args.rows / legacy_time:.0f} filas/s)", flush=True)
+    vectorized_time, vectorized = best_of(args.repeat, build_session_report, sessions)
+    print(f"[BENCH] build_session_report: {vectorized_time * 1000:.0f}ms ({args.rows / vectorized_time:.0f} filas/s)",
+          flush=True)
+    print(f"[BENCH] mejora: {legacy_time / vectorized_time:.1f}x", flush=True)
+
+    mismatches = compare(sessions, legacy, vectorized)
+    print(f"[BENCH] celdas distintas: {mismatches or 'ninguna'}", flush=True)
+    assert not mismatches
+
+    started = time.perf_counter()
+    size = len(render_session_report(session_report_rows(sessions)))
+    print(f"[BENCH] referencia, escribir el XLSX: {(time.perf_counter() - started) * 1000:.0f}ms, "
+          f"{size / 2 ** 20:.1f} MB", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Reporte personalizado pedido varias veces para el mismo usuario y rango, cambiando solo emailToSend.
+
+Crea un usuario con --sessions sesiones (una por día) y su bitácora, y llama --calls veces a
+POST /api-clockify/session-report/user con distintos destinatarios. Mide la primera llamada (arma
+el XLSX) contra las siguientes (caché por versión de datos) y verifica que todos los adjuntos sean
+los mismos bytes. Después edita una sesión por PUT /api-clockify/sessions/update: la bitácora cambia
+la versión, la llamada siguiente vuelve a armar el libro y el adjunto trae la descripción nueva.
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_report_cache --sessions 3000 --calls 5
+"""
+import time
+import argparse
+from io import BytesIO
+from datetime import datetime, timedelta, UTC
+
+import pandas as pd
+from sqlalchemy import insert, select
+
+from benchmarks.bench_common import HEADERS, create_bench_app, seed_report_data
+from app.extensions import db
+from app.models.email_queue import EmailQueue
+from app.models.session import Session
+from app.models.session_binnacle import SessionBinnacle
+from app.services.email_queue_service import load_email_attachments
+from app.services.metrics import REPORT_CACHE_LOOKUPS
+
+BINNACLE_COLUMNS = (
+    "external_sesion_id", "idSesion", "description", "idUser", "idProject", "projectName", "idWorkspace",
+    "workspaceName", "idTask", "taskName", "startDate", "endDate", "duration", "timeZone", "offsetStart",
+    "offsetEnd", "updatingQuantity", "enable", "disableTime", "observation", "status", "ValidStartDate",
+    "ValidEndDate", "ValidDuration",
+)
+
+
+def seed_binnacle():
+    # Una entrada por sesión, como la que deja el webhook que la creó
+    columns = [getattr(SessionBinnacle, column) for column in BINNACLE_COLUMNS]
+    db.session.execute(
+        insert(SessionBinnacle).from_select(
+            [*columns, SessionBinnacle.createdAt, SessionBinnacle.modifiedAt],
+            select(*(getattr(Session, column) for column in BINNACLE_COLUMNS), Session.startDate, Session.startDate)
+        )
+    )
+    db.session.commit()
+
+
+def request_report(client, user_id, start, end, address):
+    started = time.perf_counter()
+    response = client.post("/api-clockify/session-report/user", headers=HEADERS, json={
+        "idUser": user_id, "startDate": start, "endDate": end, "emailToSend": address
+    })
+    elapsed = (time.perf_counter() - started) * 1000
+    assert response.status_code == 200, response.get_json()
+    return elapsed
+
+
+def attachment(address):
+    email = db.session.execute(db.select(EmailQueue).where(EmailQueue.toAddress == address)).scalar_one()
+    content = load_email_attachments(email.attachments)[0]["content"]
+    db.session.rollback()
+    return content
+
+
+def lookups():
+    return {labels["result"]: value for _, labels, value in REPORT_CACHE_LOOKUPS.samples()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=3000)
+    parser.add_argument("--calls", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    first_day = datetime(2020, 1, 1, tzinfo=UTC)
+    with app.app_context():
+        user_id = seed_report_data(1, args.sessions, first_day)[0]
+        seed_binnacle()
+        db.session.execute(db.text("ANALYZE sesiones_binnacle"))
+        db.session.commit()
+    start = first_day.date().isoformat()
+    end = (first_day + timedelta(days=args.sessions)).date().isoformat()
+    client = app.test_client()
+    print(f"[BENCH] usuario con {args.sessions} sesiones, reporte del {start} al {end}", flush=True)
+
+    timings, addresses = [], [f"admin{call}@clockify.fake" for call in range(args.calls)]
+    for address in addresses:
+        timings.append(request_report(client, user_id, start, end, address))
+    print(f"[BENCH] primera llamada (arma el XLSX): {timings[0]:.0f}ms", flush=True)
+    print("[BENCH] llamadas siguientes (caché): " + ", ".join(f"{value:.0f}ms" for value in timings[1:]), flush=True)
+    print(f"[BENCH] mejora: {timings[0] / (sum(timings[1:]) / len(timings[1:])):.0f}x, búsquedas {lookups()}",
+          flush=True)
+    with app.app_context():
+        contents = [attachment(address) for address in addresses]
+        assert all(content == contents[0] for content in contents), "la caché debe devolver el mismo XLSX"
+
+        session_id = db.session.execute(
+            select(Session.idSesion).where(Session.idUser == user_id).order_by(Session.startDate).limit(1)
+        ).scalar_one()
+        db.session.rollback()
+    response = client.put(f"/api-clockify/sessions/update/{session_id}", headers=HEADERS,
+                          json={"description": "Editada por el admin"})
+    assert response.status_code == 200, response.get_json()
+    elapsed = request_report(client, user_id, start, end, "tras-editar@clockify.fake")
+    with app.app_context():
+        report = pd.read_excel(BytesIO(attachment("tras-editar@clockify.fake")))
+    assert report["Descripcion"].iloc[0] == "Editada por el admin", "una edición debe invalidar el reporte"
+    print(f"[BENCH] tras editar una sesión: {elapsed:.0f}ms (se vuelve a armar), búsquedas {lookups()}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Pico de memoria del reporte personalizado según la cantidad de sesiones del rango.
+
+Crea un usuario por tamaño de --sizes, con varias sesiones por día, y arma su reporte en un
+subproceso aparte por camino y tamaño (el pico de RSS de un proceso no baja, así que cada medición
+necesita el suyo):
+  - anterior: todas las sesiones como objetos Session con .all(), DataFrame completo y
+    DataFrame.to_excel con openpyxl normal (el libro entero en memoria)
+  - streaming: iter_user_session_rows con yield_per y write_session_report_xlsx (modo write-only)
+Se reporta el RSS antes de armar el reporte, el pico (VmHWM) y lo que creció. Con el streaming
+el crecimiento debe quedar plano al aumentar las sesiones. Verifica que ambos libros tengan las
+mismas celdas.
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_report_memory --sizes 5000 20000 80000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tempfile
+from io import BytesIO
+from datetime import datetime, timedelta, UTC
+
+import pandas as pd
+
+from benchmarks.bench_common import create_bench_app
+from app.extensions import db
+
+FIRST_DAY = datetime(2024, 1, 1, tzinfo=UTC)
+SESSIONS_PER_DAY = 12
+
+
+def proc_status_kb(field):
+    # VmHWM y no ru_maxrss: ru_maxrss sobrevive al fork + exec y arrastra el pico del proceso padre
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1])
+    return 0
+
+
+def seed_user(index, sessions):
+    from sqlalchemy import insert
+    from app.models.user import User
+    from app.models.session import Session
+
+    user_id = db.session.execute(
+        insert(User).returning(User.id),
+        [{"external_user_id": f"bench-memory-{index}", "name": f"Usuario {index}",
+          "email": f"memoria{index}@clockify.fake", "enable": True, "indNotificar": True}]
+    ).scalar_one()
+    duration = timedelta(minutes=45)
+    rows = []
+    for number in range(sessions):
+        start = FIRST_DAY + timedelta(days=number // SESSIONS_PER_DAY, hours=6 + number % SESSIONS_PER_DAY)
+        rows.append({
+            "external_sesion_id": f"bench-memory-{user_id}-{number}", "idUser": user_id,
+            "description": f"Tarea {number}", "idProject": "bench-project", "projectName": "Proyecto",
+            "idWorkspace": "bench-workspace", "workspaceName": "Workspace", "idTask": "bench-task",
+            "taskName": "Desarrollo", "startDate": start, "endDate": start + duration, "duration": duration,
+            "timeZone": "America/Bogota", "offsetStart": -18000, "offsetEnd": -18000, "enable": True,
+            "status": "APROBADO", "observation": "", "ValidStartDate": start,
+            "ValidEndDate": start + duration, "ValidDuration": duration,
+        })
+        if len(rows) >= 5000:
+            db.session.execute(insert(Session), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Session), rows)
+    db.session.commit()
+    return user_id
+
+
+def legacy_report(user_id, start, end):
+    # Como lo hacía send_user_report_use_case antes
+    from app.models.session import Session
+    from app.services.session_report import build_session_report
+
+    sessions = (
+        Session.query
+        .filter(Session.idUser == user_id, Session.startDate >= start, Session.startDate <= end,
+                Session.enable == True)
+        .order_by(Session.startDate.asc())
+        .all()
+    )
+    buffer = BytesIO()
+    build_session_report(sessions).to_excel(buffer, index=False, engine="openpyxl")
+    return buffer.getvalue(), len(sessions)
+
+
+def streaming_report(user_id, start, end):
+    from app.repositories.session_repository import iter_user_session_rows
+    from app.services.session_report import REPORT_FETCH_SIZE, SESSION_COLUMNS, write_session_report_xlsx
+
+    return write_session_report_xlsx(
+        iter_user_session_rows(user_id, start, end, SESSION_COLUMNS, REPORT_FETCH_SIZE)
+    )
+
+
+def child(mode, user_id, output):
+    app = create_bench_app(reset=False)
+    build = legacy_report if mode == "anterior" else streaming_report
+    end = datetime(2100, 1, 1, tzinfo=UTC)
+    with app.app_context():
+        # Calienta imports y conexión con un rango vacío para no contarlos en el crecimiento
+        build(user_id, end, end)
+        db.session.rollback()
+        baseline = proc_status_kb("VmRSS")
+        started = time.perf_counter()
+        content, sessions = build(user_id, FIRST_DAY, end)
+        elapsed = time.perf_counter() - started
+    with open(output, "wb") as target:
+        target.write(content)
+    print(json.dumps({"baseline": baseline, "peak": proc_status_kb("VmHWM"),
+                      "elapsed": elapsed, "sessions": sessions, "size": len(content)}))
+
+
+def measure(mode, user_id, output):
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_report_memory", "--child", mode, "--user", str(user_id),
+         "--output", output],
+        check=True, capture_output=True, text=True, env=os.environ
+    )
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    print(f"[BENCH] {mode}, {stats['sessions']} sesiones: {stats['elapsed']:.1f}s, "
+          f"RSS base {stats['baseline'] / 1024:.0f} MB, pico {stats['peak'] / 1024:.0f} MB, "
+          f"crecimiento {(stats['peak'] - stats['baseline']) / 1024:.0f} MB, XLSX {stats['size'] / 2 ** 20:.1f} MB",
+          flush=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 80000])
+    parser.add_argument("--child", choices=("anterior", "streaming"))
+    parser.add_argument("--user", type=int)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.user, args.output)
+
+    app = create_bench_app()
+    with app.app_context():
+        user_ids = [seed_user(index, size) for index, size in enumerate(args.sizes)]
+    growth = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size, user_id in zip(args.sizes, user_ids):
+            workbooks = {}
+            for mode in ("anterior", "streaming"):
+                output = os.path.join(directory, f"{mode}-{size}.xlsx")
+                stats = measure(mode, user_id, output)
+                assert stats["sessions"] == size
+                growth[mode, size] = stats["peak"] - stats["baseline"]
+                workbooks[mode] = pd.read_excel(output)
+            assert workbooks["anterior"].equals(workbooks["streaming"]), "ambos caminos deben dar las mismas celdas"
+    for mode in ("anterior", "streaming"):
+        print(f"[BENCH] crecimiento del RSS, {mode}: " + ", ".join(
+            f"{size} sesiones {growth[mode, size] / 1024:.0f} MB" for size in args.sizes), flush=True)
+
+
+if __name__ == "__main__":
+    main()
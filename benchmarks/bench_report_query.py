@@ -0,0 +1,102 @@
+"""Reporte periódico: una consulta por usuario contra una sola consulta ordenada con yield_per.
+
+Crea --users usuarios notificables con una sesión diaria durante --weeks semanas y arma el
+reporte semanal de la última. Mide por separado:
+  - la lectura: el loop anterior (usuarios + una consulta de sesiones por usuario) contra
+    iter_report_sessions_by_user, con statements SQL y pico de memoria (tracemalloc) mientras se
+    recorre un usuario a la vez; como referencia, la misma consulta cargada entera con .all()
+  - de punta a punta: lectura más get_session_data_as_excel por usuario, con cada camino
+Verifica que ambos caminos entreguen los mismos usuarios y sesiones.
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_report_query --users 800 --weeks 8
+"""
+import time
+import argparse
+import tracemalloc
+from functools import partial
+from datetime import datetime, timedelta, UTC
+
+from benchmarks.bench_common import SQLStatementCounter, create_bench_app, seed_report_data
+from app.extensions import db
+from app.models.session import Session
+from app.models.user import User
+from app.repositories.session_repository import iter_report_sessions_by_user
+from app.services.session_report import render_session_report, session_report_rows
+from app.use_cases.send_periodic_reports import REPORT_FETCH_SIZE, calculate_report_range, get_session_data_as_excel
+
+
+def per_user_queries(start, end):
+    # Como lo hacía send_periodic_report antes
+    for user in User.query.filter_by(enable=True, indNotificar=True).all():
+        sessions = (
+            Session.query
+            .filter(Session.idUser == user.id, Session.startDate >= start, Session.startDate <= end,
+                    Session.enable == True)
+            .order_by(Session.startDate.asc())
+            .all()
+        )
+        if sessions:
+            yield user, sessions
+
+
+def all_at_once(start, end):
+    # Una consulta pero sin cursor del servidor: todas las filas en memoria antes del primer usuario
+    yield from list(iter_report_sessions_by_user(start, end, 10 ** 9))
+
+
+def measure(label, counter, fetch, consume):
+    db.session.expunge_all()
+    db.session.rollback()
+    counter.reset()
+    tracemalloc.start()
+    started = time.perf_counter()
+    seen = {}
+    for user, sessions in fetch():
+        seen[user.id] = [session.idSesion for session in sessions]
+        consume(user, sessions)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.rollback()
+    print(f"[BENCH] {label}: {elapsed * 1000:.0f}ms, {counter.count} statements, {len(seen)} usuarios, "
+          f"{sum(map(len, seen.values()))} sesiones, pico de memoria {peak / 2 ** 20:.1f} MB", flush=True)
+    return elapsed, seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=800)
+    parser.add_argument("--weeks", type=int, default=8)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        first_day = datetime(2025, 5, 3, tzinfo=UTC)
+        seed_report_data(args.users, args.weeks * 7, first_day)
+        db.session.execute(db.text("ANALYZE sesiones"))
+        db.session.commit()
+        start, end = calculate_report_range("weekly", start_date=first_day + timedelta(weeks=args.weeks - 1))
+        counter = SQLStatementCounter(db.engine)
+        print(f"[BENCH] {args.users} usuarios, {args.users * args.weeks * 7} sesiones en total, "
+              f"reporte del {start.date()} al {end.date()}", flush=True)
+
+        skip = lambda user, sessions: None
+        new = lambda: iter_report_sessions_by_user(start, end, REPORT_FETCH_SIZE)
+        old_fetch, old_seen = measure("lectura, una consulta por usuario", counter,
+                                      lambda: per_user_queries(start, end), skip)
+        new_fetch, new_seen = measure(f"lectura, una consulta con yield_per={REPORT_FETCH_SIZE}", counter, new, skip)
+        measure("lectura, una consulta con .all()", counter, lambda: all_at_once(start, end), skip)
+        assert old_seen == new_seen, "los dos caminos deben entregar los mismos usuarios y sesiones"
+        print(f"[BENCH] lectura: {old_fetch / new_fetch:.1f}x", flush=True)
+
+        excel = lambda user, sessions: get_session_data_as_excel(
+            partial(render_session_report, session_report_rows(sessions)), user, "weekly", start, end
+        )
+        old_total, _ = measure("con Excel, una consulta por usuario", counter,
+                               lambda: per_user_queries(start, end), excel)
+        new_total, _ = measure("con Excel, una consulta con yield_per", counter, new, excel)
+        print(f"[BENCH] de punta a punta: {old_total / new_total:.2f}x", flush=True)
+
+
+if __name__ == "__main__":
+    main()
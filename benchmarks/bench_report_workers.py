@@ -0,0 +1,92 @@
+"""Reporte mensual con los XLSX armados en el hilo del scheduler contra un pool de procesos.
+
+Crea --users usuarios con una sesión diaria en junio de 2025 y corre send_periodic_report("monthly")
+con REPORT_WORKERS=1 y con --workers procesos. Mientras corre, otro hilo consulta sin parar
+/api-clockify/metrics en la misma app (como el tráfico de webhooks del mismo proceso) y se reporta
+su latencia p50/p99: con el pool el armado de los libros no compite por el GIL. Verifica que cada
+usuario reciba su reporte con el mismo contenido en ambos modos.
+
+El tiempo total solo baja a ~1/N con N núcleos libres; el número de núcleos se imprime al inicio.
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_report_workers --users 40 --workers 4
+"""
+import os
+import time
+import argparse
+import threading
+from io import BytesIO
+from datetime import datetime, UTC
+
+import pandas as pd
+
+from benchmarks.bench_common import create_bench_app, percentile, seed_report_data
+from app.extensions import db
+from app.models.email_queue import EmailQueue
+from app.services.email_queue_service import load_email_attachments
+from app.use_cases import send_periodic_reports
+
+
+def probe_loop(app, stop_event, latencies):
+    client = app.test_client()
+    while not stop_event.is_set():
+        started = time.perf_counter()
+        response = client.get("/api-clockify/metrics", headers={"Authorization": "Bearer bench"})
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200
+        time.sleep(0.01)
+
+
+def report_contents():
+    contents = {}
+    for email in db.session.execute(db.select(EmailQueue)).scalars():
+        report = pd.read_excel(BytesIO(load_email_attachments(email.attachments)[0]["content"]))
+        contents[email.toAddress] = report
+    db.session.rollback()
+    return contents
+
+
+def run(app, label, workers, users):
+    send_periodic_reports.REPORT_WORKERS = workers
+    with app.app_context():
+        db.session.execute(db.delete(EmailQueue))
+        db.session.commit()
+    latencies, stop_event = [], threading.Event()
+    probe = threading.Thread(target=probe_loop, args=(app, stop_event, latencies), daemon=True)
+    probe.start()
+    with app.app_context():
+        started = time.perf_counter()
+        send_periodic_reports.send_periodic_report("monthly", month=6, year=2025)
+        elapsed = time.perf_counter() - started
+    stop_event.set()
+    probe.join()
+    with app.app_context():
+        contents = report_contents()
+    print(f"[BENCH] {label}: {len(contents)} reportes en {elapsed:.1f}s ({len(contents) / elapsed:.1f} reportes/s), "
+          f"consultas concurrentes {len(latencies)}: p50={percentile(latencies, 50):.1f}ms "
+          f"p99={percentile(latencies, 99):.1f}ms max={max(latencies):.1f}ms", flush=True)
+    assert len(contents) == users
+    return elapsed, contents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    app.config["METRICS_TOKEN"] = "bench"
+    with app.app_context():
+        seed_report_data(args.users, 30, datetime(2025, 6, 1, tzinfo=UTC))
+    print(f"[BENCH] {os.cpu_count()} núcleos, {args.users} usuarios con 30 sesiones", flush=True)
+
+    inline, inline_contents = run(app, "REPORT_WORKERS=1 (hilo del scheduler)", 1, args.users)
+    pooled, pooled_contents = run(app, f"REPORT_WORKERS={args.workers}", args.workers, args.users)
+    assert inline_contents.keys() == pooled_contents.keys()
+    assert all(inline_contents[address].equals(pooled_contents[address]) for address in inline_contents), \
+        "el pool debe generar los mismos libros"
+    print(f"[BENCH] pool de {args.workers} procesos: {inline / pooled:.2f}x", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Envío de la cola con SMTP en paralelo y limitador token bucket contra un proveedor con cupo.
+
+El servidor SMTP local de prueba responde 421 a todo MAIL FROM que pase de --provider-limit
+mensajes en --provider-window segundos, como un proveedor con límite por minuto. Drena
+--emails correos con un sender y mide tres configuraciones:
+  - secuencial (EMAIL_SEND_CONCURRENCY=1), sin limitador
+  - --concurrency hilos sin limitador: choca con el cupo y recibe 421 (se reprograman)
+  - --concurrency hilos con MAIL_RATE_PER_MINUTE al cupo del proveedor: sin 421
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_smtp_dispatch --emails 600 --concurrency 4
+"""
+import time
+import argparse
+import threading
+
+from benchmarks.bench_common import create_bench_app
+from benchmarks.bench_smtp_pool import SMTPStandIn
+from app.extensions import db
+from app.models.email_queue import EmailQueue
+from app.services import smtp_pool
+from app.services.daemon import email_sender_daemon
+from app.services.email_queue_service import enqueue_emails
+
+
+def configure(app, server, concurrency, rate_per_minute):
+    app.config.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=server.server_address[1], MAIL_USE_TLS=False,
+                      MAIL_USERNAME="bench", MAIL_PASSWORD="bench", MAIL_DEFAULT_SENDER="bench@clockify.fake",
+                      MAIL_RECIPIENT="coordinacion@clockify.fake", MAIL_ADDITIONAL_RECIPIENTS="",
+                      MAIL_RATE_PER_MINUTE=rate_per_minute, MAIL_RATE_BURST=1)
+    if email_sender_daemon._dispatch_pool is not None:
+        email_sender_daemon._dispatch_pool.shutdown()
+        email_sender_daemon._dispatch_pool = None
+    email_sender_daemon.SEND_CONCURRENCY = concurrency
+    smtp_pool._pools.clear()
+    with app.app_context():
+        smtp_pool.get_smtp_pool(app.config).max_size = concurrency
+
+
+def run(app, server, label, emails, concurrency, rate_per_minute):
+    configure(app, server, concurrency, rate_per_minute)
+    with app.app_context():
+        db.session.execute(db.delete(EmailQueue))
+        enqueue_emails([{"subject": f"{label} {index}", "data": "<p>benchmark</p>",
+                         "to_address": "usuario@clockify.fake"} for index in range(emails)])
+        messages_before, throttled_before = server.messages, server.throttled
+        started = time.perf_counter()
+        while True:
+            if not email_sender_daemon.process_email_batch("bench-dispatch", batch_size=20):
+                pending = db.session.execute(
+                    db.select(db.func.count()).select_from(EmailQueue).where(EmailQueue.status != 1)
+                ).scalar()
+                db.session.rollback()
+                if not pending:
+                    break
+                time.sleep(0.02)
+        elapsed = time.perf_counter() - started
+        retries = db.session.execute(db.select(db.func.sum(EmailQueue.retries))).scalar()
+    delivered = server.messages - messages_before
+    print(f"[BENCH] {label}: {emails / elapsed:.1f} correos/s ({elapsed:.1f}s), {delivered} entregados, "
+          f"{server.throttled - throttled_before} respuestas 421, reintentos gastados {retries}", flush=True)
+    assert delivered == emails
+    return emails / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rtt-ms", type=float, default=5.0, help="Latencia simulada por comando SMTP.")
+    parser.add_argument("--provider-limit", type=int, default=120)
+    parser.add_argument("--provider-window", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = SMTPStandIn(("127.0.0.1", 0), args.rtt_ms / 1000,
+                         rate_limit=args.provider_limit, rate_window=args.provider_window)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    email_sender_daemon.MAIL_THROTTLE_BACKOFF = args.provider_window  # reprogramar en segundos, no en 30s
+    app = create_bench_app()
+    cap_per_minute = int(args.provider_limit / args.provider_window * 60)
+    print(f"[BENCH] cupo del proveedor: {args.provider_limit} mensajes cada {args.provider_window}s "
+          f"({cap_per_minute}/min), rtt={args.rtt_ms}ms", flush=True)
+
+    sequential = run(app, server, "secuencial", args.emails, 1, 0)
+    run(app, server, f"{args.concurrency} hilos sin limitador", args.emails, args.concurrency, 0)
+    limited = run(app, server, f"{args.concurrency} hilos con limitador", args.emails, args.concurrency, cap_per_minute)
+    print(f"[BENCH] con limitador: {limited / sequential:.1f}x el secuencial, "
+          f"{limited * 60 / cap_per_minute:.0%} del cupo del proveedor", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Mensajes por segundo del envío de correos con y sin pool de conexiones SMTP.
+
+Levanta un servidor SMTP local de prueba (EHLO/STARTTLS/AUTH/MAIL/RCPT/DATA/NOOP/RSET/QUIT)
+y envía los mensajes con send_webhook_email, como el daemon de correos. Sin pool
+(MAIL_POOL_SIZE=0) cada mensaje abre conexión y repite ehlo/starttls/ehlo/login, igual que
+el camino anterior. --rtt-ms simula la latencia de red por comando; --drop-every hace que el
+servidor corte la conexión cada N mensajes para ejercitar la reconexión.
+
+STARTTLS usa un certificado autofirmado generado con el binario openssl; sin openssl se
+prueba en texto plano (MAIL_USE_TLS=False).
+
+Uso: python -m benchmarks.bench_smtp_pool --messages 200 --rtt-ms 5
+"""
+import os
+import ssl
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import socketserver
+from collections import Counter, deque
+
+from flask import Flask
+
+from app.services import smtp_pool
+from app.services.mail_service_manual import send_webhook_email
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, rtt, tls_context=None, drop_every=0, rate_limit=0, rate_window=60.0):
+        super().__init__(address, SMTPStandInHandler)
+        self.rtt = rtt
+        self.tls_context = tls_context
+        self.drop_every = drop_every
+        # Como un proveedor con cupo: más de rate_limit MAIL FROM en rate_window segundos reciben 421
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.accepted = deque()
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.subjects = Counter()  # para detectar duplicados
+        self.recipients = Counter()  # mensajes por buzón
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    def reply(self, *lines):
+        time.sleep(self.server.rtt)
+        *rest, last = lines
+        payload = "".join(f"{line[:3]}-{line[4:]}\r\n" for line in rest) + f"{last}\r\n"
+        self.wfile.write(payload.encode("ascii"))
+        self.wfile.flush()
+
+    def over_rate_limit(self):
+        server = self.server
+        if not server.rate_limit:
+            return False
+        with server.lock:
+            now = time.monotonic()
+            while server.accepted and now - server.accepted[0] >= server.rate_window:
+                server.accepted.popleft()
+            if len(server.accepted) >= server.rate_limit:
+                server.throttled += 1
+                return True
+            server.accepted.append(now)
+            return False
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        tls = False
+        self.reply("220 stand-in ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip().upper()
+            verb = command.split(" ", 1)[0]
+            if verb in ("EHLO", "HELO"):
+                extensions = ["250 stand-in", "250 AUTH PLAIN LOGIN", "250 8BITMIME"]
+                if self.server.tls_context and not tls:
+                    extensions.append("250 STARTTLS")
+                self.reply(*extensions)
+            elif verb == "STARTTLS":
+                self.reply("220 Ready to start TLS")
+                self.request = self.server.tls_context.wrap_socket(self.request, server_side=True)
+                self.rfile = self.request.makefile("rb")
+                self.wfile = self.request.makefile("wb")
+                tls = True
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb == "RCPT":
+                with self.server.lock:
+                    self.server.recipients[command.split(":", 1)[1].strip(" <>").lower()] += 1
+                self.reply("250 OK")
+            elif verb == "MAIL" and self.over_rate_limit():
+                self.reply("421 4.7.0 Rate limit exceeded, try again later")
+                return
+            elif verb in ("MAIL", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                subject = None
+                while (data_line := self.rfile.readline()) not in (b".\r\n", b""):
+                    if subject is None and data_line.startswith(b"Subject: "):
+                        subject = data_line[9:].strip().decode("utf-8", "replace")
+                with self.server.lock:
+                    self.server.messages += 1
+                    self.server.subjects[subject] += 1
+                    drop = self.server.drop_every and self.server.messages % self.server.drop_every == 0
+                self.reply("250 Queued")
+                if drop:
+                    return  # corte sin QUIT, como un servidor que cierra conexiones largas
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+def self_signed_context(directory):
+    if not shutil.which("openssl"):
+        return None
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def run(label, server, messages, pool_size, use_tls):
+    app = Flask("bench_smtp")
+    app.config.update(
+        MAIL_SERVER="127.0.0.1", MAIL_PORT=server.server_address[1], MAIL_USE_TLS=use_tls,
+        MAIL_USERNAME="bench", MAIL_PASSWORD="bench", MAIL_DEFAULT_SENDER="bench@clockify.fake",
+        MAIL_RECIPIENT="coordinacion@clockify.fake", MAIL_ADDITIONAL_RECIPIENTS="",
+    )
+    smtp_pool._pools.clear()
+    connections_before, messages_before = server.connections, server.messages
+    with app.app_context():
+        pool = smtp_pool.get_smtp_pool(app.config)
+        pool.max_size = pool_size
+        started = time.perf_counter()
+        for index in range(messages):
+            send_webhook_email(f"Bench {index}", "<p>benchmark</p>", user_email="usuario@clockify.fake")
+        elapsed = time.perf_counter() - started
+        pool.close_all()
+    delivered = server.messages - messages_before
+    print(f"[BENCH] {label}: {messages / elapsed:.1f} mensajes/s ({elapsed / messages * 1000:.1f} ms/mensaje), "
+          f"{server.connections - connections_before} conexiones, {delivered} entregados", flush=True)
+    assert delivered == messages, (delivered, messages)
+    return messages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=5.0, help="Latencia simulada por comando SMTP.")
+    parser.add_argument("--drop-every", type=int, default=50, help="El servidor corta cada N mensajes (0 = nunca).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        tls_context = self_signed_context(directory)
+        server = SMTPStandIn(("127.0.0.1", 0), args.rtt_ms / 1000, tls_context, args.drop_every)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        use_tls = tls_context is not None
+        print(f"[BENCH] servidor de prueba en puerto {server.server_address[1]}, "
+              f"STARTTLS={'sí' if use_tls else 'no (openssl no disponible)'}, rtt={args.rtt_ms}ms, "
+              f"corte cada {args.drop_every or '∞'} mensajes", flush=True)
+        try:
+            without_pool = run("sin pool (conexión por mensaje)", server, args.messages, 0, use_tls)
+            with_pool = run("con pool", server, args.messages, 2, use_tls)
+        finally:
+            server.shutdown()
+            server.server_close()
+    print(f"[BENCH] mejora: {with_pool / without_pool:.1f}x", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Latencia de los webhooks start/end bajo concurrencia, con entregas duplicadas de Clockify.
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_webhook_concurrency --threads 16 --sessions 400
+"""
+import time
+import random
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_common import (
+    HEADERS, create_bench_app, make_webhook_payload, print_latency_summary
+)
+from app.extensions import db
+
+
+def run_phase(app, label, jobs, threads):
+    latencies, statuses = [], Counter()
+
+    def post(job):
+        event_type, payload = job
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post(f"/api-clockify/webhook/{event_type}", json=payload, headers=HEADERS)
+        return (time.perf_counter() - started) * 1000, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for latency, status in pool.map(post, jobs):
+            latencies.append(latency)
+            statuses[status] += 1
+    print_latency_summary(label, latencies, time.perf_counter() - started)
+    print(f"[BENCH] {label}: códigos HTTP {dict(sorted(statuses.items()))}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--sessions", type=int, default=400)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duplicates", type=float, default=0.2,
+                        help="Fracción de eventos que Clockify entrega dos veces.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    app = create_bench_app()
+
+    sessions = [
+        (f"bench{index:019d}", f"bench-user-{index % args.users}")
+        for index in range(args.sessions)
+    ]
+
+    def with_duplicates(jobs):
+        jobs = jobs + [job for job in jobs if random.random() < args.duplicates]
+        random.shuffle(jobs)
+        return jobs
+
+    starts = with_duplicates([
+        ("start", make_webhook_payload(session_id, user_id)) for session_id, user_id in sessions
+    ])
+    ends = with_duplicates([
+        ("end", make_webhook_payload(session_id, user_id, end="2025-07-01T09:30:00Z", duration="PT1H30M"))
+        for session_id, user_id in sessions
+    ])
+
+    run_phase(app, "start", starts, args.threads)
+    run_phase(app, "end", ends, args.threads)
+
+    with app.app_context():
+        total, distinct = db.session.execute(db.text(
+            'SELECT COUNT(*), COUNT(DISTINCT "ExternalSesionId") FROM sesiones'
+        )).one()
+    print(f"[BENCH] sesiones: {total} filas, {distinct} IDs externos distintos (esperado {args.sessions})",
+          flush=True)
+
+
+if __name__ == "__main__":
+    main()
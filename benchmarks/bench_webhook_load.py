@@ -0,0 +1,134 @@
+"""Prueba de carga de los webhooks con un flujo sintético de eventos de Clockify.
+
+Mezcla start/end/edit/delete/manual de muchos usuarios (benchmarks.event_generator) y
+reporta por endpoint latencia p50/p95/p99, throughput y statements SQL por petición.
+Los eventos de una misma sesión van siempre al mismo hilo, en orden, como los entrega Clockify.
+
+Por defecto usa el test client de Flask en proceso, con SMTP reemplazado por un stub.
+Con --url envía HTTP a un gunicorn local levantado con la fábrica create_bench_server y la
+misma BENCH_DATABASE_URI; en ese modo no se cuentan statements:
+
+    BENCH_DATABASE_URI=... gunicorn -w 4 -b 127.0.0.1:8000 'benchmarks.bench_common:create_bench_server()'
+    BENCH_DATABASE_URI=... python -m benchmarks.bench_webhook_load --url http://127.0.0.1:8000
+
+Uso: BENCH_DATABASE_URI=... python -m benchmarks.bench_webhook_load --users 50 --sessions-per-user 20
+"""
+import json
+import time
+import argparse
+import http.client
+from urllib.parse import urlsplit
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_common import (
+    HEADERS, SQLStatementCounter, create_bench_app, print_latency_summary, stub_smtp
+)
+from benchmarks.event_generator import generate_event_stream
+from app.extensions import db
+
+ENDPOINTS = ("start", "end", "edit", "delete", "manual")
+WEBHOOK_PATH = "/api-clockify/webhook/"
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.app = app
+        with app.app_context():
+            self.counter = SQLStatementCounter(db.engine)
+
+    def post(self, event_type, payload):
+        client = self.app.test_client()
+        self.counter.reset()
+        response = client.post(WEBHOOK_PATH + event_type, json=payload, headers=HEADERS)
+        return response.status_code, self.counter.count
+
+
+class HTTPTransport:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+
+    def post(self, event_type, payload):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            connection.request("POST", WEBHOOK_PATH + event_type, body=json.dumps(payload),
+                               headers={**HEADERS, "Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            return response.status, None
+        finally:
+            connection.close()
+
+
+def run_stream(transport, events, threads):
+    lanes = defaultdict(list)
+    for generated in events:
+        lanes[int(generated.session_id, 16) % threads].append(generated)
+
+    results = defaultdict(lambda: {"latencies": [], "statements": [], "statuses": Counter()})
+
+    def drain(lane):
+        local = []
+        for generated in lane:
+            started = time.perf_counter()
+            status, statements = transport.post(generated.event_type, generated.payload)
+            local.append((generated.event_type, (time.perf_counter() - started) * 1000, statements, status))
+        return local
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for lane_results in pool.map(drain, lanes.values()):
+            for event_type, latency, statements, status in lane_results:
+                bucket = results[event_type]
+                bucket["latencies"].append(latency)
+                if statements is not None:
+                    bucket["statements"].append(statements)
+                bucket["statuses"][status] += 1
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--sessions-per-user", type=int, default=20)
+    parser.add_argument("--edits", type=float, default=0.3, help="Probabilidad de cada edición adicional.")
+    parser.add_argument("--deletes", type=float, default=0.05)
+    parser.add_argument("--manual", type=float, default=0.1)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--url", help="Base de un servidor ya levantado, p. ej. http://127.0.0.1:8000")
+    args = parser.parse_args()
+
+    sent_emails = stub_smtp()
+    app = create_bench_app()
+    transport = HTTPTransport(args.url) if args.url else TestClientTransport(app)
+
+    events = generate_event_stream(args.users, args.sessions_per_user, args.edits, args.deletes,
+                                   args.manual, args.seed)
+    mix = Counter(generated.event_type for generated in events)
+    print(f"[BENCH] {len(events)} eventos: {dict(mix)} con {args.threads} hilos "
+          f"({'HTTP ' + args.url if args.url else 'test client'})", flush=True)
+
+    results, elapsed = run_stream(transport, events, args.threads)
+
+    for event_type in ENDPOINTS:
+        if event_type not in results:
+            continue
+        bucket = results[event_type]
+        print_latency_summary(event_type, bucket["latencies"], elapsed, bucket["statements"])
+        print(f"[BENCH] {event_type}: códigos HTTP {dict(sorted(bucket['statuses'].items()))}", flush=True)
+    all_latencies = [latency for bucket in results.values() for latency in bucket["latencies"]]
+    all_statements = [count for bucket in results.values() for count in bucket["statements"]]
+    print_latency_summary("total", all_latencies, elapsed, all_statements)
+
+    with app.app_context():
+        sessions, queued = db.session.execute(db.text(
+            "SELECT (SELECT COUNT(*) FROM sesiones), (SELECT COUNT(*) FROM email_queue)"
+        )).one()
+    print(f"[BENCH] sesiones en base: {sessions}, notificaciones encoladas: {queued}, "
+          f"correos enviados al stub SMTP: {len(sent_emails)}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
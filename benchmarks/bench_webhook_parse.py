@@ -0,0 +1,114 @@
+"""Costo de CPU por evento al decodificar, validar y mapear webhooks de Clockify.
+
+No usa base de datos. Compara el paso único actual (orjson + WebhookEvent + mapeo desde
+el modelo validado) con el camino anterior (json estándar, validar y descartar el modelo,
+volver a recorrer el dict con dateutil/isodate).
+
+Uso: python -m benchmarks.bench_webhook_parse --events 20000
+"""
+import json
+import time
+import argparse
+from datetime import datetime, UTC
+
+import isodate
+from dateutil import parser
+
+from benchmarks.bench_common import make_webhook_payload
+from app.models.webhook_model import WebhookEvent
+from app.mappers.webhook_mapper import parse_webhook_event
+from app.services.utility.json_provider import orjson
+
+
+def payload_shapes():
+    running = make_webhook_payload("a" * 24)
+    closed = make_webhook_payload("b" * 24, end="2025-07-01T17:45:30Z", duration="PT9H45M30S")
+    offset = make_webhook_payload("c" * 24, start="2025-07-01T03:00:00.250-05:00",
+                                  end="2025-07-01T04:00:00.250-05:00", duration="PT1H")
+    no_project = make_webhook_payload("d" * 24, end="2025-07-01T08:00:05Z", duration="PT5S")
+    no_project.update({"project": None, "task": None, "projectId": None, "description": None,
+                       "tags": ["facturable", "soporte", "remoto"]})
+    return [running, closed, offset, no_project]
+
+
+def legacy_parse(body):
+    # Camino previo: validar y tirar el modelo, luego releer el dict con .get()
+    data = json.loads(body)
+    WebhookEvent(**data)
+    user_data = data.get("user", {})
+    is_enabled = user_data.get("status", "").upper() == "ACTIVE"
+    user = {
+        "ExternalUserId": user_data.get("id"),
+        "name": user_data.get("name"),
+        "email": f"{user_data.get('id')}@clockify.fake",
+        "hoursPerMonth": 0,
+        "enable": is_enabled,
+        "disabledTime": None if is_enabled else datetime.now(UTC)
+    }
+    time_data = data.get("timeInterval", {})
+    project = data.get("project") or {}
+    task = data.get("task") or {}
+    start_raw, end_raw, duration_raw = time_data.get("start"), time_data.get("end"), time_data.get("duration")
+    session = {
+        "external_sesion_id": data.get("id"),
+        "description": data.get("description") or "Sin descripción",
+        "idProject": data.get("projectId", "") or "",
+        "projectName": project.get("name", "Sin proyecto"),
+        "idWorkspace": data.get("workspaceId", ""),
+        "idTask": task.get("id", "") or "",
+        "taskName": task.get("name", "Sin tarea"),
+        "startDate": parser.isoparse(start_raw) if start_raw else None,
+        "endDate": parser.isoparse(end_raw) if end_raw else None,
+        "duration": isodate.parse_duration(duration_raw) if duration_raw else None,
+        "timeZone": time_data.get("timeZone", ""),
+        "offsetStart": time_data.get("offsetStart", 0),
+        "offsetEnd": time_data.get("offsetEnd", 0),
+        "currentlyRunning": data.get("currentlyRunning", False),
+    }
+    return session, user
+
+
+def current_parse(body):
+    return parse_webhook_event(orjson.loads(body) if orjson else json.loads(body))
+
+
+def measure(label, func, bodies, events):
+    # Calentamiento para no medir la primera compilación de regex/validadores
+    for body in bodies:
+        func(body)
+    started = time.perf_counter()
+    for index in range(events):
+        func(bodies[index % len(bodies)])
+    per_event_us = (time.perf_counter() - started) / events * 1e6
+    print(f"[BENCH] {label}: {per_event_us:.1f} us/evento ({1e6 / per_event_us:,.0f} eventos/s por núcleo)",
+          flush=True)
+    return per_event_us
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--events", type=int, default=20000)
+    args = arg_parser.parse_args()
+
+    bodies = [json.dumps(shape).encode("utf-8") for shape in payload_shapes()]
+
+    # Ambos caminos deben producir las mismas entidades
+    for body in bodies:
+        legacy_session, legacy_user = legacy_parse(body)
+        parsed = current_parse(body)
+        for key, value in legacy_session.items():
+            assert parsed.session[key] == value, (key, parsed.session[key], value)
+        assert {k: v for k, v in parsed.user.items() if k != "disabledTime"} == \
+               {k: v for k, v in legacy_user.items() if k != "disabledTime"}
+
+    print(f"[BENCH] decodificador JSON: {'orjson' if orjson else 'json (orjson no instalado)'}")
+    measure("decodificar json", json.loads, bodies, args.events)
+    if orjson:
+        measure("decodificar orjson", orjson.loads, bodies, args.events)
+    legacy = measure("camino anterior (json + validar + dateutil/isodate)", legacy_parse, bodies, args.events)
+    current = measure("paso único (orjson + WebhookEvent + mapeo)", current_parse, bodies, args.events)
+    print(f"[BENCH] ahorro: {legacy - current:.1f} us/evento ({legacy / current:.2f}x)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
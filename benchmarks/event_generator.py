@@ -0,0 +1,102 @@
+"""Generador de flujos sintéticos de eventos de Clockify para los benchmarks.
+
+Cada sesión produce sus eventos en el orden en que Clockify los entregaría:
+start -> end [-> edit...] [-> delete] para sesiones cronometradas y
+manual [-> edit...] [-> delete] para las cargadas a mano. El flujo completo
+se ordena por el instante del evento, intercalando usuarios y sesiones.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, UTC
+
+from benchmarks.bench_common import make_webhook_payload
+
+# zona horaria -> offset en segundos (sin horario de verano para no depender de la fecha)
+TIME_ZONES = {"America/Bogota": -18000, "America/Lima": -18000, "America/Mexico_City": -21600, "UTC": 0}
+PROJECTS = ["bench-project", "bench-soporte", "bench-interno", None]
+DESCRIPTIONS = ["Desarrollo", "Soporte cliente", "Reunión de seguimiento", "Revisión de código", None]
+BASE_DATE = datetime(2025, 7, 1, tzinfo=UTC)
+
+
+@dataclass
+class GeneratedEvent:
+    at: datetime
+    event_type: str  # start | end | edit | delete | manual
+    session_id: str
+    payload: dict
+
+
+def _iso(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _iso_duration(delta):
+    seconds = int(delta.total_seconds())
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"PT{hours}H{minutes}M{seconds}S"
+
+
+def _hex_id(rng):
+    return "%024x" % rng.getrandbits(96)
+
+
+def _session_events(rng, user_id, time_zone, start, edits_ratio, delete_ratio, manual_ratio):
+    session_id = _hex_id(rng)
+    # Jornadas de 30 min a 9 h; las de más de 5 h disparan la lógica de overtime
+    duration = timedelta(minutes=rng.randint(30, 540))
+    end = start + duration
+    common = {
+        "session_id": session_id, "user_id": user_id, "time_zone": time_zone,
+        "offset": TIME_ZONES[time_zone], "description": rng.choice(DESCRIPTIONS),
+        "project_id": rng.choice(PROJECTS),
+    }
+
+    def closed(start_at, end_at, **overrides):
+        return make_webhook_payload(start=_iso(start_at), end=_iso(end_at),
+                                    duration=_iso_duration(end_at - start_at), **{**common, **overrides})
+
+    events = []
+    if rng.random() < manual_ratio:
+        at = end + timedelta(minutes=rng.randint(1, 120))
+        events.append(GeneratedEvent(at, "manual", session_id, closed(start, end)))
+    else:
+        events.append(GeneratedEvent(start, "start", session_id, make_webhook_payload(start=_iso(start), **common)))
+        events.append(GeneratedEvent(end, "end", session_id, closed(start, end)))
+        at = end
+
+    # Ediciones: mover el inicio o el fin, o cambiar la descripción
+    while rng.random() < edits_ratio:
+        at += timedelta(minutes=rng.randint(1, 240))
+        kind = rng.choice(("start", "end", "description"))
+        if kind == "start":
+            start = start + timedelta(minutes=rng.randint(-60, 30))
+        elif kind == "end":
+            end = end + timedelta(minutes=rng.randint(-30, 90))
+        else:
+            common["description"] = rng.choice(DESCRIPTIONS[:-1]) + " (editada)"
+        events.append(GeneratedEvent(at, "edit", session_id, closed(start, max(end, start + timedelta(minutes=5)))))
+
+    if rng.random() < delete_ratio:
+        at += timedelta(minutes=rng.randint(1, 600))
+        events.append(GeneratedEvent(at, "delete", session_id, closed(start, end)))
+    return events
+
+
+def generate_event_stream(users=50, sessions_per_user=20, edits_ratio=0.3, delete_ratio=0.05,
+                          manual_ratio=0.1, seed=7):
+    """Devuelve la lista de GeneratedEvent ordenada por instante."""
+    rng = random.Random(seed)
+    events = []
+    for _ in range(users):
+        user_id = _hex_id(rng)
+        time_zone = rng.choice(list(TIME_ZONES))
+        day = BASE_DATE
+        for _ in range(sessions_per_user):
+            # Una o dos sesiones por día hábil, empezando entre 6:00 y 14:00 UTC
+            day += timedelta(days=rng.choice((0, 1, 1, 1, 3)))
+            start = day + timedelta(hours=rng.randint(6, 14), minutes=rng.randint(0, 59))
+            events.extend(_session_events(rng, user_id, time_zone, start, edits_ratio, delete_ratio,
+                                          manual_ratio))
+    events.sort(key=lambda generated: generated.at)
+    return events